@@ -0,0 +1,385 @@
+"""
+API HTTP local de sólo lectura para los resúmenes y las noticias etiquetadas.
+
+Sirve desde memoria lo que escribe el pipeline, sin re-parsear los JSON en cada consulta:
+
+    GET /salud                                   estado y versión de los datos cargados
+    GET /resumenes                               ministerios con resumen (sin el texto)
+    GET /resumenes/<ministerio>                  último resumen del ministerio
+    GET /ministerios/<ministerio>/articulos      artículos etiquetados, del más nuevo al más viejo
+        ?desde=2025-11-01&hasta=2025-11-13T23:59  filtro por Fecha (ISO 8601, inclusive)
+        &pagina=1&por_pagina=20                  paginado (por_pagina <= API_MAX_POR_PAGINA)
+        &cuerpo=1                                incluye Descripcion/Cuerpo/digest
+
+Las noticias se cargan desde el índice + blob (utils/article_index.py) si está vigente:
+en memoria quedan sólo los metadatos y los cuerpos se leen del blob mapeado cuando se
+piden con `cuerpo=1`. Si no hay índice, se lee el JSON completo.
+
+Un thread revisa cada API_RECARGA_S segundos el tamaño y mtime de las fuentes; si cambiaron,
+arma una instantánea nueva y la reemplaza de forma atómica (las consultas en curso terminan
+con la anterior). Si la lectura falla (p. ej. un JSON a medio escribir) se conserva la
+instantánea vigente y se reintenta en la próxima revisión.
+
+Todas las respuestas 200 llevan ETag (versión de los datos + consulta); con If-None-Match
+igual se responde 304 sin cuerpo. Las respuestas ya serializadas se cachean por instantánea.
+
+Uso:
+    python api_lectura.py [--puerto 8780] [--input data/noticias_etiquetadas.json]
+    curl -s 'http://127.0.0.1:8780/ministerios/Salud/articulos?desde=2025-11-01&por_pagina=5'
+    python -m benchmarks.carga_api --duracion 10 --clientes 8
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+import sys
+sys.stdout.reconfigure(encoding="utf-8")
+
+from clasificador.config import OUTPUT_FILE as ARTICULOS_FILE
+from summarizer.config import OUTPUT_FILE as RESUMENES_DIR
+from utils.article_index import CAMPOS_PESADOS, ArticleIndex, abrir_si_vigente, rutas
+from utils.time_index import article_timestamp
+from utils.time_utils import parse_fecha
+
+API_PUERTO = 8780
+API_RECARGA_S = 1.0
+API_POR_PAGINA = 20
+API_MAX_POR_PAGINA = 200
+API_CACHE_RESPUESTAS = 2048  # respuestas serializadas por instantánea (LRU)
+
+
+class ErrorConsulta(Exception):
+    """Parámetro inválido en la consulta (→ 400)."""
+
+
+def _firma_archivo(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def firma_fuentes(articulos_file: Path, resumenes_dir: Path) -> Tuple:
+    """Tamaño y mtime de todo lo que sirve la API; si cambia, hay que recargar."""
+    idx, blob = rutas(articulos_file)
+    resumenes = sorted(
+        (p.name, _firma_archivo(p)) for p in resumenes_dir.glob("*.json")
+    ) if resumenes_dir.is_dir() else []
+    return (
+        _firma_archivo(articulos_file), _firma_archivo(idx), _firma_archivo(blob), tuple(resumenes),
+    )
+
+
+def _fecha_iso(valor: Optional[str], parametro: str, fin_de_dia: bool = False) -> Optional[float]:
+    if not valor:
+        return None
+    ts = parse_fecha(valor)
+    if ts is None:
+        raise ErrorConsulta(f"'{parametro}' no es una fecha ISO 8601: {valor!r}")
+    if fin_de_dia and len(valor.strip()) == 10:  # "2025-11-13" incluye todo el día
+        ts += 86400 - 1e-6
+    return ts
+
+
+def _entero(valor: Optional[str], parametro: str, defecto: int, minimo: int, maximo: int) -> int:
+    if valor in (None, ""):
+        return defecto
+    try:
+        n = int(valor)
+    except ValueError:
+        raise ErrorConsulta(f"'{parametro}' debe ser un entero: {valor!r}") from None
+    if not minimo <= n <= maximo:
+        raise ErrorConsulta(f"'{parametro}' debe estar entre {minimo} y {maximo}")
+    return n
+
+
+class Instantanea:
+    """
+    Datos inmutables de una carga: resúmenes serializados y, por ministerio, los artículos
+    ordenados por fecha descendente con sus claves (-timestamp) para filtrar con bisect.
+    """
+
+    def __init__(self, articulos_file: Path, resumenes_dir: Path):
+        self.firma = firma_fuentes(articulos_file, resumenes_dir)
+        self.version = hashlib.sha1(repr(self.firma).encode("utf-8")).hexdigest()[:12]
+        self.cargada_en = time.time()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.resumenes: Dict[str, bytes] = {}
+        self.resumenes_meta: List[Dict] = []
+        if resumenes_dir.is_dir():
+            for path in sorted(resumenes_dir.glob("*.json")):
+                crudo = path.read_bytes()
+                resumen = json.loads(crudo)
+                self.resumenes[resumen["ministerio"]] = crudo
+                self.resumenes_meta.append({
+                    "ministerio": resumen["ministerio"],
+                    "total_articulos": resumen.get("total_articulos", 0),
+                    "actualizado": time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.localtime(path.stat().st_mtime)
+                    ),
+                })
+
+        self.indice: Optional[ArticleIndex] = None
+        self._completos: List[Dict] = []
+        if (indice := abrir_si_vigente(articulos_file)) is not None:
+            self.indice = indice
+            entradas = [(e.fecha_ts, e.ministerios, e) for e in indice.entradas]
+        elif articulos_file.exists():
+            self._completos = json.loads(articulos_file.read_text(encoding="utf-8"))
+            entradas = [
+                (article_timestamp(a), tuple(a.get("ministerio") or []), a) for a in self._completos
+            ]
+        else:
+            entradas = []
+        self.total_articulos = len(entradas)
+
+        por_ministerio: Dict[str, List[Tuple[float, object]]] = {}
+        for ts, ministerios, ref in entradas:
+            # Sin fecha → clave +inf: quedan al final y fuera de cualquier filtro por fecha
+            clave = -ts if ts is not None else float("inf")
+            for m in ministerios:
+                por_ministerio.setdefault(m, []).append((clave, ref))
+        self._claves: Dict[str, List[float]] = {}
+        self._refs: Dict[str, List[object]] = {}
+        for m, filas in por_ministerio.items():
+            filas.sort(key=lambda f: f[0])  # sort estable: a igual fecha, orden del JSON
+            self._claves[m] = [f[0] for f in filas]
+            self._refs[m] = [f[1] for f in filas]
+
+    def cerrar(self) -> None:
+        if self.indice is not None:
+            self.indice.close()
+
+    def _articulo(self, ref, cuerpo: bool) -> Dict:
+        if self.indice is not None:
+            if cuerpo:
+                return self.indice.materializar(ref)
+            articulo = dict(zip(self.indice.campos, ref.meta))
+            articulo["ministerio"] = list(ref.ministerios)
+            return articulo
+        if cuerpo:
+            return ref
+        return {k: v for k, v in ref.items() if k not in CAMPOS_PESADOS}
+
+    def articulos(
+        self, ministerio: str, desde: Optional[float], hasta: Optional[float],
+        pagina: int, por_pagina: int, cuerpo: bool,
+    ) -> Dict:
+        claves = self._claves.get(ministerio, [])
+        refs = self._refs.get(ministerio, [])
+        # Claves = -timestamp ascendentes: [hasta, desde] en fechas es [-hasta, -desde] en claves
+        inicio = bisect.bisect_left(claves, -hasta) if hasta is not None else 0
+        fin = bisect.bisect_right(claves, -desde) if desde is not None else len(claves)
+        if desde is None and hasta is not None:
+            fin = bisect.bisect_left(claves, float("inf"))  # sin fecha no entra en un rango
+        total = max(0, fin - inicio)
+        desde_pos = inicio + (pagina - 1) * por_pagina
+        hasta_pos = min(fin, desde_pos + por_pagina)
+        return {
+            "ministerio": ministerio,
+            "total": total,
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "paginas": (total + por_pagina - 1) // por_pagina,
+            "articulos": [self._articulo(r, cuerpo) for r in refs[desde_pos:hasta_pos]],
+        }
+
+    def respuesta_cacheada(self, clave: str, generar) -> bytes:
+        with self._cache_lock:
+            data = self._cache.get(clave)
+            if data is not None:
+                self._cache.move_to_end(clave)
+                return data
+        data = generar()
+        with self._cache_lock:
+            self._cache[clave] = data
+            if len(self._cache) > API_CACHE_RESPUESTAS:
+                self._cache.popitem(last=False)
+        return data
+
+
+def _json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ApiLectura"
+    protocol_version = "HTTP/1.1"  # keep-alive: el cliente reutiliza la conexión
+    # Cabeceras y cuerpo salen en dos writes: sin TCP_NODELAY, Nagle + ACK demorado suman ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # silencia el log por request
+        pass
+
+    def _responder(self, status: int, cuerpo: bytes = b"", etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def _error(self, status: int, mensaje: str) -> None:
+        self._responder(status, _json({"error": mensaje}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        partes = [unquote(p) for p in url.path.split("/") if p]
+        consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        snap = self.server.instantanea
+        self.server.contar()
+
+        if partes == ["salud"]:
+            self._responder(200, _json({
+                "estado": "ok", "version": snap.version, "articulos": snap.total_articulos,
+                "resumenes": len(snap.resumenes), "indice": snap.indice is not None,
+                "cargada_en": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(snap.cargada_en)),
+            }))
+            return
+
+        # Clave canónica de la consulta: mismo recurso → mismo ETag y misma entrada de caché
+        clave = "/".join(partes) + "?" + "&".join(f"{k}={consulta[k]}" for k in sorted(consulta))
+        etag = f'"{snap.version}-{hashlib.sha1(clave.encode("utf-8")).hexdigest()[:10]}"'
+        if partes == ["resumenes"]:
+            generar = lambda: _json(snap.resumenes_meta)
+        elif len(partes) == 2 and partes[0] == "resumenes":
+            if partes[1] not in snap.resumenes:
+                self._error(404, f"No hay resumen para '{partes[1]}'")
+                return
+            generar = lambda: snap.resumenes[partes[1]]
+        elif len(partes) == 3 and partes[0] == "ministerios" and partes[2] == "articulos":
+            try:
+                args = (
+                    partes[1],
+                    _fecha_iso(consulta.get("desde"), "desde"),
+                    _fecha_iso(consulta.get("hasta"), "hasta", fin_de_dia=True),
+                    _entero(consulta.get("pagina"), "pagina", 1, 1, 10**6),
+                    _entero(consulta.get("por_pagina"), "por_pagina", API_POR_PAGINA, 1, API_MAX_POR_PAGINA),
+                    consulta.get("cuerpo") in ("1", "true", "si", "sí"),
+                )
+            except ErrorConsulta as exc:
+                self._error(400, str(exc))
+                return
+            generar = lambda: _json(snap.articulos(*args))
+        else:
+            self._error(404, f"Ruta desconocida: {url.path}")
+            return
+
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self._responder(304, etag=etag)
+            return
+        self._responder(200, snap.respuesta_cacheada(clave, generar), etag=etag)
+
+
+class ApiLectura(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = API_PUERTO,
+        articulos_file: str = ARTICULOS_FILE,
+        resumenes_dir: str = RESUMENES_DIR,
+        recarga_s: float = API_RECARGA_S,
+    ):
+        super().__init__((host, port), _Handler)
+        self.articulos_file = Path(articulos_file)
+        self.resumenes_dir = Path(resumenes_dir)
+        self.recarga_s = recarga_s
+        self.instantanea = Instantanea(self.articulos_file, self.resumenes_dir)
+        self.recargas = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        threading.Thread(target=self._vigilar, name="api-recarga", daemon=True).start()
+
+    def contar(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def recargar_si_cambio(self) -> bool:
+        """Arma una instantánea nueva si cambiaron las fuentes. True si la reemplazó."""
+        if firma_fuentes(self.articulos_file, self.resumenes_dir) == self.instantanea.firma:
+            return False
+        try:
+            nueva = Instantanea(self.articulos_file, self.resumenes_dir)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"⚠️ Recarga pospuesta ({type(exc).__name__}: {exc})")
+            return False
+        # Las consultas en curso mantienen su referencia; el mmap viejo se cierra después
+        vieja, self.instantanea = self.instantanea, nueva
+        self.recargas += 1
+        cierre = threading.Timer(30.0, vieja.cerrar)
+        cierre.daemon = True
+        cierre.start()
+        print(f"🔄 Datos recargados: versión {nueva.version}, {nueva.total_articulos} artículos, "
+              f"{len(nueva.resumenes)} resúmenes")
+        return True
+
+    def _vigilar(self) -> None:
+        while not self._detener.wait(self.recarga_s):
+            self.recargar_si_cambio()
+
+    def server_close(self) -> None:
+        self._detener.set()
+        super().server_close()
+        self.instantanea.cerrar()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def iniciar_en_thread(self) -> "ApiLectura":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="API local de lectura de resúmenes y noticias etiquetadas.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=API_PUERTO)
+    parser.add_argument("--input", default=ARTICULOS_FILE, help="Noticias etiquetadas (JSON).")
+    parser.add_argument("--resumenes", default=RESUMENES_DIR, help="Directorio de resúmenes.")
+    parser.add_argument(
+        "--recarga", type=float, default=API_RECARGA_S,
+        help="Segundos entre revisiones de cambios en las fuentes.",
+    )
+    args = parser.parse_args(argv)
+
+    server = ApiLectura(args.host, args.puerto, args.input, args.resumenes, args.recarga)
+    snap = server.instantanea
+    print("════════════════════════════════════════")
+    print(" API de lectura 📡 ")
+    print("════════════════════════════════════════")
+    print(f"Escuchando en:    {server.url}")
+    print(f"Artículos:        {snap.total_articulos} ({'índice + blob' if snap.indice else 'JSON'})")
+    print(f"Resúmenes:        {', '.join(sorted(snap.resumenes)) or '—'}")
+    print("────────────────────────────────────────")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
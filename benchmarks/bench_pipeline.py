@@ -0,0 +1,356 @@
+"""
+Benchmark end-to-end del clasificador y el summarizer contra el servidor OpenRouter local.
+
+Levanta `utils.fake_openrouter.FakeOpenRouterServer` con la latencia / tasa de errores
+configurada, redirige el cliente de OpenRouter hacia él y ejecuta:
+1. `clasificador.pipeline_classificador.run_pipeline` sobre data/noticias.json
+   (o los primeros --limite artículos), escribiendo en un directorio temporal;
+2. `summarizer.pipeline_summarizer.run_pipeline` para cada ministerio.
+
+Reporta artículos/s, latencia p50/p95 por lote (incluyendo reintentos y backoff),
+intentos, fallos y las estadísticas del servidor. El resultado se guarda como JSON junto
+con el commit, la configuración y el hash del dataset, para poder comparar corridas:
+
+    python -m benchmarks.bench_pipeline --latencia 0.3 --jitter 0.2 --tasa-429 0.05
+    python -m benchmarks.bench_pipeline --comparar benchmarks/results/a.json benchmarks/results/b.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from clasificador import budget, endpoints, filtro, openrouter_client, pipeline_classificador
+from clasificador.config import INPUT_FILE, LOTE
+from clasificador.schema import MINISTERIOS_VALIDOS
+from summarizer import pipeline_summarizer
+from utils.fake_openrouter import FakeConfig, FakeOpenRouterServer
+from utils.json_utils import write_json_atomic
+from utils.metrics import percentil
+from utils.time_utils import format_duration_hms
+
+RESULTS_DIR = Path("benchmarks/results")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+class _MedidorLotes:
+    """Envuelve `clasificar_lote` para medir cada intento y cada lote (primer intento → éxito)."""
+
+    def __init__(self, original):
+        self._original = original
+        self._inicio_lote: Dict[int, float] = {}
+        self.intentos = 0
+        self.fallos = 0
+        self.latencias_intento: List[float] = []
+        self.latencias_lote: List[float] = []
+
+    def __call__(self, lote, start_idx, **kwargs):
+        ahora = time.perf_counter()
+        self._inicio_lote.setdefault(start_idx, ahora)
+        self.intentos += 1
+        try:
+            resultado = self._original(lote, start_idx, **kwargs)
+        except Exception:
+            self.fallos += 1
+            self.latencias_intento.append(time.perf_counter() - ahora)
+            raise
+        fin = time.perf_counter()
+        self.latencias_intento.append(fin - ahora)
+        self.latencias_lote.append(fin - self._inicio_lote.pop(start_idx))
+        return resultado
+
+
+@contextlib.contextmanager
+def _silenciar(activo: bool):
+    if not activo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def correr_benchmark(
+    config: FakeConfig,
+    input_file: str = INPUT_FILE,
+    limite: Optional[int] = None,
+    verbose: bool = False,
+    rpm: int = 0,
+    tpm: int = 0,
+    hedge: bool = False,
+    fallback: Optional[List[str]] = None,
+    digest: bool = False,
+    prompt_legado: bool = False,
+    filtrar: bool = False,
+) -> Dict:
+    """
+    Ejecuta clasificador + resúmenes contra el servidor local y devuelve las métricas.
+
+    Usa un gobernador de presupuesto propio (base temporal, límites `rpm`/`tpm`) para no
+    mezclar las requests del benchmark con el consumo real registrado en BUDGET_DB.
+    `hedge` y `fallback` reemplazan OPENROUTER_HEDGE / OPENROUTER_FALLBACK_MODELS;
+    `digest` corre el clasificador en modo combinado (el summarizer recibe los digests);
+    `prompt_legado` usa el payload JSON original en lugar del prompt compacto;
+    `filtrar` aplica antes el filtro previo al LLM (clasificador/filtro.py).
+    """
+    articulos = json.loads(Path(input_file).read_text(encoding="utf-8"))
+    if limite is not None:
+        articulos = articulos[:limite]
+    dataset = json.dumps(articulos, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    descartes = None
+    if filtrar:
+        articulos, _, descartes = filtro.filtrar(articulos)
+
+    server = FakeOpenRouterServer(config=config).iniciar_en_thread()
+    url_original = openrouter_client.OPENROUTER_API_URL
+    key_original = openrouter_client.OPENROUTER_API_KEY
+    clasificar_original = pipeline_classificador.clasificar_lote
+    medidor = _MedidorLotes(clasificar_original)
+    openrouter_client.OPENROUTER_API_URL = server.url
+    openrouter_client.OPENROUTER_API_KEY = "fake"
+    pipeline_classificador.clasificar_lote = medidor
+    governor_original = budget._governor
+    hedge_original = openrouter_client.HEDGE_HABILITADO
+    fallback_original = openrouter_client.FALLBACK_MODELS
+    openrouter_client.HEDGE_HABILITADO = hedge
+    openrouter_client.FALLBACK_MODELS = list(fallback or [])
+    openrouter_client.reiniciar_estadisticas()
+    compacto_original = pipeline_classificador.PROMPT_COMPACTO
+    pipeline_classificador.PROMPT_COMPACTO = not prompt_legado
+    formatear_original = pipeline_summarizer._formatear_articulos
+    chars_resumen: List[int] = []
+
+    def _formatear_medido(articulos):
+        listado = formatear_original(articulos)
+        chars_resumen.append(len(listado))
+        return listado
+
+    pipeline_summarizer._formatear_articulos = _formatear_medido
+
+    resultado: Dict = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+            budget._governor = budget.BudgetGovernor(str(Path(tmp) / "presupuesto.db"), rpm=rpm, tpm=tpm)
+            entrada = Path(tmp) / "noticias.json"
+            etiquetadas = Path(tmp) / "noticias_etiquetadas.json"
+            entrada.write_text(json.dumps(articulos, ensure_ascii=False), encoding="utf-8")
+
+            error_clasif = None
+            t0 = time.perf_counter()
+            try:
+                with _silenciar(not verbose):
+                    pipeline_classificador.run_pipeline(
+                        input_file=str(entrada), output_file=str(etiquetadas), digest=digest
+                    )
+            except Exception as exc:
+                error_clasif = str(exc)
+            dur_clasif = time.perf_counter() - t0
+
+            resumenes: Dict[str, Dict] = {}
+            dur_resumen = 0.0
+            if error_clasif is None:
+                for ministerio in sorted(MINISTERIOS_VALIDOS):
+                    t1 = time.perf_counter()
+                    error = None
+                    try:
+                        with _silenciar(not verbose):
+                            pipeline_summarizer.run_pipeline(
+                                ministerio, estricto=True,
+                                input_file=str(etiquetadas), output_dir=str(Path(tmp) / "resumenes"),
+                            )
+                    except Exception as exc:
+                        error = str(exc)
+                    duracion = time.perf_counter() - t1
+                    dur_resumen += duracion
+                    resumenes[ministerio] = {"wall_time_s": round(duracion, 4), "error": error}
+            presupuesto = budget._governor.estado()
+            budget._governor.close()
+
+        n = len(articulos)
+        resultado = {
+            "clasificador": {
+                "articulos": n,
+                "lotes": len(medidor.latencias_lote),
+                "tamano_lote": LOTE,
+                "wall_time_s": round(dur_clasif, 4),
+                "articulos_por_s": round(n / dur_clasif, 3) if dur_clasif and error_clasif is None else 0.0,
+                "lote_p50_s": round(percentil(medidor.latencias_lote, 50), 4),
+                "lote_p95_s": round(percentil(medidor.latencias_lote, 95), 4),
+                "intento_p50_s": round(percentil(medidor.latencias_intento, 50), 4),
+                "intento_p95_s": round(percentil(medidor.latencias_intento, 95), 4),
+                "intentos": medidor.intentos,
+                "reintentos": medidor.intentos - len(medidor.latencias_lote),
+                "fallos": medidor.fallos,
+                "error": error_clasif,
+            },
+            "summarizer": {
+                "wall_time_s": round(dur_resumen, 4),
+                "p50_s": round(percentil([r["wall_time_s"] for r in resumenes.values()], 50), 4),
+                "errores": sum(1 for r in resumenes.values() if r["error"]),
+                "caracteres_entrada": sum(chars_resumen),
+                "por_ministerio": resumenes,
+            },
+            "servidor": dict(server.stats),
+            "hedging": openrouter_client.estadisticas_llm(),
+            "endpoints": endpoints.estadisticas_actuales(),
+            "presupuesto": presupuesto["acumulado"],
+        }
+    finally:
+        pipeline_classificador.clasificar_lote = clasificar_original
+        pipeline_classificador.PROMPT_COMPACTO = compacto_original
+        budget._governor = governor_original
+        pipeline_summarizer._formatear_articulos = formatear_original
+        openrouter_client.HEDGE_HABILITADO = hedge_original
+        openrouter_client.FALLBACK_MODELS = fallback_original
+        openrouter_client.OPENROUTER_API_URL = url_original
+        openrouter_client.OPENROUTER_API_KEY = key_original
+        server.shutdown()
+        server.server_close()
+
+    resultado["meta"] = {
+        "commit": _git_commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "dataset": input_file,
+        "dataset_sha256": hashlib.sha256(dataset).hexdigest(),
+        "config": {k: v for k, v in vars(config).items() if k != "canned"},
+        "presupuesto": {"rpm": rpm, "tpm": tpm},
+        "hedge": hedge,
+        "digest": digest,
+        "prompt_legado": prompt_legado,
+        "filtro": descartes,
+        "fallback": list(fallback or []),
+    }
+    return resultado
+
+
+def imprimir_resultado(r: Dict) -> None:
+    c, s, srv = r["clasificador"], r["summarizer"], r["servidor"]
+    print("════════════════════════════════════════")
+    print(f" Benchmark pipeline @ {r['meta']['commit']} 📊 ")
+    print("════════════════════════════════════════")
+    print(f"Artículos:        {c['articulos']} en {c['lotes']} lote(s) de {c['tamano_lote']}")
+    print(f"Clasificador:     {format_duration_hms(c['wall_time_s'])} "
+          f"({c['articulos_por_s']} artículos/s)")
+    print(f"Lote p50 / p95:   {c['lote_p50_s']:.3f}s / {c['lote_p95_s']:.3f}s")
+    print(f"Intentos:         {c['intentos']} (reintentos: {c['reintentos']}, fallos: {c['fallos']})")
+    if c["error"]:
+        print(f"✗ Clasificador abortado: {c['error']}")
+    print(f"Resúmenes:        {format_duration_hms(s['wall_time_s'])} "
+          f"(p50 {s['p50_s']:.3f}s, errores: {s['errores']}, "
+          f"entrada {s.get('caracteres_entrada', 0)} caracteres)")
+    print(f"Presupuesto:      {r['presupuesto']['prompt_tokens']} + "
+          f"{r['presupuesto']['completion_tokens']} tokens, "
+          f"espera acumulada {r['presupuesto']['espera_total_s']}s")
+    print(f"Servidor:         {srv['requests']} requests | ok {srv['ok']} | "
+          f"429 {srv['429']} | 500 {srv['500']} | lentas {srv['lentas']}")
+    h = r["hedging"]
+    print(f"Hedging:          {h['hedges']}/{h['llamadas']} llamadas ({h['tasa_hedge']:.1%}), "
+          f"gana el duplicado {h['tasa_victoria_hedge']:.1%} | fallbacks {h['fallbacks']} | "
+          f"demora {h['demora_hedge_s']}s")
+    print("════════════════════════════════════════")
+
+
+_METRICAS_COMPARABLES = [
+    ("clasificador", "articulos_por_s"),
+    ("clasificador", "lote_p50_s"),
+    ("clasificador", "lote_p95_s"),
+    ("clasificador", "reintentos"),
+    ("clasificador", "wall_time_s"),
+    ("summarizer", "wall_time_s"),
+]
+
+
+def comparar(path_a: Path, path_b: Path) -> None:
+    """Imprime la diferencia entre dos resultados guardados (A = base, B = nuevo)."""
+    a = json.loads(Path(path_a).read_text(encoding="utf-8"))
+    b = json.loads(Path(path_b).read_text(encoding="utf-8"))
+    print(f"A: {a['meta']['commit']} ({a['meta']['fecha']})")
+    print(f"B: {b['meta']['commit']} ({b['meta']['fecha']})")
+    if a["meta"]["config"] != b["meta"]["config"]:
+        print("⚠ Aviso: las corridas usan configuraciones del servidor distintas.")
+    if a["meta"]["dataset_sha256"] != b["meta"]["dataset_sha256"]:
+        print("⚠ Aviso: las corridas usan datasets distintos.")
+    print("────────────────────────────────────────")
+    for seccion, clave in _METRICAS_COMPARABLES:
+        va, vb = a[seccion][clave], b[seccion][clave]
+        delta = f"{(vb - va) / va * 100:+.1f}%" if va else "n/a"
+        print(f"{seccion}.{clave:<18} {va:>10} → {vb:<10} ({delta})")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark del clasificador y el summarizer contra un OpenRouter local."
+    )
+    parser.add_argument("--input", default=INPUT_FILE, help="Dataset de artículos (JSON).")
+    parser.add_argument("--limite", type=int, default=None, help="Usa sólo los primeros N artículos.")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Demora base por respuesta (s).")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Demora extra uniforme máxima (s).")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Proporción de respuestas 500.")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429.")
+    parser.add_argument("--tasa-lenta", type=float, default=0.0, help="Proporción de respuestas de cola.")
+    parser.add_argument("--latencia-lenta", type=float, default=10.0, help="Demora de esas respuestas (s).")
+    parser.add_argument("--modelos-caidos", nargs="*", default=None, help="Modelos que siempre responden 500.")
+    parser.add_argument("--hedge", action="store_true", help="Activa el hedging de requests lentas.")
+    parser.add_argument("--fallback", nargs="*", default=None, help="Modelos de fallback (en orden).")
+    parser.add_argument("--digest", action="store_true", help="Clasificador en modo clasificación + digest.")
+    parser.add_argument("--filtro", action="store_true", help="Aplica el filtro previo al LLM.")
+    parser.add_argument("--prompt-legado", action="store_true",
+                        help="Clasificador con el payload JSON original (sin prompt compacto).")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--rpm", type=int, default=0, help="Límite de requests/min del gobernador (0 = sin límite).")
+    parser.add_argument("--tpm", type=int, default=0, help="Límite de tokens/min del gobernador (0 = sin límite).")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultado.")
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida de los pipelines.")
+    parser.add_argument(
+        "--comparar", nargs=2, metavar=("BASE", "NUEVO"), default=None,
+        help="Compara dos resultados guardados en lugar de ejecutar el benchmark.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    config = FakeConfig(
+        latencia_s=args.latencia, jitter_s=args.jitter, tasa_error=args.tasa_error,
+        tasa_429=args.tasa_429, tasa_lenta=args.tasa_lenta, latencia_lenta_s=args.latencia_lenta,
+        modelos_caidos=args.modelos_caidos, semilla=args.semilla,
+    )
+    resultado = correr_benchmark(
+        config, args.input, args.limite, args.verbose, rpm=args.rpm, tpm=args.tpm,
+        hedge=args.hedge, fallback=args.fallback, digest=args.digest,
+        prompt_legado=args.prompt_legado, filtrar=args.filtro,
+    )
+    imprimir_resultado(resultado)
+
+    salida = Path(args.salida) if args.salida else (
+        RESULTS_DIR / f"pipeline_{resultado['meta']['commit']}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(salida, resultado)
+    print(f"→ Resultado guardado en {salida}")
+    return 0 if resultado["clasificador"]["error"] is None else 1
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    raise SystemExit(main())
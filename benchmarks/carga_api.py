@@ -0,0 +1,194 @@
+"""
+Prueba de carga de la API de lectura (api_lectura.py).
+
+Levanta la API en un thread sobre los datos indicados (o usa --url para una API ya
+corriendo) y lanza --clientes threads que, durante --duracion segundos, hacen requests
+con conexiones keep-alive sobre una mezcla de rutas:
+- listado de resúmenes y resumen de cada ministerio;
+- páginas de artículos por ministerio, con y sin filtro de fechas;
+- una fracción (--revalidar) de los requests repite una consulta ya hecha enviando su
+  ETag en If-None-Match (lo que hace un consumidor que cachea).
+
+Reporta requests/s, latencia p50/p95/p99 (total y por tipo de ruta) y cantidad de
+respuestas por código HTTP. Cliente y servidor en el mismo proceso comparten el GIL: para
+medir sólo el servidor conviene levantar la API aparte y pasar --url.
+
+    python -m benchmarks.carga_api --duracion 10 --clientes 8
+    python api_lectura.py & python -m benchmarks.carga_api --url http://127.0.0.1:8780
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+from api_lectura import ARTICULOS_FILE, RESUMENES_DIR, ApiLectura
+from clasificador.schema import MINISTERIOS_VALIDOS
+from utils.json_utils import write_json_atomic
+from utils.metrics import percentil
+
+_FECHAS = ["2025-10-01", "2025-10-20", "2025-11-01", "2025-11-10"]
+
+
+def _consulta_aleatoria(rng: random.Random) -> Tuple[str, str]:
+    """(tipo de ruta, path) de la mezcla de carga."""
+    ministerio = quote(rng.choice(sorted(MINISTERIOS_VALIDOS)))
+    sorteo = rng.random()
+    if sorteo < 0.1:
+        return "resumenes", "/resumenes"
+    if sorteo < 0.3:
+        return "resumen", f"/resumenes/{ministerio}"
+    path = f"/ministerios/{ministerio}/articulos?pagina={rng.randint(1, 3)}&por_pagina=20"
+    if sorteo < 0.6:
+        path += f"&desde={rng.choice(_FECHAS)}"
+    if sorteo > 0.95:
+        path += "&cuerpo=1"
+    return "articulos", path
+
+
+class _Cliente(threading.Thread):
+    def __init__(self, host: str, port: int, fin: float, revalidar: float, semilla: int):
+        super().__init__(daemon=True)
+        self.host, self.port, self.fin, self.revalidar = host, port, fin, revalidar
+        self.rng = random.Random(semilla)
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.codigos: Counter = Counter()
+        self.bytes = 0
+        self.errores = 0
+        self._etags: Dict[str, str] = {}
+
+    def run(self) -> None:
+        conexion = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        while time.perf_counter() < self.fin:
+            tipo, path = _consulta_aleatoria(self.rng)
+            headers = {}
+            if self._etags and self.rng.random() < self.revalidar:
+                path = self.rng.choice(list(self._etags))
+                headers["If-None-Match"] = self._etags[path]
+                tipo = "revalidacion"
+            t0 = time.perf_counter()
+            try:
+                conexion.request("GET", path, headers=headers)
+                respuesta = conexion.getresponse()
+                cuerpo = respuesta.read()
+            except (OSError, http.client.HTTPException):
+                self.errores += 1
+                conexion.close()
+                conexion = http.client.HTTPConnection(self.host, self.port, timeout=10)
+                continue
+            self.latencias[tipo].append(time.perf_counter() - t0)
+            self.codigos[respuesta.status] += 1
+            self.bytes += len(cuerpo)
+            etag = respuesta.getheader("ETag")
+            if etag and respuesta.status == 200:
+                self._etags[path] = etag
+        conexion.close()
+
+
+def correr_carga(
+    url: Optional[str] = None,
+    duracion_s: float = 10.0,
+    clientes: int = 8,
+    revalidar: float = 0.2,
+    articulos_file: str = ARTICULOS_FILE,
+    resumenes_dir: str = RESUMENES_DIR,
+    semilla: int = 1234,
+) -> Dict:
+    server = None
+    if url is None:
+        server = ApiLectura(port=0, articulos_file=articulos_file, resumenes_dir=resumenes_dir).iniciar_en_thread()
+        url = server.url
+    destino = urlparse(url)
+    try:
+        fin = time.perf_counter() + duracion_s
+        hilos = [
+            _Cliente(destino.hostname, destino.port, fin, revalidar, semilla + i) for i in range(clientes)
+        ]
+        t0 = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        transcurrido = time.perf_counter() - t0
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    por_tipo: Dict[str, List[float]] = defaultdict(list)
+    codigos: Counter = Counter()
+    for h in hilos:
+        for tipo, valores in h.latencias.items():
+            por_tipo[tipo].extend(valores)
+        codigos.update(h.codigos)
+    todas = [v for valores in por_tipo.values() for v in valores]
+
+    def _resumen(valores: List[float]) -> Dict:
+        return {
+            "requests": len(valores),
+            "p50_ms": round(percentil(valores, 50) * 1000, 3),
+            "p95_ms": round(percentil(valores, 95) * 1000, 3),
+            "p99_ms": round(percentil(valores, 99) * 1000, 3),
+        }
+
+    return {
+        "url": url,
+        "clientes": clientes,
+        "duracion_s": round(transcurrido, 3),
+        "rps": round(len(todas) / transcurrido, 1) if transcurrido else 0.0,
+        **_resumen(todas),
+        "mb_recibidos": round(sum(h.bytes for h in hilos) / 1e6, 2),
+        "errores": sum(h.errores for h in hilos),
+        "codigos": {str(k): v for k, v in sorted(codigos.items())},
+        "por_tipo": {tipo: _resumen(valores) for tipo, valores in sorted(por_tipo.items())},
+    }
+
+
+def imprimir_resultado(r: Dict) -> None:
+    print("════════════════════════════════════════")
+    print(" Carga de la API de lectura 📡 ")
+    print("════════════════════════════════════════")
+    print(f"Destino:          {r['url']} ({r['clientes']} clientes, {r['duracion_s']}s)")
+    print(f"Throughput:       {r['rps']} requests/s ({r['requests']} requests, {r['mb_recibidos']} MB)")
+    print(f"Latencia:         p50 {r['p50_ms']} ms | p95 {r['p95_ms']} ms | p99 {r['p99_ms']} ms")
+    print(f"Códigos:          {', '.join(f'{k}: {v}' for k, v in r['codigos'].items())} "
+          f"| errores de conexión: {r['errores']}")
+    print("────────────────────────────────────────")
+    for tipo, m in r["por_tipo"].items():
+        print(f"{tipo:<14} {m['requests']:>8} req  p50 {m['p50_ms']:>8.3f} ms  p99 {m['p99_ms']:>8.3f} ms")
+    print("════════════════════════════════════════")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de lectura.")
+    parser.add_argument("--url", default=None, help="API ya levantada (por defecto se levanta una local).")
+    parser.add_argument("--input", default=ARTICULOS_FILE, help="Noticias etiquetadas (sin --url).")
+    parser.add_argument("--resumenes", default=RESUMENES_DIR, help="Directorio de resúmenes (sin --url).")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga.")
+    parser.add_argument("--clientes", type=int, default=8, help="Clientes concurrentes.")
+    parser.add_argument(
+        "--revalidar", type=float, default=0.2,
+        help="Proporción de requests que repiten una consulta con If-None-Match.",
+    )
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--salida", default=None, help="Guarda el resultado en este JSON.")
+    args = parser.parse_args(argv)
+
+    r = correr_carga(
+        args.url, args.duracion, args.clientes, args.revalidar, args.input, args.resumenes, args.semilla,
+    )
+    imprimir_resultado(r)
+    if args.salida:
+        write_json_atomic(Path(args.salida), r)
+        print(f"→ Resultado en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
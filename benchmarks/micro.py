@@ -0,0 +1,466 @@
+"""
+Micro-benchmarks de los caminos de CPU del pipeline, con gate de regresión.
+
+Escala data/noticias.json a --articulos artículos sintéticos (por defecto 100.000: mismos
+cuerpos, títulos y links únicos, ministerios y digests sorteados con --semilla) y mide:
+- `parse_jsonld_html` (la parte de CPU de `extract_jsonld`) sobre --muestra-html páginas;
+- `_normalize_url` y `filter_relevant_links` sobre todos los links (con variantes de query,
+  fragmento, barras dobles y final);
+- `extract_json_from_plain_text` sobre respuestas grandes, JSON puro y rodeado de texto
+  (camino del regex);
+- `validar_y_normalizar_salida` sobre miles de registros, con y sin digest;
+- `_formatear_articulos` sobre todo el corpus, en bloques del tamaño de un prompt;
+- `_aggregate_articles_by_ministerio` sobre todo el corpus.
+
+Cada caso se corre --repeticiones veces y se reporta la mediana como ops/s (una op =
+un artículo, link, registro, página o respuesta según el caso) junto con su ruido (desvío
+absoluto mediano relativo), más el pico de memoria de una corrida aparte con tracemalloc
+(que la enlentece).
+
+Con --guardar-baseline el resultado queda como referencia (BASELINE_FILE); con --solo sólo
+se reemplazan esos casos en la baseline existente. En las corridas siguientes se compara
+contra ella: un caso regresiona si pierde más de --umbral de ops/s (más FACTOR_RUIDO veces
+el ruido medido en ambas corridas, hasta TOLERANCIA_MAX veces --umbral) o sube más de
+--umbral-memoria su pico. Los casos que
+regresionan se vuelven a medir --reintentos veces antes de fallar. Sale con código 1 si hay
+regresiones y 2 si no hay baseline. La baseline depende de la máquina: hay que generarla en
+la misma en la que corre el gate.
+
+    python -m benchmarks.micro --guardar-baseline
+    python -m benchmarks.micro                      # gate contra la baseline
+    python -m benchmarks.micro --solo normalize_url filter_relevant_links --articulos 20000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.bench_pipeline import RESULTS_DIR, _git_commit
+from clasificador.config import INPUT_FILE
+from clasificador.openrouter_client import extract_json_from_plain_text
+from clasificador.pipeline_classificador import validar_y_normalizar_salida
+from clasificador.schema import MINISTERIOS_VALIDOS
+from newsScraper import _normalize_url, filter_relevant_links, parse_jsonld_html
+from summarizer.eval_metrics import ArticleRecord, _aggregate_articles_by_ministerio
+from summarizer.pipeline_summarizer import _formatear_articulos
+from utils.json_utils import write_json_atomic
+
+BASELINE_FILE = RESULTS_DIR / "micro_baseline.json"
+ARTICULOS = 100_000
+MUESTRA_HTML = 1_000
+REGISTROS_VALIDAR = 10_000
+ITEMS_RESPUESTA = 500        # items por respuesta del modelo en extract_json
+RESPUESTAS = 20
+BLOQUE_FORMATEO = 200        # artículos por prompt del summarizer
+REPETICIONES = 9
+REINTENTOS = 1               # nuevas mediciones de un caso que regresiona antes de fallar
+UMBRAL = 0.15                # caída de ops/s tolerada
+FACTOR_RUIDO = 3.0           # el ruido medido (base + actual) se suma al umbral con este peso
+TOLERANCIA_MAX = 2.0         # ... pero la caída tolerada nunca supera este múltiplo del umbral
+RUIDO_ALTO = 0.10            # ruido a partir del cual se sugiere subir --repeticiones
+UMBRAL_MEMORIA = 0.25        # suba del pico de memoria tolerada
+MEMORIA_MIN_MB = 1.0         # diferencias de memoria menores se ignoran
+# Parámetros que tienen que coincidir para que dos corridas sean comparables
+CLAVES_COMPARABLES = ("articulos", "muestra_html", "semilla", "dataset_sha256", "python", "maquina")
+
+_MINISTERIOS = sorted(MINISTERIOS_VALIDOS)
+
+
+@dataclass
+class Caso:
+    nombre: str
+    funcion: str
+    ops: int
+    correr: Callable[[], Any]
+
+
+# -------------------------------
+# Corpus sintético
+# -------------------------------
+
+def _variar_link(link: str, i: int, rng: random.Random) -> str:
+    """Link único por artículo, con las variantes que `_normalize_url` debe absorber."""
+    base, punto, ext = link.rpartition(".")
+    link = f"{base}-{i}.{ext}" if punto and "/" not in ext else f"{link.rstrip('/')}/{i}"
+    sorteo = rng.random()
+    if sorteo < 0.2:
+        link += f"?utm_source=rss&utm_medium={i % 7}"
+    elif sorteo < 0.3:
+        link += "#comentarios"
+    elif sorteo < 0.4:
+        link = link.replace("/", "//", 4).replace(":////", "://", 1)
+    elif sorteo < 0.5:
+        link += "/"
+    return link
+
+
+def escalar_corpus(base: List[Dict], n: int, semilla: int = 1234) -> List[Dict]:
+    """
+    `n` artículos a partir de `base`: los textos se comparten (no se copian), el título y el
+    link se vuelven únicos y se sortean 1-2 ministerios y, en un tercio, un digest.
+    """
+    rng = random.Random(semilla)
+    corpus = []
+    for i in range(n):
+        a = base[i % len(base)]
+        articulo = dict(a)
+        articulo["Titulo"] = f"{a.get('Titulo') or ''} ({i})"
+        articulo["Link"] = _variar_link(a.get("Link") or f"https://example.com/nota/{i}", i, rng)
+        articulo["ministerio"] = rng.sample(_MINISTERIOS, rng.choice((1, 1, 1, 2)))
+        if i % 3 == 0:
+            frases = [f.strip() for f in (a.get("Descripcion") or "").split(".") if f.strip()]
+            articulo["digest"] = {
+                "hechos": frases[:3],
+                "cifras": [f"{rng.randint(1, 999)}%"],
+                "actores": [a.get("Autor") or "Gobierno nacional"],
+            }
+        corpus.append(articulo)
+    return corpus
+
+
+def _pagina_html(articulo: Dict) -> str:
+    """Página con el bloque JSON-LD y algo del marcado que rodea a una nota real."""
+    jsonld = {
+        "@context": "https://schema.org",
+        "@type": "NewsArticle",
+        "headline": articulo.get("Titulo"),
+        "description": articulo.get("Descripcion"),
+        "articleBody": articulo.get("Cuerpo") or "",
+        "datePublished": articulo.get("Fecha"),
+        "author": [{"@type": "Person", "name": articulo.get("Autor") or ""}],
+        "publisher": {"@type": "Organization", "name": articulo.get("Fuente") or ""},
+        "url": articulo.get("Link"),
+    }
+    bloque = json.dumps(jsonld, ensure_ascii=False).replace("</", "<\\/")
+    navegacion = "".join(f'<li><a href="/seccion/{s}">{s}</a></li>' for s in range(40))
+    parrafos = "".join(f"<p>{p}</p>" for p in (articulo.get("Cuerpo") or "").split(". ")[:30])
+    return (
+        '<html><head><meta charset="utf-8">'
+        '<script type="application/ld+json">{"@type": "WebSite", "name": "Diario"}</script>'
+        f'<script type="application/ld+json">{bloque}</script>'
+        f"</head><body><nav><ul>{navegacion}</ul></nav><article><h1>{articulo.get('Titulo')}</h1>"
+        f"{parrafos}</article></body></html>"
+    )
+
+
+def _respuesta_modelo(corpus: List[Dict], inicio: int, rng: random.Random) -> List[Dict]:
+    items = []
+    for j in range(ITEMS_RESPUESTA):
+        a = corpus[(inicio + j) % len(corpus)]
+        ministerios = list(a["ministerio"])
+        if rng.random() < 0.2:
+            ministerios += [ministerios[0], "Cultura"]  # duplicados e inválidos a normalizar
+        items.append({
+            "idx": inicio + j,
+            "ministerio": ministerios,
+            "digest": a.get("digest") or {"hechos": [a.get("Titulo") or ""], "cifras": [], "actores": []},
+        })
+    return items
+
+
+# -------------------------------
+# Casos
+# -------------------------------
+
+def armar_casos(corpus: List[Dict], muestra_html: int = MUESTRA_HTML, semilla: int = 1234) -> List[Caso]:
+    rng = random.Random(semilla)
+    links = [a["Link"] for a in corpus]
+    paginas = [(_pagina_html(a), a["Link"]) for a in corpus[:muestra_html]]
+    respuestas = [_respuesta_modelo(corpus, i * ITEMS_RESPUESTA, rng) for i in range(RESPUESTAS)]
+    textos_json = [json.dumps(r, ensure_ascii=False) for r in respuestas]
+    textos_prosa = [f"Claro, acá está la clasificación:\n```json\n{t}\n```\nAvisame si necesitás algo más."
+                    for t in textos_json]
+    registros = [item for r in respuestas for item in r][:REGISTROS_VALIDAR]
+    registros_sin_digest = [{"idx": r["idx"], "ministerio": r["ministerio"]} for r in registros]
+    bloques = [corpus[i:i + BLOQUE_FORMATEO] for i in range(0, len(corpus), BLOQUE_FORMATEO)]
+    records = [ArticleRecord(a["ministerio"], a.get("Cuerpo") or a["Titulo"]) for a in corpus]
+
+    def _formatear():
+        for bloque in bloques:
+            _formatear_articulos(bloque)
+
+    return [
+        Caso("parse_jsonld_html", "newsScraper.parse_jsonld_html", len(paginas),
+             lambda: [parse_jsonld_html(html, url) for html, url in paginas]),
+        Caso("normalize_url", "newsScraper._normalize_url", len(links),
+             lambda: [_normalize_url(u) for u in links]),
+        Caso("filter_relevant_links", "newsScraper.filter_relevant_links", len(links),
+             lambda: filter_relevant_links(links)),
+        Caso("extract_json.json", "clasificador.openrouter_client.extract_json_from_plain_text",
+             len(textos_json), lambda: [extract_json_from_plain_text(t) for t in textos_json]),
+        Caso("extract_json.texto", "clasificador.openrouter_client.extract_json_from_plain_text",
+             len(textos_prosa), lambda: [extract_json_from_plain_text(t) for t in textos_prosa]),
+        Caso("validar_salida", "clasificador.pipeline_classificador.validar_y_normalizar_salida",
+             len(registros_sin_digest), lambda: validar_y_normalizar_salida(registros_sin_digest)),
+        Caso("validar_salida.digest", "clasificador.pipeline_classificador.validar_y_normalizar_salida",
+             len(registros), lambda: validar_y_normalizar_salida(registros, con_digest=True)),
+        Caso("formatear_articulos", "summarizer.pipeline_summarizer._formatear_articulos",
+             len(corpus), _formatear),
+        Caso("aggregate_por_ministerio", "summarizer.eval_metrics._aggregate_articles_by_ministerio",
+             len(records), lambda: _aggregate_articles_by_ministerio(records)),
+    ]
+
+
+def medir(caso: Caso, repeticiones: int) -> Dict[str, Any]:
+    """Mediana (y ruido) de `repeticiones` corridas y pico de memoria de una corrida con tracemalloc."""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        t0 = time.perf_counter()
+        caso.correr()
+        tiempos.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        caso.correr()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    mediana = statistics.median(tiempos)
+    ruido = statistics.median(abs(t - mediana) for t in tiempos) / mediana if mediana else 0.0
+    return {
+        "caso": caso.nombre,
+        "funcion": caso.funcion,
+        "ops": caso.ops,
+        "mejor_s": round(min(tiempos), 6),
+        "mediana_s": round(mediana, 6),
+        "ops_por_s": round(caso.ops / mediana, 1) if mediana else 0.0,
+        "ruido": round(ruido, 4),
+        "pico_mb": round(pico / 1e6, 2),
+    }
+
+
+def preparar_casos(
+    input_file: str = INPUT_FILE,
+    articulos: int = ARTICULOS,
+    muestra_html: int = MUESTRA_HTML,
+    solo: Optional[List[str]] = None,
+    semilla: int = 1234,
+) -> Tuple[List[Caso], str]:
+    """Casos sobre el corpus sintético (filtrados por `solo`) y el sha256 del dataset base."""
+    dataset = Path(input_file).read_bytes()
+    corpus = escalar_corpus(json.loads(dataset), articulos, semilla)
+    casos = armar_casos(corpus, muestra_html, semilla)
+    if solo:
+        desconocidos = set(solo) - {c.nombre for c in casos}
+        if desconocidos:
+            raise ValueError(f"Casos desconocidos: {', '.join(sorted(desconocidos))}")
+        casos = [c for c in casos if c.nombre in solo]
+    return casos, hashlib.sha256(dataset).hexdigest()
+
+
+def medir_casos(casos: List[Caso], repeticiones: int, verbose: bool = True) -> List[Dict[str, Any]]:
+    resultados = []
+    for caso in casos:
+        r = medir(caso, repeticiones)
+        if verbose:
+            print(f"   {r['caso']:<26} {r['ops_por_s']:>14,.1f} ops/s ±{r['ruido']:>6.1%}"
+                  f"  {r['pico_mb']:>9.1f} MB")
+        resultados.append(r)
+    return resultados
+
+
+def _meta(input_file: str, dataset_sha256: str, articulos: int, muestra_html: int,
+          repeticiones: int, semilla: int) -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "dataset": input_file,
+        "dataset_sha256": dataset_sha256,
+        "articulos": articulos,
+        "muestra_html": muestra_html,
+        "repeticiones": repeticiones,
+        "semilla": semilla,
+    }
+
+
+def correr_micro(
+    input_file: str = INPUT_FILE,
+    articulos: int = ARTICULOS,
+    repeticiones: int = REPETICIONES,
+    muestra_html: int = MUESTRA_HTML,
+    solo: Optional[List[str]] = None,
+    semilla: int = 1234,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    casos, sha = preparar_casos(input_file, articulos, muestra_html, solo, semilla)
+    return {
+        "casos": medir_casos(casos, repeticiones, verbose),
+        "meta": _meta(input_file, sha, articulos, muestra_html, repeticiones, semilla),
+    }
+
+
+# -------------------------------
+# Gate de regresión
+# -------------------------------
+
+def comparar_con_baseline(
+    resultado: Dict[str, Any],
+    baseline: Dict[str, Any],
+    umbral: float = UMBRAL,
+    umbral_memoria: float = UMBRAL_MEMORIA,
+) -> List[Dict[str, Any]]:
+    """
+    Una fila por caso presente en ambos, con los deltas y si es una regresión. La caída de
+    ops/s tolerada es `umbral` más FACTOR_RUIDO veces el ruido de la baseline y de la corrida,
+    acotada a TOLERANCIA_MAX veces `umbral` para que una medición ruidosa no apague el gate.
+    """
+    base = {c["caso"]: c for c in baseline["casos"]}
+    filas = []
+    for c in resultado["casos"]:
+        b = base.get(c["caso"])
+        if b is None:
+            continue
+        delta_ops = (c["ops_por_s"] - b["ops_por_s"]) / b["ops_por_s"] if b["ops_por_s"] else 0.0
+        delta_mb = c["pico_mb"] - b["pico_mb"]
+        delta_mem = delta_mb / b["pico_mb"] if b["pico_mb"] else 0.0
+        ruido = max(b.get("ruido", 0.0), c.get("ruido", 0.0))
+        tolerancia = min(
+            umbral + FACTOR_RUIDO * (b.get("ruido", 0.0) + c.get("ruido", 0.0)),
+            TOLERANCIA_MAX * umbral,
+        )
+        motivos = []
+        if delta_ops < -tolerancia:
+            motivos.append("ops/s")
+        if delta_mem > umbral_memoria and delta_mb > MEMORIA_MIN_MB:
+            motivos.append("memoria")
+        filas.append({
+            "caso": c["caso"],
+            "ops_base": b["ops_por_s"],
+            "ops": c["ops_por_s"],
+            "delta_ops": round(delta_ops, 4),
+            "tolerancia": round(tolerancia, 4),
+            "ruido": round(ruido, 4),
+            "mb_base": b["pico_mb"],
+            "mb": c["pico_mb"],
+            "delta_memoria": round(delta_mem, 4),
+            "regresion": motivos,
+        })
+    return filas
+
+
+def imprimir_comparacion(filas: List[Dict[str, Any]], resultado: Dict, baseline: Dict) -> None:
+    print("════════════════════════════════════════")
+    print(f" Micro-benchmarks {baseline['meta']['commit']} → {resultado['meta']['commit']} ⏱️ ")
+    print("════════════════════════════════════════")
+    for clave in CLAVES_COMPARABLES:
+        if baseline["meta"].get(clave) != resultado["meta"].get(clave):
+            print(f"⚠ Aviso: {clave} distinto de la baseline ({baseline['meta'].get(clave)} → "
+                  f"{resultado['meta'].get(clave)}).")
+    print(f"{'Caso':<26} {'ops/s base':>13} {'ops/s':>13} {'Δ':>8} {'tol.':>7} "
+          f"{'MB base':>9} {'MB':>9} {'Δ':>8}")
+    for f in filas:
+        marca = f"  ✗ {', '.join(f['regresion'])}" if f["regresion"] else ""
+        print(f"{f['caso']:<26} {f['ops_base']:>13,.1f} {f['ops']:>13,.1f} {f['delta_ops']:>+8.1%} "
+              f"{-f['tolerancia']:>7.1%} {f['mb_base']:>9.1f} {f['mb']:>9.1f} "
+              f"{f['delta_memoria']:>+8.1%}{marca}")
+    ruidosos = [f["caso"] for f in filas if f["ruido"] > RUIDO_ALTO]
+    if ruidosos:
+        print(f"⚠ Aviso: ruido mayor a {RUIDO_ALTO:.0%} en {', '.join(ruidosos)}; la tolerancia quedó "
+              f"acotada a {TOLERANCIA_MAX:g}× el umbral: subir --repeticiones (también al guardar la baseline).")
+    print("════════════════════════════════════════")
+
+
+def _quedarse_con_mejor(actual: Dict[str, Any], nueva: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Tras re-medir un caso: la medición de tiempo más rápida y el menor pico de memoria."""
+    if nueva is None:
+        return actual
+    mejor = dict(nueva if nueva["ops_por_s"] > actual["ops_por_s"] else actual)
+    mejor["pico_mb"] = min(actual["pico_mb"], nueva["pico_mb"])
+    return mejor
+
+
+def fusionar_baseline(baseline: Dict[str, Any], resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """Reemplaza en `baseline` los casos medidos en `resultado` (corrida con --solo)."""
+    nuevos = {c["caso"]: c for c in resultado["casos"]}
+    casos = [nuevos.pop(c["caso"], c) for c in baseline["casos"]]
+    casos.extend(nuevos.values())
+    return {"casos": casos, "meta": resultado["meta"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de CPU con gate de regresión.")
+    parser.add_argument("--input", default=INPUT_FILE, help="Dataset base de artículos (JSON).")
+    parser.add_argument("--articulos", type=int, default=ARTICULOS, help="Tamaño del corpus sintético.")
+    parser.add_argument("--muestra-html", type=int, default=MUESTRA_HTML, help="Páginas para parse_jsonld_html.")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES,
+                        help="Corridas por caso (se toma la mediana).")
+    parser.add_argument("--reintentos", type=int, default=REINTENTOS,
+                        help="Veces que se vuelve a medir un caso que regresiona antes de fallar.")
+    parser.add_argument("--solo", nargs="*", default=None, metavar="CASO", help="Corre sólo estos casos.")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Archivo de baseline.")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda el resultado como baseline.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL, help="Caída de ops/s tolerada (0.15 = 15%%).")
+    parser.add_argument("--umbral-memoria", type=float, default=UMBRAL_MEMORIA,
+                        help="Suba del pico de memoria tolerada.")
+    parser.add_argument("--salida", default=None, help="Guarda también el resultado en este JSON.")
+    args = parser.parse_args(argv)
+
+    print(f"Corpus sintético de {args.articulos} artículos a partir de {args.input}")
+    try:
+        casos, sha = preparar_casos(args.input, args.articulos, args.muestra_html, args.solo, args.semilla)
+    except ValueError as exc:
+        parser.error(str(exc))
+    resultado = {
+        "casos": medir_casos(casos, args.repeticiones),
+        "meta": _meta(args.input, sha, args.articulos, args.muestra_html, args.repeticiones, args.semilla),
+    }
+    baseline_path = Path(args.baseline)
+    if args.guardar_baseline:
+        if args.salida:
+            write_json_atomic(Path(args.salida), resultado)
+            print(f"→ Resultado en {args.salida}")
+        if args.solo and baseline_path.exists():
+            previa = json.loads(baseline_path.read_text(encoding="utf-8"))
+            distintas = [c for c in CLAVES_COMPARABLES if previa["meta"].get(c) != resultado["meta"].get(c)]
+            if distintas:
+                print(f"✗ La baseline existente usa otros parámetros ({', '.join(distintas)}): "
+                      f"regenerarla completa, sin --solo.")
+                return 2
+            resultado = fusionar_baseline(previa, resultado)
+        write_json_atomic(baseline_path, resultado)
+        print(f"→ Baseline guardada en {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"✗ Sin baseline en {baseline_path}: generarla con --guardar-baseline.")
+        return 2
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    filas = comparar_con_baseline(resultado, baseline, args.umbral, args.umbral_memoria)
+    for _ in range(args.reintentos):
+        regresiones = {f["caso"] for f in filas if f["regresion"]}
+        if not regresiones:
+            break
+        print(f"↻ Re-midiendo antes de fallar: {', '.join(sorted(regresiones))}")
+        nuevas = {r["caso"]: r for r in medir_casos([c for c in casos if c.nombre in regresiones],
+                                                      args.repeticiones)}
+        resultado["casos"] = [_quedarse_con_mejor(r, nuevas.get(r["caso"])) for r in resultado["casos"]]
+        filas = comparar_con_baseline(resultado, baseline, args.umbral, args.umbral_memoria)
+    if args.salida:
+        write_json_atomic(Path(args.salida), resultado)
+        print(f"→ Resultado en {args.salida}")
+    imprimir_comparacion(filas, resultado, baseline)
+    regresiones = [f["caso"] for f in filas if f["regresion"]]
+    if regresiones:
+        print(f"✗ Regresión en {len(regresiones)} caso(s): {', '.join(regresiones)}")
+        return 1
+    print("✓ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
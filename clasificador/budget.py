@@ -0,0 +1,319 @@
+"""
+Gobernador de presupuesto compartido para las llamadas a OpenRouter.
+
+Clasificador y summarizer (y sus threads / procesos) pasan por `call_openrouter_api`,
+que antes de cada request pide una reserva al gobernador:
+- requests por minuto (RPM) y tokens por minuto (TPM) en una ventana deslizante de 60 s;
+- costo acumulado en USD según el precio por millón de tokens del modelo;
+- pausas globales: un 429 con Retry-After frena a todos los llamadores, no sólo al que lo recibió.
+
+El estado vive en una base SQLite local (BUDGET_DB): cada reserva es una transacción
+`BEGIN IMMEDIATE`, así que el límite se respeta aunque corran varios procesos a la vez.
+Si no hay cupo, la reserva espera (encola) hasta que se libere; si se superó el costo
+máximo lanza PresupuestoAgotado.
+
+Los límites se configuran por entorno (0 = sin límite):
+    OPENROUTER_RPM, OPENROUTER_TPM, OPENROUTER_MAX_COSTO_USD,
+    OPENROUTER_PRECIO_PROMPT_1M, OPENROUTER_PRECIO_COMPLETION_1M, OPENROUTER_BUDGET_DB
+
+Uso:
+    python -m clasificador.budget estado
+    python -m clasificador.budget reiniciar
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils import metrics
+
+BUDGET_DB = os.getenv("OPENROUTER_BUDGET_DB", "./data/outputs/.presupuesto.db")
+RPM = int(os.getenv("OPENROUTER_RPM", "0"))
+TPM = int(os.getenv("OPENROUTER_TPM", "0"))
+MAX_COSTO_USD = float(os.getenv("OPENROUTER_MAX_COSTO_USD", "0"))
+PRECIO_PROMPT_1M = float(os.getenv("OPENROUTER_PRECIO_PROMPT_1M", "0"))
+PRECIO_COMPLETION_1M = float(os.getenv("OPENROUTER_PRECIO_COMPLETION_1M", "0"))
+# Tokens de respuesta que se reservan antes de conocer el consumo real
+COMPLETION_ESTIMADA = int(os.getenv("OPENROUTER_COMPLETION_ESTIMADA", "800"))
+
+VENTANA_S = 60.0
+ESPERA_MAX_S = 5.0  # la espera se hace por tramos para reevaluar el cupo
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ventana (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts     REAL NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ventana_ts ON ventana(ts);
+CREATE TABLE IF NOT EXISTS acumulado (
+    id                INTEGER PRIMARY KEY CHECK (id = 1),
+    requests          INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens     INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    costo_usd         REAL NOT NULL DEFAULT 0,
+    pausa_hasta       REAL NOT NULL DEFAULT 0,
+    espera_total_s    REAL NOT NULL DEFAULT 0,
+    desde             REAL NOT NULL
+);
+"""
+
+
+class PresupuestoAgotado(RuntimeError):
+    """Se alcanzó OPENROUTER_MAX_COSTO_USD: no se envían más requests."""
+
+
+def estimar_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimación gruesa (≈ 4 caracteres por token) de los tokens de prompt."""
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+class BudgetGovernor:
+    def __init__(
+        self,
+        path: str = BUDGET_DB,
+        rpm: int = RPM,
+        tpm: int = TPM,
+        max_costo_usd: float = MAX_COSTO_USD,
+        precio_prompt_1m: float = PRECIO_PROMPT_1M,
+        precio_completion_1m: float = PRECIO_COMPLETION_1M,
+    ):
+        self.path = Path(path)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_costo_usd = max_costo_usd
+        self.precio_prompt_1m = precio_prompt_1m
+        self.precio_completion_1m = precio_completion_1m
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO acumulado (id, desde) VALUES (1, ?)", (time.time(),)
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _transaccion(self, func):
+        """Ejecuta `func(cursor)` con la base bloqueada para escritura (entre procesos)."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = func(cur)
+                cur.execute("COMMIT")
+                return resultado
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    def costo(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens * self.precio_prompt_1m + completion_tokens * self.precio_completion_1m
+        ) / 1_000_000
+
+    def _espera_necesaria(self, cur, ahora: float, tokens: int) -> float:
+        cur.execute("DELETE FROM ventana WHERE ts < ?", (ahora - VENTANA_S,))
+        pausa_hasta, costo = cur.execute(
+            "SELECT pausa_hasta, costo_usd FROM acumulado WHERE id = 1"
+        ).fetchone()
+        if self.max_costo_usd and costo >= self.max_costo_usd:
+            raise PresupuestoAgotado(
+                f"Costo acumulado US$ {costo:.4f} ≥ límite US$ {self.max_costo_usd:.4f}"
+            )
+        if pausa_hasta > ahora:
+            return pausa_hasta - ahora
+        filas = cur.execute("SELECT ts, tokens FROM ventana ORDER BY ts").fetchall()
+        espera = 0.0
+        if self.rpm and len(filas) >= self.rpm:
+            # Hay que esperar a que venza la request que deja lugar para una más
+            espera = filas[len(filas) - self.rpm][0] + VENTANA_S - ahora
+        if self.tpm and filas:
+            usados = sum(t for _, t in filas)
+            # Un pedido más grande que el TPM entero sólo espera a que la ventana quede vacía
+            limite = max(self.tpm - tokens, 0)
+            for ts, t in filas:
+                if usados <= limite:
+                    break
+                usados -= t
+                espera = max(espera, ts + VENTANA_S - ahora)
+        return max(espera, 0.0)
+
+    def reservar(self, tokens_estimados: int) -> int:
+        """Bloquea hasta que haya cupo y registra la request; devuelve el id de la reserva."""
+        esperado = 0.0
+        while True:
+            def _intentar(cur):
+                ahora = time.time()
+                espera = self._espera_necesaria(cur, ahora, tokens_estimados)
+                if espera > 0:
+                    return None, espera
+                cur.execute(
+                    "INSERT INTO ventana (ts, tokens) VALUES (?, ?)", (ahora, tokens_estimados)
+                )
+                reserva = cur.lastrowid
+                cur.execute(
+                    "UPDATE acumulado SET requests = requests + 1, "
+                    "espera_total_s = espera_total_s + ? WHERE id = 1",
+                    (esperado,),
+                )
+                return reserva, 0.0
+
+            reserva, espera = self._transaccion(_intentar)
+            if reserva is not None:
+                if esperado:
+                    metrics.incr("budget_espera_segundos", round(esperado, 3))
+                return reserva
+            tramo = min(espera, ESPERA_MAX_S)
+            time.sleep(tramo)
+            esperado += tramo
+
+    def confirmar(self, reserva: int, prompt_tokens: int, completion_tokens: int) -> float:
+        """Reemplaza la estimación por el consumo real y suma el costo; devuelve el costo."""
+        costo = self.costo(prompt_tokens, completion_tokens)
+
+        def _actualizar(cur):
+            cur.execute(
+                "UPDATE ventana SET tokens = ? WHERE id = ?",
+                (prompt_tokens + completion_tokens, reserva),
+            )
+            cur.execute(
+                "UPDATE acumulado SET prompt_tokens = prompt_tokens + ?, "
+                "completion_tokens = completion_tokens + ?, costo_usd = costo_usd + ? WHERE id = 1",
+                (prompt_tokens, completion_tokens, costo),
+            )
+
+        self._transaccion(_actualizar)
+        if costo:
+            metrics.incr("llm_costo_usd", costo)
+        return costo
+
+    def pausar(self, segundos: float) -> None:
+        """Frena a todos los llamadores durante `segundos` (p. ej. tras un 429 con Retry-After)."""
+        hasta = time.time() + segundos
+        self._transaccion(lambda cur: cur.execute(
+            "UPDATE acumulado SET pausa_hasta = MAX(pausa_hasta, ?) WHERE id = 1", (hasta,)
+        ))
+        metrics.incr("budget_pausas")
+
+    def estado(self) -> Dict[str, Any]:
+        """Uso de la ventana actual y acumulados, con la utilización de cada límite."""
+        def _leer(cur):
+            ahora = time.time()
+            cur.execute("DELETE FROM ventana WHERE ts < ?", (ahora - VENTANA_S,))
+            n, tokens = cur.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM ventana"
+            ).fetchone()
+            fila = cur.execute(
+                "SELECT requests, prompt_tokens, completion_tokens, costo_usd, pausa_hasta, "
+                "espera_total_s, desde FROM acumulado WHERE id = 1"
+            ).fetchone()
+            return ahora, n, tokens, fila
+
+        ahora, n, tokens, fila = self._transaccion(_leer)
+        requests, prompt_t, completion_t, costo, pausa_hasta, espera, desde = fila
+
+        def _uso(valor, limite):
+            return round(100.0 * valor / limite, 1) if limite else None
+
+        return {
+            "rpm": {"usado": n, "limite": self.rpm or None, "utilizacion_pct": _uso(n, self.rpm)},
+            "tpm": {"usado": tokens, "limite": self.tpm or None, "utilizacion_pct": _uso(tokens, self.tpm)},
+            "costo_usd": {
+                "usado": round(costo, 6),
+                "limite": self.max_costo_usd or None,
+                "utilizacion_pct": _uso(costo, self.max_costo_usd),
+            },
+            "acumulado": {
+                "requests": requests,
+                "prompt_tokens": prompt_t,
+                "completion_tokens": completion_t,
+                "espera_total_s": round(espera, 2),
+                "desde": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(desde)),
+            },
+            "pausa_restante_s": round(max(pausa_hasta - ahora, 0.0), 2),
+        }
+
+    def reiniciar(self) -> None:
+        """Borra la ventana y los acumulados (p. ej. al empezar un nuevo período de facturación)."""
+        def _borrar(cur):
+            cur.execute("DELETE FROM ventana")
+            cur.execute("DELETE FROM acumulado")
+            cur.execute("INSERT INTO acumulado (id, desde) VALUES (1, ?)", (time.time(),))
+
+        self._transaccion(_borrar)
+
+
+_governor: Optional[BudgetGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def obtener_governor() -> BudgetGovernor:
+    """Instancia compartida por todos los threads del proceso (configurada por entorno)."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BudgetGovernor()
+        return _governor
+
+
+def estado_actual() -> Optional[Dict[str, Any]]:
+    """Estado del gobernador del proceso, o None si todavía no se hizo ninguna llamada."""
+    return _governor.estado() if _governor is not None else None
+
+
+def imprimir_estado(estado: Dict[str, Any]) -> None:
+    print("════════════════════════════════════════")
+    print(" Presupuesto OpenRouter 💰 ")
+    print("════════════════════════════════════════")
+    for clave, etiqueta in (("rpm", "Requests/min"), ("tpm", "Tokens/min"), ("costo_usd", "Costo USD")):
+        r = estado[clave]
+        limite = r["limite"] if r["limite"] is not None else "sin límite"
+        uso = f" ({r['utilizacion_pct']}%)" if r["utilizacion_pct"] is not None else ""
+        print(f"{etiqueta:<17} {r['usado']} / {limite}{uso}")
+    a = estado["acumulado"]
+    print("────────────────────────────────────────")
+    print(f"Desde:            {a['desde']}")
+    print(f"Requests:         {a['requests']}")
+    print(f"Tokens:           {a['prompt_tokens']} prompt + {a['completion_tokens']} completion")
+    print(f"Espera acumulada: {a['espera_total_s']}s")
+    if estado["pausa_restante_s"]:
+        print(f"⏸ Pausa global:   {estado['pausa_restante_s']}s restantes")
+    print("════════════════════════════════════════")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Estado del presupuesto compartido de OpenRouter.")
+    parser.add_argument("--db", default=BUDGET_DB, help="Base SQLite del gobernador.")
+    parser.add_argument("--json", action="store_true", help="Imprime el estado como JSON.")
+    parser.add_argument("comando", choices=["estado", "reiniciar"])
+    args = parser.parse_args(argv)
+
+    governor = BudgetGovernor(args.db)
+    try:
+        if args.comando == "reiniciar":
+            governor.reiniciar()
+            print(f"Presupuesto reiniciado en {args.db}")
+            return 0
+        estado = governor.estado()
+        if args.json:
+            print(json.dumps(estado, ensure_ascii=False, indent=2))
+        else:
+            imprimir_estado(estado)
+        return 0
+    finally:
+        governor.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
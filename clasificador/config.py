@@ -5,3 +5,31 @@ LOTE = 20
 TEMPERATURE = 0.2
 TIMEOUT = 600
 TOP_P = 0.9
+
+# Modo combinado clasificación + digest por artículo (ver CLASIF_DIGEST_PROMPT_USER)
+DIGEST = False
+# Con digest el cuerpo se envía hasta este largo (sin digest, 2000 caracteres alcanzan para
+# clasificar): el summarizer usa el digest en lugar del cuerpo, así que lo que quede afuera
+# no llega a los resúmenes. Cuerpos más largos se resumen con el texto completo.
+DIGEST_CUERPO_MAX_CHARS = 12000
+
+# Prompt con prefijo estable y tabla compacta de items (ver prompt_builder.py). Apagado
+# por defecto: cambia el formato de respuesta del modelo y su calidad de clasificación
+# todavía no se comparó con la del payload JSON original (variantes "formato" de experimentos.py)
+PROMPT_COMPACTO = False
+
+# Al escribir OUTPUT_FILE genera también <json>.idx + <json>.blob (utils/article_index.py),
+# que el summarizer y la evaluación usan para no cargar todos los cuerpos
+INDICE_ARTICULOS = True
+
+# Filtro previo al LLM (ver filtro.py): salida de la etapa "filtro" del orquestador
+FILTRADAS_FILE = "./data/noticias_filtradas.json"
+FILTRO_MIN_PALABRAS = 25          # cuerpo más corto → "corto"
+FILTRO_MIN_PALABRAS_EN_VIVO = 150  # notas "en vivo"/"minuto a minuto" más cortas → "en_vivo"
+FILTRO_MAX_BOILERPLATE = 0.5      # proporción del cuerpo en frases de relleno → "boilerplate"
+FILTRO_MIN_STOPWORDS_IDIOMA = 8   # mínimo de palabras funcionales para decidir el idioma
+# Secciones fuera de tema (primer segmento del path o subdominio)
+FILTRO_SECCIONES_DESCARTADAS = [
+    "deportes", "espectaculos", "show", "fama", "horoscopo", "autos", "moda",
+    "gastronomia", "viajes", "juegos", "loterias", "quinielas", "videos",
+]
@@ -0,0 +1,324 @@
+"""
+Pool de endpoints (API keys y servidores compatibles con OpenAI) para las llamadas al LLM.
+
+Clasificador y summarizer pasan por `call_openrouter_api`, que en cada request elige un
+endpoint del pool:
+- "ponderado": round-robin ponderado suave (cada endpoint recibe requests en proporción
+  a su `peso`, intercalados);
+- "menos_cargado": el de menos requests en vuelo por unidad de peso.
+
+Una request que falla por el endpoint (429, 5xx, timeout o error de conexión) se reintenta
+en otro endpoint del pool antes de contar como error del modelo. Un endpoint con
+EYECCION_ERRORES errores seguidos de ese tipo queda eyectado EYECCION_S segundos, el doble en cada eyección consecutiva (hasta
+EYECCION_MAX_S); un 429 con Retry-After lo enfría ese tiempo. Si todos están fuera, se
+usa el que vuelve antes. Los 4xx restantes son problemas de la request, no del endpoint.
+
+Configuración por entorno:
+    OPENROUTER_ENDPOINTS  ruta a un JSON o JSON inline con la lista de endpoints:
+        [{"nombre": "key-a", "key": "$OPENROUTER_API_KEY", "peso": 2},
+         {"nombre": "key-b", "key": "$OPENROUTER_API_KEY_B"},
+         {"nombre": "local", "url": "http://127.0.0.1:8000/v1/chat/completions",
+          "modelos": ["qwen2.5-7b-instruct"]}]
+      `url` por defecto es OPENROUTER_API_URL; una `key` "$VAR" se lee del entorno (sin key
+      no se envía Authorization); `modelos` restringe el endpoint a esos modelos (servidores
+      locales): sólo recibe requests de un modelo de la lista (p. ej. vía
+      OPENROUTER_FALLBACK_MODELS o `modelo=`). Sin `modelos` atiende cualquiera.
+      Sin OPENROUTER_ENDPOINTS el pool tiene un único endpoint: OPENROUTER_API_URL/KEY.
+    OPENROUTER_ENDPOINTS_ESTRATEGIA, OPENROUTER_EYECCION_ERRORES, OPENROUTER_EYECCION_S
+
+El gobernador de presupuesto (clasificador.budget) sigue siendo global: con varias keys,
+OPENROUTER_RPM/TPM deben ser la suma de sus límites.
+
+Uso:
+    python -m clasificador.endpoints   # lista los endpoints configurados (keys enmascaradas)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Collection, Deque, Dict, List, Optional
+
+from utils import metrics
+
+ENDPOINTS = os.getenv("OPENROUTER_ENDPOINTS", "")
+ESTRATEGIA = os.getenv("OPENROUTER_ENDPOINTS_ESTRATEGIA", "ponderado")  # "ponderado" | "menos_cargado"
+EYECCION_ERRORES = int(os.getenv("OPENROUTER_EYECCION_ERRORES", "3"))
+EYECCION_S = float(os.getenv("OPENROUTER_EYECCION_S", "30"))
+EYECCION_MAX_S = 600.0
+
+ESTRATEGIAS = ("ponderado", "menos_cargado")
+
+
+@dataclass
+class Endpoint:
+    nombre: str
+    url: Optional[str] = None      # None = OPENROUTER_API_URL
+    key: Optional[str] = None      # None = OPENROUTER_API_KEY
+    peso: float = 1.0
+    modelos: Optional[List[str]] = None  # None = atiende cualquier modelo
+    # Estado de salud y routing
+    en_vuelo: int = 0
+    errores_seguidos: int = 0
+    eyecciones_seguidas: int = 0
+    fuera_hasta: float = 0.0
+    _actual: float = 0.0           # peso acumulado del round-robin ponderado suave
+    # Estadísticas
+    requests: int = 0
+    ok: int = 0
+    errores: int = 0
+    status_429: int = 0
+    status_5xx: int = 0
+    fallas_conexion: int = 0
+    eyecciones: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencias: Deque[float] = field(default_factory=lambda: deque(maxlen=500))
+
+    def disponible(self, ahora: float) -> bool:
+        return self.fuera_hasta <= ahora
+
+    def sirve(self, modelo: str) -> bool:
+        return self.modelos is None or modelo in self.modelos
+
+
+def _resolver_key(valor: Optional[str]) -> Optional[str]:
+    if isinstance(valor, str) and valor.startswith("$"):
+        return os.getenv(valor[1:], "")
+    return valor
+
+
+def cargar_endpoints(config: str = ENDPOINTS) -> List[Endpoint]:
+    """Endpoints de OPENROUTER_ENDPOINTS (ruta a un JSON o JSON inline); [] si no hay config."""
+    config = (config or "").strip()
+    if not config:
+        return []
+    texto = config if config.startswith("[") else Path(config).read_text(encoding="utf-8")
+    endpoints = []
+    for i, e in enumerate(json.loads(texto)):
+        peso = float(e.get("peso", 1.0))
+        if peso <= 0:
+            raise ValueError(f"Endpoint {e.get('nombre', i)}: el peso debe ser positivo")
+        endpoints.append(Endpoint(
+            nombre=e.get("nombre") or f"endpoint-{i}",
+            url=e.get("url"),
+            key=_resolver_key(e.get("key", "$OPENROUTER_API_KEY")),
+            peso=peso,
+            modelos=list(e["modelos"]) if e.get("modelos") is not None else None,
+        ))
+    if len({e.nombre for e in endpoints}) != len(endpoints):
+        raise ValueError("Los nombres de OPENROUTER_ENDPOINTS deben ser únicos")
+    return endpoints
+
+
+class PoolEndpoints:
+    def __init__(
+        self,
+        endpoints: Optional[List[Endpoint]] = None,
+        estrategia: str = ESTRATEGIA,
+        eyeccion_errores: int = EYECCION_ERRORES,
+        eyeccion_s: float = EYECCION_S,
+    ):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia desconocida: {estrategia} (opciones: {', '.join(ESTRATEGIAS)})")
+        self.endpoints = endpoints or [Endpoint("openrouter")]
+        self.configurado = endpoints is not None and len(endpoints) > 0
+        self.estrategia = estrategia
+        self.eyeccion_errores = eyeccion_errores
+        self.eyeccion_s = eyeccion_s
+        self._lock = threading.Lock()
+        self._inicio = time.time()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def quedan(self, modelo: str, excluir: Collection[str] = ()) -> bool:
+        """Si hay endpoints que sirven `modelo` fuera de `excluir` (para reintentar la request)."""
+        return any(e.sirve(modelo) and e.nombre not in excluir for e in self.endpoints)
+
+    def elegir(self, modelo: str, excluir: Collection[str] = ()) -> Endpoint:
+        """
+        Elige un endpoint sano que sirva `modelo` según la estrategia y lo marca en vuelo
+        (ver `liberar`), salteando los nombres de `excluir` (ya probados para esta request).
+        """
+        with self._lock:
+            ahora = time.time()
+            posibles = [e for e in self.endpoints if e.sirve(modelo) and e.nombre not in excluir]
+            if not posibles:
+                raise RuntimeError(f"Ningún endpoint (sin probar) sirve el modelo {modelo}")
+            candidatos = [e for e in posibles if e.disponible(ahora)]
+            if not candidatos:
+                candidatos = [min(posibles, key=lambda e: e.fuera_hasta)]
+            if self.estrategia == "menos_cargado":
+                elegido = min(candidatos, key=lambda e: ((e.en_vuelo + 1) / e.peso, e.requests))
+            else:
+                total = sum(e.peso for e in candidatos)
+                for e in candidatos:
+                    e._actual += e.peso
+                elegido = max(candidatos, key=lambda e: e._actual)
+                elegido._actual -= total
+            elegido.en_vuelo += 1
+            elegido.requests += 1
+            return elegido
+
+    def liberar(
+        self,
+        endpoint: Endpoint,
+        status: Optional[int],
+        latencia_s: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Registra el resultado de una request a `endpoint`: `status` HTTP o None si no hubo
+        respuesta (timeout / conexión). Aplica la eyección si corresponde.
+        """
+        falla = status is None or status == 429 or status >= 500
+        with self._lock:
+            endpoint.en_vuelo -= 1
+            if status == 200:
+                endpoint.ok += 1
+                endpoint.latencias.append(latencia_s)
+                endpoint.prompt_tokens += prompt_tokens
+                endpoint.completion_tokens += completion_tokens
+            else:
+                endpoint.errores += 1
+            if status is None:
+                endpoint.fallas_conexion += 1
+            elif status == 429:
+                endpoint.status_429 += 1
+            elif status >= 500:
+                endpoint.status_5xx += 1
+
+            ahora = time.time()
+            if not falla:
+                endpoint.errores_seguidos = 0
+                if status == 200:
+                    endpoint.eyecciones_seguidas = 0
+            else:
+                endpoint.errores_seguidos += 1
+                if endpoint.errores_seguidos >= self.eyeccion_errores:
+                    # Backoff exponencial si vuelve a fallar apenas sale de la eyección
+                    demora = min(self.eyeccion_s * 2 ** endpoint.eyecciones_seguidas, EYECCION_MAX_S)
+                    endpoint.fuera_hasta = max(endpoint.fuera_hasta, ahora + demora)
+                    endpoint.errores_seguidos = 0
+                    endpoint.eyecciones_seguidas += 1
+                    endpoint.eyecciones += 1
+                    metrics.incr("llm_endpoint_eyecciones", endpoint=endpoint.nombre)
+                    if len(self.endpoints) > 1:
+                        print(f"   ⛔ Endpoint {endpoint.nombre} eyectado {demora:.0f}s")
+                if status == 429 and retry_after:
+                    endpoint.fuera_hasta = max(endpoint.fuera_hasta, ahora + retry_after)
+        metrics.incr("llm_endpoint_requests", endpoint=endpoint.nombre, status=status or "conexion")
+
+    def estadisticas(self) -> List[Dict[str, Any]]:
+        """Throughput, errores, latencia y estado por endpoint desde que se creó el pool."""
+        with self._lock:
+            ahora = time.time()
+            transcurrido = max(ahora - self._inicio, 1e-9)
+            filas = []
+            for e in self.endpoints:
+                latencias = list(e.latencias)
+                filas.append({
+                    "endpoint": e.nombre,
+                    "peso": e.peso,
+                    "requests": e.requests,
+                    "ok": e.ok,
+                    "errores": e.errores,
+                    "tasa_error": round(e.errores / e.requests, 4) if e.requests else 0.0,
+                    "status_429": e.status_429,
+                    "status_5xx": e.status_5xx,
+                    "fallas_conexion": e.fallas_conexion,
+                    "eyecciones": e.eyecciones,
+                    "en_vuelo": e.en_vuelo,
+                    "ok_por_s": round(e.ok / transcurrido, 3),
+                    "p50_s": round(metrics.percentil(latencias, 50), 3) if latencias else None,
+                    "p95_s": round(metrics.percentil(latencias, 95), 3) if latencias else None,
+                    "prompt_tokens": e.prompt_tokens,
+                    "completion_tokens": e.completion_tokens,
+                    "eyectado_s": round(max(e.fuera_hasta - ahora, 0.0), 1),
+                })
+        return filas
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._lock:
+            self._inicio = time.time()
+            for e in self.endpoints:
+                e.requests = e.ok = e.errores = e.status_429 = e.status_5xx = 0
+                e.fallas_conexion = e.eyecciones = e.prompt_tokens = e.completion_tokens = 0
+                e.errores_seguidos = e.eyecciones_seguidas = 0
+                e.fuera_hasta = e._actual = 0.0
+                e.latencias.clear()
+
+
+_pool: Optional[PoolEndpoints] = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> PoolEndpoints:
+    """Instancia compartida por todos los threads del proceso (configurada por entorno)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolEndpoints(cargar_endpoints())
+        return _pool
+
+
+def estadisticas_actuales() -> Optional[List[Dict[str, Any]]]:
+    """Estadísticas del pool del proceso, o None si todavía no se hizo ninguna llamada."""
+    return _pool.estadisticas() if _pool is not None else None
+
+
+def reportar() -> None:
+    """Imprime las estadísticas por endpoint si el proceso usó un pool de más de uno."""
+    if _pool is not None and len(_pool) > 1:
+        imprimir_estadisticas(_pool.estadisticas())
+
+
+def imprimir_estadisticas(filas: List[Dict[str, Any]]) -> None:
+    print("════════════════════════════════════════")
+    print(" Endpoints LLM 🔀 ")
+    print("════════════════════════════════════════")
+    print(f"{'Endpoint':<16} {'Req':>6} {'OK/s':>7} {'Error':>7} {'429':>5} {'5xx':>5} {'Eyec':>5} {'p50 s':>7}")
+    for f in filas:
+        p50 = f"{f['p50_s']:.2f}" if f["p50_s"] is not None else "-"
+        estado = f"  ⛔ {f['eyectado_s']}s" if f["eyectado_s"] else ""
+        print(
+            f"{f['endpoint'][:16]:<16} {f['requests']:>6} {f['ok_por_s']:>7.2f} {f['tasa_error']:>7.1%} "
+            f"{f['status_429']:>5} {f['status_5xx']:>5} {f['eyecciones']:>5} {p50:>7}{estado}"
+        )
+    print("════════════════════════════════════════")
+
+
+def _enmascarar(key: Optional[str]) -> str:
+    if key is None:
+        return "(OPENROUTER_API_KEY)"
+    if not key:
+        return "(sin key)"
+    return f"{key[:6]}…{key[-4:]}" if len(key) > 12 else "****"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Endpoints LLM configurados (OPENROUTER_ENDPOINTS).")
+    parser.add_argument("--config", default=ENDPOINTS, help="Ruta o JSON inline (por defecto OPENROUTER_ENDPOINTS).")
+    args = parser.parse_args(argv)
+
+    endpoints = cargar_endpoints(args.config)
+    if not endpoints:
+        print("Sin OPENROUTER_ENDPOINTS: se usa OPENROUTER_API_URL / OPENROUTER_API_KEY.")
+        return 0
+    print(f"{len(endpoints)} endpoint(s), estrategia {ESTRATEGIA}:")
+    for e in endpoints:
+        modelos = f" | modelos {', '.join(e.modelos)}" if e.modelos is not None else ""
+        print(f"   {e.nombre}: {e.url or '(OPENROUTER_API_URL)'} | key {_enmascarar(e.key)} | peso {e.peso}{modelos}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
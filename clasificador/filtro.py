@@ -0,0 +1,210 @@
+"""
+Filtro de calidad/relevancia previo al LLM (sólo CPU, sin llamadas a la API).
+
+Descarta artículos que no vale la pena enviar al clasificador. Las reglas se evalúan en
+orden y cada artículo se cuenta sólo en la primera que lo descarta:
+
+- vacio:       sin `Cuerpo`.
+- seccion:     URL de una sección fuera de tema (FILTRO_SECCIONES_DESCARTADAS).
+- idioma:      no está en español (conteo de palabras funcionales es/en/pt/ca).
+- paywall:     aviso de contenido para suscriptores con cuerpo corto.
+- en_vivo:     fragmento de cobertura en vivo / minuto a minuto con cuerpo corto.
+- boilerplate: la mayor parte del cuerpo son frases de relleno ("Leé también", ...).
+- corto:       menos de FILTRO_MIN_PALABRAS palabras.
+
+Uso:
+    python -m clasificador.filtro [--input data/noticias.json] [--output data/noticias_filtradas.json]
+    python -m clasificador.filtro --store   # marca los descartados como clasificados sin ministerio
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import sys
+sys.stdout.reconfigure(encoding="utf-8")
+
+from .config import (
+    FILTRADAS_FILE,
+    FILTRO_MAX_BOILERPLATE,
+    FILTRO_MIN_PALABRAS,
+    FILTRO_MIN_PALABRAS_EN_VIVO,
+    FILTRO_MIN_STOPWORDS_IDIOMA,
+    FILTRO_SECCIONES_DESCARTADAS,
+    INPUT_FILE,
+)
+from utils import metrics
+from utils.json_utils import write_json_atomic
+from utils.storage import STORE_FILE, ArticleStore
+from utils.time_index import filter_since
+from utils.time_utils import add_window_args, format_since, resolve_since
+
+REGLAS = ["vacio", "seccion", "idioma", "paywall", "en_vivo", "boilerplate", "corto"]
+
+# Palabras funcionales que no se comparten entre los idiomas que aparecen en los medios
+_STOPWORDS = {
+    "es": {"el", "los", "las", "del", "y", "por", "con", "una", "pero", "sus", "muy", "sin",
+           "sobre", "también", "hasta", "hay", "donde", "desde", "cuando", "fue", "según", "entre"},
+    "en": {"the", "and", "of", "to", "is", "that", "for", "with", "was", "on", "by", "he",
+           "it", "from", "this", "are", "have", "has", "which", "would"},
+    "pt": {"não", "uma", "com", "mais", "das", "dos", "pelo", "pela", "ao", "são", "seu",
+           "sua", "até", "também", "foi", "essa", "isso", "ele"},
+    "ca": {"els", "amb", "però", "més", "seva", "aquest", "aquesta", "també", "dels", "pel",
+           "fins", "són", "perquè", "havia"},
+}
+_PALABRA = re.compile(r"[a-záéíóúñüçãõâêôàèìòù]+")
+
+_PAYWALL = re.compile(
+    r"exclusivo para suscriptores|contenido exclusivo|suscribite para|para seguir leyendo|"
+    r"para continuar leyendo|iniciá sesión|inicia sesión para|registrate gratis",
+    re.IGNORECASE,
+)
+_EN_VIVO = re.compile(r"en vivo|en-vivo|minuto a minuto|minuto-a-minuto|\blive\b|🔴", re.IGNORECASE)
+_RELLENO = re.compile(
+    r"le[eé] tambi[eé]n|mir[aá] tambi[eé]n|segu[ií] leyendo|m[aá]s noticias|te puede interesar|"
+    r"suscrib|newsletter|hac[eé] click|compartir en|seguinos en|descarg[aá] la app|publicidad",
+    re.IGNORECASE,
+)
+_ORACION = re.compile(r"(?<=[.!?:])\s+|\n+")
+
+
+def detectar_idioma(texto: str) -> Optional[str]:
+    """Idioma con más palabras funcionales en los primeros 2000 caracteres (None si no alcanza)."""
+    palabras = _PALABRA.findall(texto[:2000].lower())
+    conteo = {idioma: sum(1 for p in palabras if p in sw) for idioma, sw in _STOPWORDS.items()}
+    idioma, hits = max(conteo.items(), key=lambda kv: kv[1])
+    return idioma if hits >= FILTRO_MIN_STOPWORDS_IDIOMA else None
+
+
+def proporcion_boilerplate(texto: str) -> float:
+    """Proporción de caracteres del texto que están en oraciones de relleno."""
+    oraciones = [o for o in _ORACION.split(texto) if o.strip()]
+    total = sum(len(o) for o in oraciones)
+    if not total:
+        return 0.0
+    return sum(len(o) for o in oraciones if _RELLENO.search(o)) / total
+
+
+def seccion_descartada(url: str) -> bool:
+    p = urlparse(url or "")
+    partes = [s.lower() for s in p.path.split("/") if s]
+    subdominio = p.netloc.lower().split(".")[0]
+    return (bool(partes) and partes[0] in FILTRO_SECCIONES_DESCARTADAS) or subdominio in FILTRO_SECCIONES_DESCARTADAS
+
+
+def evaluar(articulo: Dict) -> Optional[str]:
+    """Primera regla que descarta el artículo, o None si pasa el filtro."""
+    cuerpo = (articulo.get("Cuerpo") or "").strip()
+    if not cuerpo:
+        return "vacio"
+    if seccion_descartada(articulo.get("Link") or ""):
+        return "seccion"
+    titulo = articulo.get("Titulo") or ""
+    idioma = detectar_idioma(f"{titulo} {articulo.get('Descripcion') or ''} {cuerpo}")
+    if idioma not in (None, "es"):
+        return "idioma"
+    palabras = len(cuerpo.split())
+    if palabras < FILTRO_MIN_PALABRAS_EN_VIVO:
+        if _PAYWALL.search(cuerpo):
+            return "paywall"
+        if _EN_VIVO.search(f"{titulo} {articulo.get('Link') or ''}"):
+            return "en_vivo"
+    if proporcion_boilerplate(cuerpo) > FILTRO_MAX_BOILERPLATE:
+        return "boilerplate"
+    if palabras < FILTRO_MIN_PALABRAS:
+        return "corto"
+    return None
+
+
+def filtrar(articulos: List[Dict]) -> Tuple[List[Dict], List[Tuple[Dict, str]], Dict[str, int]]:
+    """Separa aceptados y (artículo, motivo) descartados; devuelve también el conteo por regla."""
+    aceptados, descartados = [], []
+    conteo: Counter = Counter()
+    for articulo in articulos:
+        motivo = evaluar(articulo)
+        if motivo is None:
+            aceptados.append(articulo)
+        else:
+            descartados.append((articulo, motivo))
+            conteo[motivo] += 1
+    for motivo, n in conteo.items():
+        metrics.incr("filtro_descartes", n, motivo=motivo)
+    return aceptados, descartados, {r: conteo.get(r, 0) for r in REGLAS}
+
+
+def _imprimir_reporte(total: int, aceptados: int, conteo: Dict[str, int]) -> None:
+    print(f"Aceptados:        {aceptados}/{total}")
+    for regla in REGLAS:
+        if conteo[regla]:
+            print(f"   ✗ {regla:<12} {conteo[regla]}")
+
+
+@metrics.medido("filtro")
+def run_filtro(
+    store: Optional[ArticleStore] = None,
+    since: Optional[float] = None,
+    input_file: str = INPUT_FILE,
+    output_file: str = FILTRADAS_FILE,
+) -> Dict[str, int]:
+    """
+    Aplica el filtro a `input_file` y escribe los aceptados en `output_file` (la entrada del
+    clasificador en el orquestador). Con `store` evalúa los artículos pendientes de
+    clasificación y guarda los descartados como etiquetados sin ministerio, así el
+    clasificador no los envía al LLM. Devuelve el conteo por regla (queda en el manifiesto).
+    """
+    print("════════════════════════════════════════")
+    print(" Filtro previo al clasificador 🧹 ")
+    print("════════════════════════════════════════")
+    print(f"Entrada:          {store.path if store is not None else input_file}")
+    if store is None:
+        print(f"Salida:           {output_file}")
+    print(f"Ventana:          {format_since(since)}")
+    print("────────────────────────────────────────")
+
+    if store is not None:
+        articulos = store.pending_classification(since=since)
+    else:
+        articulos = filter_since(json.loads(Path(input_file).read_text(encoding="utf-8")), since)
+    aceptados, descartados, conteo = filtrar(articulos)
+    if store is not None:
+        if descartados:
+            store.save_labels([(a.get("Link", ""), []) for a, _ in descartados])
+    else:
+        write_json_atomic(Path(output_file), aceptados)
+    metrics.anotar(items=len(articulos), aceptados=len(aceptados))
+    _imprimir_reporte(len(articulos), len(aceptados), conteo)
+    print("════════════════════════════════════════")
+    return {"total": len(articulos), "aceptados": len(aceptados), **conteo}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Filtra artículos antes de clasificarlos.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=FILTRADAS_FILE)
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, default=None,
+        help=f"Filtra los pendientes de la base SQLite (por defecto {STORE_FILE}).",
+    )
+    parser.add_argument("--mostrar", action="store_true", help="Lista los descartados con su motivo.")
+    add_window_args(parser)
+    args = parser.parse_args(argv)
+    since = resolve_since(args.since, args.window)
+    if args.mostrar:
+        articulos = filter_since(json.loads(Path(args.input).read_text(encoding="utf-8")), since)
+        for articulo, motivo in filtrar(articulos)[1]:
+            print(f"{motivo:<12} {(articulo.get('Titulo') or '')[:70]} | {articulo.get('Link')}")
+        return 0
+    if args.store:
+        with ArticleStore(args.store) as store:
+            run_filtro(store, since=since)
+    else:
+        run_filtro(since=since, input_file=args.input, output_file=args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
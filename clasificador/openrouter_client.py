@@ -1,14 +1,34 @@
 from __future__ import annotations
-import os, json, re, time, requests
+import os, json, re, threading, time, requests
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
 from json import dumps
-from typing import Any, List, Dict
+from typing import Any, Callable, Deque, List, Dict, Optional
 from .config import TEMPERATURE, TOP_P
+from .budget import COMPLETION_ESTIMADA, PresupuestoAgotado, estimar_tokens, obtener_governor
+from .endpoints import obtener_pool
+from utils import metrics
 
 OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_MODEL   = os.getenv("OPENROUTER_MODEL", "minimax/minimax-m2:free")
 REQUEST_TIMEOUT    = float(os.getenv("OPENROUTER_TIMEOUT", "120"))
 
+# Modelos alternativos (en orden) si el principal falla: "modelo/a,modelo/b"
+FALLBACK_MODELS = [m.strip() for m in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",") if m.strip()]
+ERRORES_PARA_FALLBACK = int(os.getenv("OPENROUTER_ERRORES_FALLBACK", "3"))
+ENFRIAMIENTO_MODELO_S = float(os.getenv("OPENROUTER_ENFRIAMIENTO_S", "300"))
+
+# Hedging: duplicar la request si tarda más que el percentil HEDGE_PERCENTIL observado
+HEDGE_HABILITADO   = os.getenv("OPENROUTER_HEDGE", "0") == "1"
+HEDGE_MODELO       = os.getenv("OPENROUTER_HEDGE_MODELO", "mismo")  # "mismo" o "fallback"
+HEDGE_PERCENTIL    = 95.0
+HEDGE_MIN_MUESTRAS = 20     # antes de tener muestras se usa HEDGE_INICIAL_S
+HEDGE_INICIAL_S    = float(os.getenv("OPENROUTER_HEDGE_INICIAL_S", "30"))
+HEDGE_MIN_S        = float(os.getenv("OPENROUTER_HEDGE_MIN_S", "1"))
+
 # Regex robusto para extraer un ARRAY JSON aunque venga rodeado de texto/código
 _json_array_regex = re.compile(r"\[\s*(?:\{.*?\})\s*(?:,\s*\{.*?\}\s*)*\]", re.DOTALL)
 
@@ -30,39 +50,353 @@ def extract_json_from_plain_text(text: str) -> Any:
         raise ValueError("No se encontró un array JSON en la respuesta del modelo.")
     return json.loads(m.group(0))
 
-def call_openrouter_api(messages: List[Dict[str, str]]) -> str:
+def _retry_after(response, defecto: float = 5.0) -> float:
+    """Segundos indicados por el header Retry-After (o `defecto` si no viene o no es numérico)."""
+    try:
+        return max(float(response.headers.get("Retry-After", defecto)), 0.0)
+    except ValueError:
+        return defecto
+
+class ErrorEndpoint(RuntimeError):
+    """El endpoint no atendió la request (429, 5xx, timeout o conexión): puede probarse otro."""
+
+    def __init__(self, mensaje: str, status: Optional[int]):
+        super().__init__(mensaje)
+        self.status = status
+        self.solo_cupo = status == 429  # todos los endpoints probados respondieron 429
+
+
+def _post_chat(messages: List[Dict[str, str]], model: str) -> str:
     """
-    Envía un chat completion a OpenRouter y devuelve el 'content' del primer choice.
-    `messages` debe ser una lista de dicts con 'role' y 'content' (igual que en Ollama).
+    Un chat completion contra `model`, reintentando en otro endpoint del pool si el elegido
+    falla por su cuenta (ErrorEndpoint). Si fallaron todos, lanza el último error, con
+    `solo_cupo` si todos respondieron 429.
     """
-    if not OPENROUTER_API_KEY:
-        raise RuntimeError("Falta OPENROUTER_API_KEY en variables de entorno.")
+    pool = obtener_pool()
+    probados: List[str] = []
+    statuses: List[Optional[int]] = []
+    while True:
+        try:
+            return _post_endpoint(messages, model, pool, probados)
+        except ErrorEndpoint as exc:
+            statuses.append(exc.status)
+            if not pool.quedan(model, probados):
+                exc.solo_cupo = all(s == 429 for s in statuses)
+                raise
+            print(f"   ↻ Endpoint {probados[-1]} falló ({exc.status or 'conexión'}), reintento en otro")
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
+
+def _post_endpoint(messages: List[Dict[str, str]], model: str, pool, probados: List[str]) -> str:
+    """
+    Un único chat completion contra `model`: reserva cupo en el presupuesto, elige un
+    endpoint del pool que no esté en `probados`, envía la request y devuelve el 'content'
+    del primer choice. Registra la latencia si tuvo éxito.
+    """
+    # Espera cupo en el presupuesto compartido (RPM/TPM/costo) antes de enviar
+    governor = obtener_governor()
+    reserva = governor.reservar(estimar_tokens(messages) + COMPLETION_ESTIMADA)
+
+    try:
+        endpoint = pool.elegir(model, probados)
+    except RuntimeError:
+        governor.confirmar(reserva, 0, 0)  # no se envió nada
+        raise
+    probados.append(endpoint.nombre)
+    key = OPENROUTER_API_KEY if endpoint.key is None else endpoint.key
+    headers = {"Content-Type": "application/json"}
+    if key:
+        headers["Authorization"] = f"Bearer {key}"
 
     payload = {
-        "model": OPENROUTER_MODEL,
+        "model": model,
         "messages": messages,
         "temperature": TEMPERATURE,
         "top_p": TOP_P,
         "response_format": {"type": "text"},
     }
 
-    response = requests.post(
-        OPENROUTER_API_URL, 
-        headers=headers, 
-        data=dumps(payload, ensure_ascii=False), 
-        timeout=REQUEST_TIMEOUT
+    prompt_tokens = completion_tokens = 0
+    status: Optional[int] = None
+    retry_after: Optional[float] = None
+
+    with metrics.span("llm_call", modelo=model, endpoint=endpoint.nombre, mensajes=len(messages)) as sp:
+        t0 = time.perf_counter()
+        try:
+            try:
+                response = requests.post(
+                    endpoint.url or OPENROUTER_API_URL,
+                    headers=headers,
+                    data=dumps(payload, ensure_ascii=False),
+                    timeout=REQUEST_TIMEOUT
+                )
+            except requests.RequestException as exc:
+                raise ErrorEndpoint(f"{endpoint.nombre}: {type(exc).__name__}: {exc}"[:500], None) from exc
+            status = response.status_code
+            sp.set(status=response.status_code)
+            metrics.incr("llm_requests", status=response.status_code)
+
+            if response.status_code == 429:
+                retry_after = _retry_after(response)
+                if len(pool) == 1:
+                    # El proveedor nos frenó: pausar a todos los llamadores, no sólo a este.
+                    # Con varios endpoints sólo se enfría el que respondió 429.
+                    governor.pausar(retry_after)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise ErrorEndpoint(
+                    f"OpenRouter {response.status_code} ({endpoint.nombre}): {response.text[:500]}",
+                    response.status_code,
+                )
+            if response.status_code != 200:
+                raise RuntimeError(f"OpenRouter {response.status_code}: {response.text[:500]}")
+
+            data = response.json()
+            usage = data.get("usage") or {}
+            prompt_tokens = usage.get("prompt_tokens") or 0
+            completion_tokens = usage.get("completion_tokens") or 0
+        finally:
+            pool.liberar(endpoint, status, time.perf_counter() - t0, prompt_tokens, completion_tokens, retry_after)
+            costo = governor.confirmar(reserva, prompt_tokens, completion_tokens)
+            _acumular_uso(prompt_tokens, completion_tokens, costo)
+        sp.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, costo_usd=costo)
+        metrics.incr("llm_tokens", prompt_tokens, tipo="prompt")
+        metrics.incr("llm_tokens", completion_tokens, tipo="completion")
+        try:
+            contenido = data["choices"][0]["message"]["content"]
+        except Exception:
+            raise RuntimeError(f"Respuesta inesperada de OpenRouter: {json.dumps(data)[:800]}")
+    _registrar_latencia(time.perf_counter() - t0)
+    return contenido
+
+
+_uso_local = threading.local()
+_uso_lock = threading.Lock()
+
+
+@contextmanager
+def medir_uso():
+    """
+    Acumula llamadas, tokens y costo de los chat completions que hace el thread actual
+    dentro del bloque, incluidas la request y el duplicado del hedging que corren en
+    `_pool_hedge` (se les pasa el acumulador del llamador).
+    """
+    uso = {"llamadas": 0, "prompt_tokens": 0, "completion_tokens": 0, "costo_usd": 0.0}
+    anterior = getattr(_uso_local, "uso", None)
+    _uso_local.uso = uso
+    try:
+        yield uso
+    finally:
+        _uso_local.uso = anterior
+
+
+def _acumular_uso(prompt_tokens: int, completion_tokens: int, costo: float) -> None:
+    uso = getattr(_uso_local, "uso", None)
+    if uso is not None:
+        with _uso_lock:  # primaria y duplicado del hedging suman al mismo acumulador
+            uso["llamadas"] += 1
+            uso["prompt_tokens"] += prompt_tokens
+            uso["completion_tokens"] += completion_tokens
+            uso["costo_usd"] += costo or 0.0
+
+
+# -------------------------------
+# Hedging y fallback de modelos
+# -------------------------------
+
+_latencias: Deque[float] = deque(maxlen=200)
+_salud_modelos: Dict[str, Dict[str, float]] = {}
+_estadisticas: Dict[str, int] = {
+    "llamadas": 0, "hedges": 0, "gana_hedge": 0, "gana_primaria": 0, "fallbacks": 0, "errores": 0,
+}
+_estado_lock = threading.Lock()
+_pool_hedge = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+def _registrar_latencia(segundos: float) -> None:
+    with _estado_lock:
+        _latencias.append(segundos)
+
+
+def _sumar(clave: str) -> None:
+    with _estado_lock:
+        _estadisticas[clave] += 1
+    metrics.incr("llm_hedging", evento=clave)
+
+
+def demora_hedge() -> float:
+    """Segundos a esperar antes de duplicar la request: p95 observado (o HEDGE_INICIAL_S)."""
+    with _estado_lock:
+        muestras = list(_latencias)
+    if len(muestras) < HEDGE_MIN_MUESTRAS:
+        return HEDGE_INICIAL_S
+    return max(metrics.percentil(muestras, HEDGE_PERCENTIL), HEDGE_MIN_S)
+
+
+def estadisticas_llm() -> Dict[str, Any]:
+    """Contadores de hedging/fallback del proceso, con la tasa de hedging y de victorias."""
+    with _estado_lock:
+        stats = dict(_estadisticas)
+    stats["tasa_hedge"] = round(stats["hedges"] / stats["llamadas"], 4) if stats["llamadas"] else 0.0
+    stats["tasa_victoria_hedge"] = (
+        round(stats["gana_hedge"] / stats["hedges"], 4) if stats["hedges"] else 0.0
     )
-    
-    if response.status_code != 200:
-        raise RuntimeError(f"OpenRouter {response.status_code}: {response.text[:500]}")
+    stats["demora_hedge_s"] = round(demora_hedge(), 3)
+    return stats
+
+
+def reiniciar_estadisticas() -> None:
+    """Vacía latencias, contadores y salud de modelos y endpoints (p. ej. entre corridas de benchmark)."""
+    with _estado_lock:
+        _latencias.clear()
+        _salud_modelos.clear()
+        for clave in _estadisticas:
+            _estadisticas[clave] = 0
+    obtener_pool().reiniciar_estadisticas()
+
+
+def _modelos_disponibles() -> List[str]:
+    """
+    OPENROUTER_MODEL + FALLBACK_MODELS en orden, salteando los que ningún endpoint del pool
+    sirve y los que están en enfriamiento.
+    """
+    ahora = time.time()
+    pool = obtener_pool()
+    modelos = [OPENROUTER_MODEL] + [m for m in FALLBACK_MODELS if m != OPENROUTER_MODEL]
+    modelos = [m for m in modelos if pool.quedan(m)] or modelos
+    with _estado_lock:
+        sanos = [m for m in modelos if _salud_modelos.get(m, {}).get("hasta", 0) <= ahora]
+    return sanos or modelos
+
+
+def _registrar_resultado(model: str, ok: bool) -> None:
+    with _estado_lock:
+        salud = _salud_modelos.setdefault(model, {"errores": 0, "hasta": 0})
+        if ok:
+            salud["errores"] = 0
+            return
+        salud["errores"] += 1
+        if salud["errores"] >= ERRORES_PARA_FALLBACK:
+            # Tras varios errores seguidos el modelo se deja de lado por un rato
+            salud["hasta"] = time.time() + ENFRIAMIENTO_MODELO_S
+            salud["errores"] = 0
+
+
+def _llamar(messages: List[Dict[str, str]], model: str, validar: Optional[Callable[[str], Any]]) -> Any:
+    contenido = _post_chat(messages, model)
+    if validar is None:
+        return contenido
+    return validar(contenido)  # lanza si la respuesta no sirve (p. ej. JSON inválido)
+
 
-    data = response.json()
+def _llamar_en_pool(
+    uso: Optional[Dict[str, Any]],
+    iniciada: threading.Event,
+    messages: List[Dict[str, str]],
+    model: str,
+    validar: Optional[Callable[[str], Any]],
+) -> Any:
+    """`_llamar` dentro de `_pool_hedge`, acumulando el uso en el `medir_uso` del llamador."""
+    iniciada.set()
+    _uso_local.uso = uso
     try:
-        return data["choices"][0]["message"]["content"]
-    except Exception:
-        raise RuntimeError(f"Respuesta inesperada de OpenRouter: {json.dumps(data)[:800]}")
+        return _llamar(messages, model, validar)
+    finally:
+        _uso_local.uso = None
+
+
+def _llamar_con_hedge(
+    messages: List[Dict[str, str]],
+    model: str,
+    modelo_hedge: str,
+    validar: Optional[Callable[[str], Any]],
+) -> Any:
+    """
+    Envía la request y, si no respondió tras `demora_hedge()`, envía un duplicado a
+    `modelo_hedge`. Devuelve la primera respuesta válida; la otra se descarta al llegar.
+    La demora se cuenta desde que la request sale, no desde que entra a la cola del pool.
+    """
+    uso = getattr(_uso_local, "uso", None)
+    iniciada = threading.Event()
+    primaria = _pool_hedge.submit(_llamar_en_pool, uso, iniciada, messages, model, validar)
+    iniciada.wait()
+    try:
+        return primaria.result(timeout=demora_hedge())
+    except FuturesTimeout:
+        pass
+
+    _sumar("hedges")
+    duplicada = _pool_hedge.submit(_llamar_en_pool, uso, threading.Event(), messages, modelo_hedge, validar)
+    pendientes = {primaria: model, duplicada: modelo_hedge}
+    ultimo_error: Optional[BaseException] = None
+    while pendientes:
+        listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+        for futuro in listos:
+            modelo = pendientes.pop(futuro)
+            try:
+                contenido = futuro.result()
+            except Exception as exc:
+                # Los errores del modelo principal los cuenta el llamador; la falta de cupo no es del modelo
+                if modelo != model and not getattr(exc, "solo_cupo", False):
+                    _registrar_resultado(modelo, False)
+                ultimo_error = exc
+                continue
+            _sumar("gana_hedge" if futuro is duplicada else "gana_primaria")
+            return contenido
+    raise ultimo_error
+
+
+def call_openrouter_api(
+    messages: List[Dict[str, str]],
+    validar: Optional[Callable[[str], Any]] = None,
+    modelo: Optional[str] = None,
+) -> Any:
+    """
+    Envía un chat completion a OpenRouter y devuelve el 'content' del primer choice.
+    `messages` debe ser una lista de dicts con 'role' y 'content' (igual que en Ollama).
+
+    - Si `validar` se indica, una respuesta que la haga fallar cuenta como error del modelo
+      y, si valida, se devuelve el resultado de `validar` en lugar del texto.
+    - Con HEDGE_HABILITADO, si la respuesta tarda más que el p95 observado se envía un
+      duplicado (al mismo modelo o al primer fallback, según HEDGE_MODELO) y gana el primero.
+    - Ante un error se prueba el siguiente de FALLBACK_MODELS; un modelo con
+      ERRORES_PARA_FALLBACK errores seguidos se saltea durante ENFRIAMIENTO_MODELO_S.
+    - Con `modelo` se usa sólo ese modelo, sin fallback (p. ej. para comparar modelos).
+    - Cada request va a un endpoint del pool (clasificador.endpoints, OPENROUTER_ENDPOINTS);
+      un 429/5xx/timeout se reintenta en otro endpoint antes de contar como error del
+      modelo, y si todos respondieron 429 se lanza ErrorEndpoint sin pasar al fallback.
+    """
+    if not OPENROUTER_API_KEY and not obtener_pool().configurado:
+        raise RuntimeError("Falta OPENROUTER_API_KEY (u OPENROUTER_ENDPOINTS) en variables de entorno.")
+
+    _sumar("llamadas")
+    modelos = [modelo] if modelo else _modelos_disponibles()
+    ultimo_error: Optional[BaseException] = None
+    for posicion, model in enumerate(modelos):
+        if posicion > 0:
+            _sumar("fallbacks")
+            print(f"   ↪ Fallback al modelo {model}")
+        try:
+            if HEDGE_HABILITADO:
+                modelo_hedge = model
+                if HEDGE_MODELO == "fallback" and posicion + 1 < len(modelos):
+                    modelo_hedge = modelos[posicion + 1]
+                contenido = _llamar_con_hedge(messages, model, modelo_hedge, validar)
+            else:
+                contenido = _llamar(messages, model, validar)
+        except PresupuestoAgotado:
+            raise
+        except ErrorEndpoint as exc:
+            if exc.solo_cupo:
+                # Ningún endpoint con cupo: no es un problema del modelo, no se cambia de modelo
+                _sumar("errores")
+                raise
+            _registrar_resultado(model, False)
+            ultimo_error = exc
+            continue
+        except Exception as exc:
+            _registrar_resultado(model, False)
+            ultimo_error = exc
+            continue
+        _registrar_resultado(model, True)
+        return contenido
+    _sumar("errores")
+    raise ultimo_error
@@ -1,31 +1,50 @@
 from math import ceil
 from pathlib import Path
-from typing import Any, List, Dict
-import json, time
-from json import dumps, loads
+from typing import Any, List, Dict, Optional, Tuple
+import argparse, json, time
+from json import loads
 from pydantic import ValidationError
 import sys
 sys.stdout.reconfigure(encoding="utf-8")
 
-from .config import INPUT_FILE, OUTPUT_FILE, LOTE
-from .schema import ClasifOut, MINISTERIOS_VALIDOS
-from .prompts import CLASIF_PROMPT_SYSTEM, CLASIF_PROMPT_USER
+from . import endpoints
+from .budget import PresupuestoAgotado
+from .config import DIGEST, INDICE_ARTICULOS, INPUT_FILE, OUTPUT_FILE, LOTE, PROMPT_COMPACTO
+from .schema import (
+    DIGEST_MAX_CHARS, DIGEST_MAX_ITEMS, MINISTERIOS_VALIDOS, ClasifDigestOut, ClasifOut, Digest,
+)
+from .prompt_builder import expandir_respuesta, mensajes_compactos, mensajes_legado
 from .openrouter_client import call_openrouter_api, extract_json_from_plain_text
-from utils.time_utils import format_duration_hms
+from utils import metrics, profiling
+from utils.article_index import convertir_articulos
+from utils.storage import STORE_FILE, ArticleStore
+from utils.time_index import filter_since
+from utils.time_utils import add_window_args, format_duration_hms, format_since, resolve_since
+from utils.urls import normalize_url
 
 
-def validar_y_normalizar_salida(salida_modelo: Any) -> List[ClasifOut]:
+def _normalizar_digest(digest: Digest) -> Digest:
+    """Recorta el digest a DIGEST_MAX_ITEMS por lista y DIGEST_MAX_CHARS por entrada."""
+    return Digest(**{
+        campo: [t.strip()[:DIGEST_MAX_CHARS] for t in getattr(digest, campo) if t and t.strip()][:maximo]
+        for campo, maximo in DIGEST_MAX_ITEMS.items()
+    })
+
+
+def validar_y_normalizar_salida(salida_modelo: Any, con_digest: bool = False) -> List[ClasifOut]:
     """
     Valida que la salida del modelo sea una lista de dicts compatibles con `ClasifOut`
     y normaliza los ministerios: filtra inválidos y elimina duplicados preservando el orden.
+    Con `con_digest` valida contra `ClasifDigestOut` y recorta el digest de cada item.
     """
     if not isinstance(salida_modelo, list):
         raise ValueError("La salida del modelo no es una lista JSON.")
 
     resultados: List[ClasifOut] = []
+    esquema = ClasifDigestOut if con_digest else ClasifOut
 
     for registro_dict in salida_modelo:
-        registro = ClasifOut(**registro_dict)
+        registro = esquema(**registro_dict)
 
         ministerios_incluidos: set[str] = set()
         ministerios_normalizados: List[str] = []
@@ -35,19 +54,78 @@ def validar_y_normalizar_salida(salida_modelo: Any) -> List[ClasifOut]:
                 ministerios_incluidos.add(ministerio)
                 ministerios_normalizados.append(ministerio)
 
-        resultados.append(
-            ClasifOut(idx=registro.idx, ministerio=ministerios_normalizados)
-        )
+        if con_digest:
+            resultados.append(ClasifDigestOut(
+                idx=registro.idx,
+                ministerio=ministerios_normalizados,
+                digest=_normalizar_digest(registro.digest),
+            ))
+        else:
+            resultados.append(
+                ClasifOut(idx=registro.idx, ministerio=ministerios_normalizados)
+            )
 
     return resultados
 
-def clasificar_lote(lote: List[Dict], start_idx: int) -> List[ClasifOut]:
+def _clave_articulo(item: Dict) -> tuple:
+    link = item.get("Link")
+    return ("link", normalize_url(link)) if link else ("titulo", item.get("Titulo") or "", item.get("Fecha"))
+
+
+def fusionar_salida(output_file: Path, nuevos: List[Dict]) -> List[Dict]:
+    """
+    Fusiona `nuevos` con la salida existente por Link (normalizado): reemplaza los que ya
+    estaban en su posición y agrega el resto al final.
+    """
+    if not output_file.exists():
+        return nuevos
+    existentes = loads(output_file.read_text(encoding="utf-8"))
+    por_clave = {_clave_articulo(item): item for item in nuevos}
+    fusion = []
+    for item in existentes:
+        fusion.append(por_clave.pop(_clave_articulo(item), item))
+    fusion.extend(por_clave.values())
+    print(f"Fusionados {len(nuevos)} artículos de la ventana con {len(existentes)} existentes "
+          f"→ {len(fusion)}")
+    return fusion
+
+
+def armar_salida(item: Dict, ministerios: List[str], digest: Optional[Digest] = None) -> Dict:
+    """Arma el registro de salida (artículo original + campo `ministerio` y, si hay, `digest`)."""
+    salida = {
+        "Titulo": item.get("Titulo", ""),
+        "Descripcion": item.get("Descripcion", ""),
+        "Autor": item.get("Autor", ""),
+        "Fuente": item.get("Fuente", ""),
+        "Fecha": item.get("Fecha", ""),
+        "Link": item.get("Link", ""),
+        "Cuerpo": item.get("Cuerpo", ""),
+        "Fuente_base": item.get("Fuente_base", ""),
+        "Extraido_en": item.get("Extraido_en", ""),
+        "ministerio": ministerios
+    }
+    if digest is not None:
+        salida["digest"] = digest.model_dump()
+    return salida
+
+
+def clasificar_lote(
+    lote: List[Dict],
+    start_idx: int,
+    con_digest: bool = False,
+    prompts: Optional[Dict[str, str]] = None,
+    modelo: Optional[str] = None,
+    compacto: Optional[bool] = None,
+) -> List[ClasifOut]:
     """
     Envía un lote de items al modelo para obtener su clasificación y normaliza la salida.
 
     Parámetros:
     - lote: lista de diccionarios con los campos originales (Titulo, Descripcion, Cuerpo, ...).
     - start_idx: índice base usado para generar el campo `idx` de cada item en el payload.
+    - con_digest: si es True pide también el digest de cada artículo (ClasifDigestOut).
+    - prompts / modelo / compacto: reemplazos de los prompts, modelo fijo y formato del
+      prompt (por defecto PROMPT_COMPACTO); los usa el runner de experimentos.
 
     Retorna:
     - Lista de objetos ClasifOut validados y con los ministerios normalizados (sin duplicados y filtrando inválidos).
@@ -55,47 +133,55 @@ def clasificar_lote(lote: List[Dict], start_idx: int) -> List[ClasifOut]:
     Excepciones:
     - Lanza errores si la respuesta del modelo no es JSON válido o no cumple el esquema esperado.
     """
-    compact = [{
-        "idx": start_idx + i,
-        "titulo": (it.get("Titulo") or "")[:300],
-        "description": (it.get("Descripcion") or "")[:800],
-        "body": (it.get("Cuerpo") or "")[:2000],
-    } for i, it in enumerate(lote)]
-
-    user_payload = {
-        "instrucciones": CLASIF_PROMPT_USER, 
-        "items": compact
-    }
-
-    messages = [
-        {
-            "role": "system", 
-            "content": CLASIF_PROMPT_SYSTEM
-        },
-        {
-            "role": "user", 
-            "content": dumps(user_payload, ensure_ascii=False)
-        }
-    ]
-
-    content = call_openrouter_api(messages)
-    raw = extract_json_from_plain_text(content)
-    try:
-        return validar_y_normalizar_salida(raw)
-    except ValidationError as ve:
-        raise RuntimeError(f"Respuesta inválida del modelo: {ve}") from ve
-
-
-def run_pipeline() -> None:
+    if PROMPT_COMPACTO if compacto is None else compacto:
+        # Prefijo estable + tabla con índices locales; la respuesta se expande a idx global
+        messages = mensajes_compactos(lote, con_digest, prompts)
+        interpretar = lambda c: expandir_respuesta(extract_json_from_plain_text(c), start_idx)
+    else:
+        messages = mensajes_legado(lote, start_idx, con_digest, prompts)
+        interpretar = extract_json_from_plain_text
+
+    def validar(content: str) -> List[ClasifOut]:
+        try:
+            return validar_y_normalizar_salida(interpretar(content), con_digest)
+        except ValidationError as ve:
+            raise RuntimeError(f"Respuesta inválida del modelo: {ve}") from ve
+
+    # Una respuesta que no valida cuenta como error: habilita el hedge/fallback a otro modelo.
+    # La salida ya validada es lo que devuelve el cliente, no se vuelve a parsear.
+    return call_openrouter_api(messages, validar=validar, modelo=modelo)
+
+
+def _etiqueta(respuesta: Optional[ClasifOut]) -> Tuple[List[str], Optional[Digest]]:
+    """(ministerios, digest) de una respuesta del modelo; ([], None) si el item no volvió."""
+    if respuesta is None:
+        return [], None
+    return respuesta.ministerio, getattr(respuesta, "digest", None)
+
+
+@metrics.medido("clasificador")
+def run_pipeline(
+    store: Optional[ArticleStore] = None,
+    since: Optional[float] = None,
+    input_file: str = INPUT_FILE,
+    output_file: str = OUTPUT_FILE,
+    digest: bool = DIGEST,
+) -> None:
     """
     Orquesta el pipeline completo de clasificación de noticias.
 
     Qué hace:
-    - Lee INPUT_FILE (JSON) con la lista de artículos.
+    - Lee `input_file` (JSON, por defecto INPUT_FILE) con la lista de artículos; si se pasa
+      `store`, toma de la base SQLite sólo los pendientes (sin etiqueta o con contenido modificado).
+    - Con `since` (epoch) procesa sólo los artículos con Fecha (o Extraido_en) posterior al
+      corte, seleccionados con un índice ordenado por fecha; la salida contiene sólo esa ventana.
     - Divide los artículos en lotes de tamaño LOTE y envía cada lote al modelo.
     - Reintenta el envío de cada lote hasta MAX_REINTENTOS aplicando backoff exponencial.
     - Valida y normaliza la salida del modelo contra el esquema ClasifOut.
-    - Ensambla los resultados y escribe OUTPUT_FILE (JSON) al finalizar.
+    - Con `digest=True` el mismo llamado devuelve además un digest por artículo
+      (ClasifDigestOut), que se guarda junto a la etiqueta y usa luego el summarizer.
+    - Ensambla los resultados y escribe `output_file` (JSON, por defecto OUTPUT_FILE) al finalizar;
+      con `store`, en cambio, guarda las etiquetas de cada lote en la base apenas se validan.
 
     Efectos secundarios y observaciones:
     - Es intensivo en I/O y en llamadas de red; imprime progreso, errores y métricas por stdout.
@@ -107,14 +193,24 @@ def run_pipeline() -> None:
     print("════════════════════════════════════════")
     print(" Clasificador de noticias con Minimax M2 (Open Routes) 🚀 ")
     print("════════════════════════════════════════")
-    print(f"Archivo entrada:  {INPUT_FILE}")
-    print(f"Archivo salida:   {OUTPUT_FILE}")
+    if store is not None:
+        print(f"Base de artículos: {store.path}")
+    else:
+        print(f"Archivo entrada:  {input_file}")
+        print(f"Archivo salida:   {output_file}")
     print(f"Tamaño de lote:   {LOTE}")
+    print(f"Digest:           {'sí' if digest else 'no'}")
+    print(f"Ventana:          {format_since(since)}")
     print("────────────────────────────────────────")
 
     t0 = time.time()
-    articulos = loads(Path(INPUT_FILE).read_text(encoding="utf-8"))
+    with profiling.etapa("clasificador.lectura"):
+        if store is not None:
+            articulos = store.pending_classification(since=since)
+        else:
+            articulos = filter_since(loads(Path(input_file).read_text(encoding="utf-8")), since)
     total_articulos = len(articulos)
+    metrics.anotar(items=total_articulos)
     print(f"Leídos {total_articulos} articulos en {format_duration_hms(time.time()-t0)}")
     
     if total_articulos == 0:
@@ -141,22 +237,39 @@ def run_pipeline() -> None:
         t_inicio_lote = time.time()
         backoff_actual = BACKOFF_INICIAL_S
 
-        for intento in range(1, MAX_REINTENTOS + 1):
-            try:
-                print("   • Enviando a modelo…")
-                respuestas_lote = clasificar_lote(items_lote, inicio_lote)
-                print(f"   • Devueltos {len(respuestas_lote)} registros. Validando/normalizando…")
-                resultados.extend(respuestas_lote)
-                break  # éxito → salir del bucle de reintentos
-            except Exception as err:
-                print(f"   ! Error en lote (intento {intento}/{MAX_REINTENTOS}): {err}")
-                if intento == MAX_REINTENTOS:
-                    print("   ✖ Abortando este lote por 3 fallos consecutivos.")
-                    raise
-                print(f"   ↺ Reintentando en {backoff_actual:.1f}s…")
-                time.sleep(backoff_actual)
-                backoff_actual *= 2  # backoff exponencial
-
+        with metrics.span("clasificador.lote", lote=indice_lote, items=len(items_lote)) as sp_lote:
+            for intento in range(1, MAX_REINTENTOS + 1):
+                try:
+                    print("   • Enviando a modelo…")
+                    sp_lote.set(intentos=intento)
+                    respuestas_lote = clasificar_lote(items_lote, inicio_lote, con_digest=digest)
+                    print(f"   • Devueltos {len(respuestas_lote)} registros validados.")
+                    break  # éxito → salir del bucle de reintentos
+                except Exception as err:
+                    print(f"   ! Error en lote (intento {intento}/{MAX_REINTENTOS}): {err}")
+                    if isinstance(err, PresupuestoAgotado):
+                        print("   ✖ Presupuesto agotado: se aborta sin reintentar.")
+                        raise
+                    if intento == MAX_REINTENTOS:
+                        print("   ✖ Abortando este lote por 3 fallos consecutivos.")
+                        raise
+                    metrics.incr("clasificador_reintentos")
+                    print(f"   ↺ Reintentando en {backoff_actual:.1f}s…")
+                    time.sleep(backoff_actual)
+                    backoff_actual *= 2  # backoff exponencial
+
+            # Fuera de los reintentos: un error al guardar no vuelve a llamar al LLM
+            resultados.extend(respuestas_lote)
+            if store is not None:
+                por_idx = {r.idx: r for r in respuestas_lote}
+                etiquetas = []
+                for i in range(inicio_lote, fin_lote_excl):
+                    ministerios, digest_item = _etiqueta(por_idx.get(i))
+                    etiquetas.append((
+                        articulos[i].get("Link", ""), ministerios,
+                        digest_item.model_dump() if digest_item is not None else None,
+                    ))
+                store.save_labels(etiquetas)
 
         duracion_lote = time.time() - t_inicio_lote
         procesados = fin_lote_excl 
@@ -171,7 +284,16 @@ def run_pipeline() -> None:
               f"ETA ~ {format_duration_hms(eta_segundos)}")
         print("────────────────────────────────────────")
 
-    clasificacion_por_indice: Dict[int, List[str]] = {r.idx: r.ministerio for r in resultados}
+    if store is not None:
+        sin_clasificacion = total_articulos - len({r.idx for r in resultados if r.ministerio})
+        print(f"Etiquetas guardadas en {store.path}. "
+              f"Items sin clasificación: {sin_clasificacion}/{total_articulos}")
+        print("════════════════════════════════════════")
+        print(f" ¡Proceso completo en {format_duration_hms(time.time() - t_inicio_global)}! ✅ ")
+        print("════════════════════════════════════════")
+        return
+
+    clasificacion_por_indice: Dict[int, ClasifOut] = {r.idx: r for r in resultados}
     if len(clasificacion_por_indice) != len(resultados):
         print("⚠ Aviso: hay índices repetidos en la salida del modelo.")
 
@@ -182,30 +304,25 @@ def run_pipeline() -> None:
     sin_clasificacion = 0
 
     for idx, item in enumerate(articulos):
-        ministerios = clasificacion_por_indice.get(idx, [])
+        ministerios, digest_item = _etiqueta(clasificacion_por_indice.get(idx))
         if not ministerios:
             sin_clasificacion += 1
 
-        salida.append({
-            "Titulo": item.get("Titulo", ""),
-            "Descripcion": item.get("Descripcion", ""),
-            "Autor": item.get("Autor", ""),
-            "Fuente": item.get("Fuente", ""),
-            "Fecha": item.get("Fecha", ""),
-            "Link": item.get("Link", ""),
-            "Cuerpo": item.get("Cuerpo", ""),
-            "Fuente_base": item.get("Fuente_base", ""),
-            "Extraido_en": item.get("Extraido_en", ""),
-            "ministerio": ministerios
-        })
+        salida.append(armar_salida(item, ministerios, digest_item))
 
     print(f"Hecho en {format_duration_hms(time.time() - t_inicio_ensamble)}. "
           f"Items sin clasificación: {sin_clasificacion}/{total_articulos}")
 
     # Persistencia
-    print(f"Escribiendo {OUTPUT_FILE}…")
+    print(f"Escribiendo {output_file}…")
     t_inicio_guardado = time.time()
-    Path(OUTPUT_FILE).write_text(json.dumps(salida, ensure_ascii=False, indent=2), encoding="utf-8")
+    with profiling.etapa("clasificador.escritura"):
+        if since is not None:
+            # Con ventana sólo se reclasificó una parte: se conserva el resto de las etiquetas
+            salida = fusionar_salida(Path(output_file), salida)
+        Path(output_file).write_text(json.dumps(salida, ensure_ascii=False, indent=2), encoding="utf-8")
+        if INDICE_ARTICULOS:
+            convertir_articulos(salida, Path(output_file))
     print(f"Listo en {format_duration_hms(time.time() - t_inicio_guardado)}")
 
     # Resumen
@@ -214,5 +331,28 @@ def run_pipeline() -> None:
     print(f" ¡Proceso completo en {format_duration_hms(duracion_total)}! ✅ ")
     print("════════════════════════════════════════")
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Clasifica noticias por ministerio usando un LLM.")
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, default=None,
+        help=f"Usa la base SQLite de artículos (por defecto {STORE_FILE}) en lugar de los JSON.",
+    )
+    parser.add_argument(
+        "--digest", action="store_true", default=DIGEST,
+        help="Pide además un digest compacto por artículo (lo usa el summarizer en lugar del Cuerpo).",
+    )
+    add_window_args(parser)
+    profiling.add_profile_args(parser)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    params = _parse_args()
+    corte = resolve_since(params.since, params.window)
+    with profiling.perfilar("clasificador", params.profile):
+        if params.store:
+            with ArticleStore(params.store) as store:
+                run_pipeline(store, since=corte, digest=params.digest)
+        else:
+            run_pipeline(since=corte, digest=params.digest)
+    endpoints.reportar()
\ No newline at end of file
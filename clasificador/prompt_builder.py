@@ -0,0 +1,203 @@
+"""
+Construcción de los mensajes del clasificador.
+
+Formato legado (por defecto): un único mensaje de usuario con {"instrucciones": ...,
+"items": [...]}, donde las instrucciones estáticas quedan dentro de un JSON que cambia en
+cada lote y cada item repite las claves "titulo"/"description"/"body".
+
+Formato compacto (con PROMPT_COMPACTO = True en config.py):
+- mensaje de sistema = CLASIF_PROMPT_SYSTEM + instrucciones, idéntico en todos los
+  llamados → prefijo estable que el proveedor puede cachear;
+- mensaje de usuario = sólo una tabla separada por tabuladores (i, t, d, b) con índices
+  locales al lote;
+- la respuesta usa claves cortas ({"i", "m"} y, con digest, "h"/"c"/"a") y códigos de
+  ministerio; `expandir_respuesta` la traduce al formato de ClasifOut / ClasifDigestOut.
+
+Todas las funciones aceptan `prompts`: reemplazos de las constantes de prompts.py por
+nombre (p. ej. {"CLASIF_COMPACTO_PROMPT": "..."}), que usa el runner de experimentos.
+
+Comparar el tamaño de ambos formatos sobre el dataset:
+    python -m clasificador.prompt_builder [--input data/noticias.json] [--digest]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from json import dumps
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .budget import estimar_tokens
+from .config import DIGEST_CUERPO_MAX_CHARS, INPUT_FILE, LOTE
+from .prompts import (
+    CLASIF_COMPACTO_DIGEST_PROMPT,
+    CLASIF_COMPACTO_PROMPT,
+    CLASIF_DIGEST_PROMPT_USER,
+    CLASIF_PROMPT_SYSTEM,
+    CLASIF_PROMPT_USER,
+)
+
+CODIGOS = {"SAL": "Salud", "EDU": "Educación", "SEG": "Seguridad", "TRA": "Trabajo", "ECO": "Economía"}
+MARCA_TABLA = "ITEMS"
+COLUMNAS = ("i", "t", "d", "b")
+# Mismos recortes que el formato legado: título, descripción y cuerpo (con digest el
+# cuerpo llega hasta DIGEST_CUERPO_MAX_CHARS, ver `limite_cuerpo`)
+LIMITES = {"t": 300, "d": 800, "b": 2000}
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def _celda(texto: Any, limite: int) -> str:
+    """Recorta y colapsa espacios, tabs y saltos de línea (no pueden aparecer dentro de una celda)."""
+    return _ESPACIOS.sub(" ", str(texto or "")[:limite]).strip()
+
+
+def limite_cuerpo(con_digest: bool = False) -> int:
+    """Caracteres del cuerpo que se envían: el digest reemplaza al cuerpo en el summarizer."""
+    return DIGEST_CUERPO_MAX_CHARS if con_digest else LIMITES["b"]
+
+
+def tabla_items(lote: List[Dict], con_digest: bool = False) -> str:
+    """Tabla TSV con encabezado; la columna i es el índice dentro del lote."""
+    filas = [MARCA_TABLA, "\t".join(COLUMNAS)]
+    for i, it in enumerate(lote):
+        filas.append("\t".join((
+            str(i),
+            _celda(it.get("Titulo"), LIMITES["t"]),
+            _celda(it.get("Descripcion"), LIMITES["d"]),
+            _celda(it.get("Cuerpo"), limite_cuerpo(con_digest)),
+        )))
+    return "\n".join(filas)
+
+
+def leer_tabla(texto: str) -> List[Dict[str, str]]:
+    """Inversa de `tabla_items` (la usa el servidor local de pruebas)."""
+    lineas = texto.splitlines()
+    if not lineas or lineas[0].strip() != MARCA_TABLA:
+        raise ValueError("El mensaje no es una tabla de items.")
+    columnas = lineas[1].split("\t")
+    return [dict(zip(columnas, linea.split("\t"))) for linea in lineas[2:] if linea.strip()]
+
+
+_PROMPTS = {
+    "CLASIF_PROMPT_SYSTEM": CLASIF_PROMPT_SYSTEM,
+    "CLASIF_PROMPT_USER": CLASIF_PROMPT_USER,
+    "CLASIF_DIGEST_PROMPT_USER": CLASIF_DIGEST_PROMPT_USER,
+    "CLASIF_COMPACTO_PROMPT": CLASIF_COMPACTO_PROMPT,
+    "CLASIF_COMPACTO_DIGEST_PROMPT": CLASIF_COMPACTO_DIGEST_PROMPT,
+}
+
+
+def _prompt(nombre: str, prompts: Optional[Dict[str, str]]) -> str:
+    return (prompts or {}).get(nombre) or _PROMPTS[nombre]
+
+
+def prefijo_sistema(con_digest: bool = False, prompts: Optional[Dict[str, str]] = None) -> str:
+    """Contenido estático del mensaje de sistema (igual en todos los lotes)."""
+    instrucciones = _prompt("CLASIF_COMPACTO_DIGEST_PROMPT" if con_digest else "CLASIF_COMPACTO_PROMPT", prompts)
+    return f"{_prompt('CLASIF_PROMPT_SYSTEM', prompts)}\n{instrucciones}"
+
+
+def mensajes_compactos(
+    lote: List[Dict], con_digest: bool = False, prompts: Optional[Dict[str, str]] = None
+) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": prefijo_sistema(con_digest, prompts)},
+        {"role": "user", "content": tabla_items(lote, con_digest)},
+    ]
+
+
+def mensajes_legado(
+    lote: List[Dict], start_idx: int, con_digest: bool = False, prompts: Optional[Dict[str, str]] = None
+) -> List[Dict[str, str]]:
+    """Formato original: instrucciones + items con claves largas dentro de un JSON."""
+    compact = [{
+        "idx": start_idx + i,
+        "titulo": (it.get("Titulo") or "")[:300],
+        "description": (it.get("Descripcion") or "")[:800],
+        "body": (it.get("Cuerpo") or "")[:limite_cuerpo(con_digest)],
+    } for i, it in enumerate(lote)]
+
+    user_payload = {
+        "instrucciones": _prompt("CLASIF_DIGEST_PROMPT_USER" if con_digest else "CLASIF_PROMPT_USER", prompts),
+        "items": compact
+    }
+    return [
+        {"role": "system", "content": _prompt("CLASIF_PROMPT_SYSTEM", prompts)},
+        {"role": "user", "content": dumps(user_payload, ensure_ascii=False)},
+    ]
+
+
+def expandir_respuesta(raw: Any, start_idx: int) -> Any:
+    """
+    Traduce la respuesta compacta a dicts con el formato de ClasifOut / ClasifDigestOut:
+    i → idx (sumando `start_idx`), códigos → nombres de ministerio, h/c/a → digest.
+    Acepta también objetos que ya vengan con las claves largas.
+    """
+    if not isinstance(raw, list):
+        return raw
+    expandidos = []
+    for obj in raw:
+        if not isinstance(obj, dict) or "i" not in obj:
+            expandidos.append(obj)
+            continue
+        registro: Dict[str, Any] = {
+            "idx": start_idx + int(obj["i"]),
+            "ministerio": [
+                CODIGOS.get(str(m).strip().upper(), m) for m in (obj.get("m") or [])
+            ],
+        }
+        if any(k in obj for k in ("h", "c", "a")):
+            registro["digest"] = {
+                "hechos": obj.get("h") or [],
+                "cifras": obj.get("c") or [],
+                "actores": obj.get("a") or [],
+            }
+        expandidos.append(registro)
+    return expandidos
+
+
+def medir(lotes: List[List[Dict]], con_digest: bool = False) -> Dict[str, float]:
+    """Tokens estimados por item en ambos formatos (total y parte variable, sin el prefijo)."""
+    n = sum(len(lote) for lote in lotes) or 1
+    legado = compacto = variable = 0
+    inicio = 0
+    for lote in lotes:
+        legado += estimar_tokens(mensajes_legado(lote, inicio, con_digest))
+        mensajes = mensajes_compactos(lote, con_digest)
+        compacto += estimar_tokens(mensajes)
+        variable += estimar_tokens(mensajes[1:])
+        inicio += len(lote)
+    return {
+        "items": n,
+        "lotes": len(lotes),
+        "prefijo_tokens": estimar_tokens([{"content": prefijo_sistema(con_digest)}]),
+        "legado_por_item": round(legado / n, 1),
+        "compacto_por_item": round(compacto / n, 1),
+        "compacto_variable_por_item": round(variable / n, 1),
+        "reduccion_pct": round(100.0 * (1 - compacto / legado), 1) if legado else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compara los tokens por item del prompt legado y el compacto."
+    )
+    parser.add_argument("--input", default=INPUT_FILE, help="JSON de artículos.")
+    parser.add_argument("--digest", action="store_true", help="Mide el modo clasificación + digest.")
+    args = parser.parse_args(argv)
+
+    articulos = json.loads(Path(args.input).read_text(encoding="utf-8"))
+    lotes = [articulos[i:i + LOTE] for i in range(0, len(articulos), LOTE)]
+    r = medir(lotes, args.digest)
+    print(f"{r['items']} items en {r['lotes']} lote(s) de {LOTE} (≈ 4 caracteres por token)")
+    print(f"Legado:    {r['legado_por_item']} tokens/item")
+    print(f"Compacto:  {r['compacto_por_item']} tokens/item "
+          f"({r['compacto_variable_por_item']} variables + prefijo estable de {r['prefijo_tokens']} por lote)")
+    print(f"Reducción: {r['reduccion_pct']}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -18,3 +18,64 @@ Reglas IMPORTANTES:
 - "ministerio" debe ser una lista de strings del conjunto permitido (sensibles a mayúsculas y acentos).
 - No agregues texto antes o después del JSON.
 """
+
+# Modo combinado (--digest): además de clasificar, extraer un digest compacto por artículo
+# para que el summarizer no tenga que recibir el cuerpo completo otra vez.
+CLASIF_DIGEST_PROMPT_USER = """Clasifica cada item en ministerios de este conjunto exacto: {Salud, Educación, Seguridad, Trabajo, Economía}
+y extrae un digest compacto de cada noticia.
+Puedes asignar uno o varios ministerios por item (lista).
+Analiza TÍTULO, DESCRIPTION y, si está, BODY (puede venir truncado).
+
+Formato de respuesta: EXCLUSIVAMENTE una lista JSON de objetos:
+[
+  {"idx": <int>, "ministerio": ["Salud", "Economía"],
+   "digest": {"hechos": ["..."], "cifras": ["..."], "actores": ["..."]}},
+  ...
+]
+
+Reglas IMPORTANTES:
+- No inventes campos extra.
+- "idx" debe coincidir con el índice provisto en el payload de entrada.
+- "ministerio" debe ser una lista de strings del conjunto permitido (sensibles a mayúsculas y acentos).
+- "digest.hechos": hasta 3 oraciones breves con los hechos centrales, usando las palabras de la nota.
+- "digest.cifras": hasta 5 datos numéricos textuales (montos, porcentajes, fechas) con su contexto mínimo.
+- "digest.actores": hasta 5 personas u organismos mencionados.
+- No agregues texto antes o después del JSON.
+"""
+
+# Formato compacto (clasificador/prompt_builder.py): todo lo estático va en el mensaje de
+# sistema, idéntico en cada llamado, para aprovechar el caché de prefijos del proveedor.
+# El mensaje de usuario trae sólo la tabla de items.
+CLASIF_COMPACTO_PROMPT = """Clasifica cada item en ministerios. Códigos: SAL=Salud, EDU=Educación, SEG=Seguridad, TRA=Trabajo, ECO=Economía.
+Puedes asignar uno o varios ministerios por item.
+
+Entrada: una tabla separada por tabuladores, una fila por item, con columnas
+i (índice), t (título), d (descripción), b (cuerpo, puede venir truncado).
+
+Formato de respuesta: EXCLUSIVAMENTE una lista JSON, un objeto por fila:
+[{"i": 0, "m": ["SAL", "ECO"]}, {"i": 1, "m": []}]
+
+Reglas IMPORTANTES:
+- "i" debe coincidir con la columna i de la fila.
+- "m" es una lista de códigos del conjunto permitido (puede ser vacía).
+- No inventes campos extra ni agregues texto antes o después del JSON.
+"""
+
+CLASIF_COMPACTO_DIGEST_PROMPT = """Clasifica cada item en ministerios y extrae un digest compacto de cada noticia.
+Códigos: SAL=Salud, EDU=Educación, SEG=Seguridad, TRA=Trabajo, ECO=Economía.
+Puedes asignar uno o varios ministerios por item.
+
+Entrada: una tabla separada por tabuladores, una fila por item, con columnas
+i (índice), t (título), d (descripción), b (cuerpo, puede venir truncado).
+
+Formato de respuesta: EXCLUSIVAMENTE una lista JSON, un objeto por fila:
+[{"i": 0, "m": ["SAL"], "h": ["..."], "c": ["..."], "a": ["..."]}]
+
+Reglas IMPORTANTES:
+- "i" debe coincidir con la columna i de la fila.
+- "m" es una lista de códigos del conjunto permitido (puede ser vacía).
+- "h": hasta 3 oraciones breves con los hechos centrales, usando las palabras de la nota.
+- "c": hasta 5 datos numéricos textuales (montos, porcentajes, fechas) con su contexto mínimo.
+- "a": hasta 5 personas u organismos mencionados.
+- No inventes campos extra ni agregues texto antes o después del JSON.
+"""
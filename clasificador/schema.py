@@ -1,9 +1,22 @@
 from __future__ import annotations
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 class ClasifOut(BaseModel):
     idx: int
     ministerio: List[str]
 
+class Digest(BaseModel):
+    """Resumen compacto de un artículo: lo que el summarizer usa en lugar del cuerpo completo."""
+    hechos: List[str] = Field(default_factory=list)
+    cifras: List[str] = Field(default_factory=list)
+    actores: List[str] = Field(default_factory=list)
+
+class ClasifDigestOut(ClasifOut):
+    digest: Digest = Field(default_factory=Digest)
+
 MINISTERIOS_VALIDOS = {"Salud", "Educación", "Seguridad", "Trabajo", "Economía"}
+
+# Límites del digest (se recorta lo que el modelo devuelva de más)
+DIGEST_MAX_ITEMS = {"hechos": 3, "cifras": 5, "actores": 5}
+DIGEST_MAX_CHARS = 200
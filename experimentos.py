@@ -0,0 +1,422 @@
+"""
+Runner de experimentos: grilla de variantes de prompt × modelos (× ministerios) con
+generación concurrente, evaluación en lote y tabla comparativa.
+
+La grilla es un JSON:
+
+    {
+      "nombre": "resumen-breve",
+      "tarea": "resumen",                       // o "clasificacion"
+      "modelos": ["minimax/minimax-m2:free", "otro/modelo"],
+      "ministerios": ["Salud", "Economía"],     // (resumen) por defecto, todos
+      "limite": 200,                            // (clasificacion) primeros N artículos etiquetados
+      "variantes": {
+        "base": {},
+        "breve": {"SUMMARIZE_PROMPT_USER": "@prompts/breve.txt"},
+        "compacto": {"formato": "compacto"}     // (clasificacion) prompt compacto (prompt_builder.py)
+      }
+    }
+
+Cada variante reemplaza constantes de summarizer/prompts.py o clasificador/prompts.py por
+nombre; un valor "@archivo" se lee relativo al JSON de la grilla. `{}` = prompts actuales.
+
+- Las entradas se preparan una sola vez: el set etiquetado se lee una vez (índice + blob
+  si está vigente) y el listado formateado de cada ministerio se reutiliza en todas las
+  celdas.
+- Las celdas (variante × modelo × ministerio o lote) se generan en paralelo con --workers
+  threads, cada una con el modelo fijo (sin fallback; con OPENROUTER_HEDGE el duplicado va
+  al mismo modelo y su uso se suma al de la celda).
+- Cada respuesta se guarda en EXPERIMENTOS_DIR/cache con clave = modelo + mensajes: al
+  repetir la grilla sólo se generan las celdas nuevas (se conservan la latencia y los
+  tokens de la generación original). --sin-cache lo desactiva.
+- Evaluación: clasificación → exact match y precision/recall/F1 micro contra las
+  etiquetas del set (por defecto noticias_etiquetadas.json); resumen → soporte léxico
+  (proporción de palabras del resumen presentes en las fuentes), largo y, con
+  --bertscore, BERTScore en una única pasada para todas las celdas.
+
+Uso:
+    python experimentos.py grilla.json [--workers 8] [--bertscore] [--sin-cache]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import sys
+sys.stdout.reconfigure(encoding="utf-8")
+
+from clasificador import openrouter_client
+from clasificador.config import LOTE, OUTPUT_FILE as ETIQUETADAS_FILE
+from clasificador.pipeline_classificador import clasificar_lote
+from clasificador.schema import MINISTERIOS_VALIDOS
+from summarizer import eval_metrics
+from summarizer.config import EVAL_LANG, EVAL_MODEL_NAME, EVAL_RESCALE_WITH_BASELINE
+from summarizer.pipeline_summarizer import _formatear_articulos, mensajes_resumen
+from utils.article_index import abrir_si_vigente
+from utils.json_utils import write_json_atomic
+from utils.metrics import percentil
+
+EXPERIMENTOS_DIR = Path("./data/outputs/experimentos")
+WORKERS = 8
+TAREAS = ("resumen", "clasificacion")
+
+_PALABRA = re.compile(r"\w{4,}")
+
+
+# -------------------------------
+# Grilla y entradas
+# -------------------------------
+
+def cargar_grilla(path: Path) -> Dict[str, Any]:
+    """Lee y valida la grilla; resuelve los valores "@archivo" de las variantes."""
+    grilla = json.loads(Path(path).read_text(encoding="utf-8"))
+    if grilla.get("tarea") not in TAREAS:
+        raise ValueError(f"'tarea' debe ser una de {TAREAS}")
+    if not grilla.get("modelos"):
+        raise ValueError("La grilla necesita al menos un modelo en 'modelos'")
+    variantes = grilla.get("variantes") or {"base": {}}
+    for nombre, variante in variantes.items():
+        for clave, valor in list(variante.items()):
+            if isinstance(valor, str) and valor.startswith("@"):
+                variante[clave] = (Path(path).parent / valor[1:]).read_text(encoding="utf-8")
+    grilla["variantes"] = variantes
+    ministerios = grilla.get("ministerios") or sorted(MINISTERIOS_VALIDOS)
+    invalidos = set(ministerios) - MINISTERIOS_VALIDOS
+    if invalidos:
+        raise ValueError(f"Ministerios inválidos: {sorted(invalidos)}")
+    grilla["ministerios"] = ministerios
+    grilla.setdefault("nombre", Path(path).stem)
+    return grilla
+
+
+def _leer_etiquetadas(path: Path, ministerios: Optional[List[str]] = None) -> List[Dict]:
+    """Artículos etiquetados (sólo los de `ministerios` si hay un índice vigente)."""
+    indice = abrir_si_vigente(path)
+    if indice is not None and ministerios is not None:
+        with indice:
+            vistos, articulos = set(), []
+            for m in ministerios:
+                for e in indice.por_ministerio(m):
+                    if id(e) not in vistos:
+                        vistos.add(id(e))
+                        articulos.append(indice.materializar(e))
+            return articulos
+    if indice is not None:
+        indice.close()
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# -------------------------------
+# Caché de respuestas
+# -------------------------------
+
+class CacheRespuestas:
+    """Una respuesta por archivo JSON, con clave sha256 de (modelo, mensajes o entrada)."""
+
+    def __init__(self, directorio: Path, habilitada: bool = True):
+        self.dir = Path(directorio)
+        self.habilitada = habilitada
+        if habilitada:
+            self.dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def clave(*partes: Any) -> str:
+        return hashlib.sha256(json.dumps(partes, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def leer(self, clave: str) -> Optional[Dict]:
+        if not self.habilitada:
+            return None
+        path = self.dir / f"{clave}.json"
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+    def guardar(self, clave: str, registro: Dict) -> None:
+        if self.habilitada:
+            write_json_atomic(self.dir / f"{clave}.json", registro)
+
+
+def _generar(cache: CacheRespuestas, clave: str, funcion) -> Dict:
+    """Ejecuta `funcion()` midiendo latencia y uso de tokens, o devuelve la respuesta cacheada."""
+    registro = cache.leer(clave)
+    if registro is not None:
+        return {**registro, "cache": True}
+    with openrouter_client.medir_uso() as uso:
+        t0 = time.perf_counter()
+        salida = funcion()
+        latencia = time.perf_counter() - t0
+    registro = {"salida": salida, "latencia_s": round(latencia, 4), "uso": dict(uso)}
+    cache.guardar(clave, registro)
+    return {**registro, "cache": False}
+
+
+# -------------------------------
+# Celdas
+# -------------------------------
+
+def _celdas_resumen(grilla: Dict, etiquetadas: Path, cache: CacheRespuestas):
+    articulos = _leer_etiquetadas(etiquetadas, grilla["ministerios"])
+    entradas: Dict[str, Tuple[int, str]] = {}
+    referencias: Dict[str, str] = {}
+    for m in grilla["ministerios"]:
+        del_ministerio = [a for a in articulos if m in (a.get("ministerio") or [])]
+        entradas[m] = (len(del_ministerio), _formatear_articulos(del_ministerio))
+        registros = (eval_metrics._to_article_record(a) for a in del_ministerio)
+        referencias[m] = "\n\n".join(r.contenido for r in registros if r is not None)
+
+    celdas = []
+    for variante, prompts in grilla["variantes"].items():
+        for modelo in grilla["modelos"]:
+            for m in grilla["ministerios"]:
+                total, listado = entradas[m]
+                if total == 0:
+                    continue
+                mensajes = mensajes_resumen(m, total, listado, prompts)
+                clave = cache.clave("resumen", modelo, mensajes)
+                funcion = lambda mensajes=mensajes, modelo=modelo: (
+                    openrouter_client.call_openrouter_api(mensajes, modelo=modelo).strip()
+                )
+                celdas.append(({"variante": variante, "modelo": modelo, "ministerio": m}, clave, funcion))
+    return celdas, referencias
+
+
+def _celdas_clasificacion(grilla: Dict, etiquetadas: Path, cache: CacheRespuestas):
+    articulos = [a for a in _leer_etiquetadas(etiquetadas) if "ministerio" in a]
+    articulos = articulos[: grilla.get("limite") or len(articulos)]
+    lotes = [articulos[i:i + LOTE] for i in range(0, len(articulos), LOTE)]
+    oro = [sorted(a.get("ministerio") or []) for a in articulos]
+
+    celdas = []
+    for variante, prompts in grilla["variantes"].items():
+        textos = {k: v for k, v in prompts.items() if k != "formato"}
+        formato = prompts.get("formato") or grilla.get("formato")
+        compacto = None if formato is None else formato == "compacto"
+        for modelo in grilla["modelos"]:
+            for n, lote in enumerate(lotes):
+                inicio = n * LOTE
+                clave = cache.clave(
+                    "clasificacion", modelo, textos, formato,
+                    [[a.get("Link"), a.get("Titulo"), a.get("Cuerpo")] for a in lote],
+                )
+                funcion = lambda lote=lote, inicio=inicio, modelo=modelo, textos=textos, compacto=compacto: [
+                    r.model_dump() for r in clasificar_lote(
+                        lote, inicio, prompts=textos, modelo=modelo, compacto=compacto
+                    )
+                ]
+                celdas.append(({"variante": variante, "modelo": modelo, "lote": n, "inicio": inicio,
+                                "items": len(lote)}, clave, funcion))
+    return celdas, oro
+
+
+# -------------------------------
+# Evaluación
+# -------------------------------
+
+def soporte_lexico(resumen: str, fuentes: str) -> float:
+    """Proporción de palabras (4+ letras) del resumen que aparecen en las fuentes."""
+    palabras = _PALABRA.findall(resumen.lower())
+    if not palabras:
+        return 0.0
+    vocabulario = set(_PALABRA.findall(fuentes.lower()))
+    return sum(1 for p in palabras if p in vocabulario) / len(palabras)
+
+
+def _prf(predichos: List[List[str]], oro: List[List[str]]) -> Dict[str, float]:
+    vp = fp = fn = exactos = 0
+    for pred, real in zip(predichos, oro):
+        pred, real = set(pred), set(real)
+        vp += len(pred & real)
+        fp += len(pred - real)
+        fn += len(real - pred)
+        exactos += pred == real
+    precision = vp / (vp + fp) if vp + fp else 0.0
+    recall = vp / (vp + fn) if vp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "exact_match": round(exactos / len(oro), 4) if oro else 0.0,
+        "precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+    }
+
+
+def _agrupar(filas: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+    grupos: Dict[Tuple[str, str], List[Dict]] = {}
+    for fila in filas:
+        grupos.setdefault((fila["variante"], fila["modelo"]), []).append(fila)
+    return grupos
+
+
+def _costos(filas: List[Dict]) -> Dict[str, Any]:
+    latencias = [f["latencia_s"] for f in filas if f.get("error") is None]
+    return {
+        "llamadas": sum(f["uso"]["llamadas"] for f in filas if f.get("uso")),
+        "latencia_p50_s": round(percentil(latencias, 50), 3),
+        "latencia_p95_s": round(percentil(latencias, 95), 3),
+        "prompt_tokens": sum(f["uso"]["prompt_tokens"] for f in filas if f.get("uso")),
+        "completion_tokens": sum(f["uso"]["completion_tokens"] for f in filas if f.get("uso")),
+        "costo_usd": round(sum(f["uso"]["costo_usd"] for f in filas if f.get("uso")), 6),
+        "errores": sum(1 for f in filas if f.get("error")),
+        "cacheadas": sum(1 for f in filas if f.get("cache")),
+    }
+
+
+def evaluar_clasificacion(filas: List[Dict], oro: List[List[str]]) -> List[Dict]:
+    tabla = []
+    for (variante, modelo), grupo in _agrupar(filas).items():
+        predichos: List[Optional[List[str]]] = [None] * len(oro)
+        for fila in grupo:
+            for r in fila.get("salida") or []:
+                if 0 <= r["idx"] < len(oro):
+                    predichos[r["idx"]] = r["ministerio"]
+        # Items sin respuesta (lote con error o idx faltante) cuentan como sin ministerio
+        pares = [(p or [], o) for p, o in zip(predichos, oro)]
+        tabla.append({
+            "variante": variante, "modelo": modelo, "items": len(oro),
+            "sin_respuesta": sum(1 for p in predichos if p is None),
+            **_prf([p for p, _ in pares], [o for _, o in pares]),
+            **_costos(grupo),
+        })
+    return tabla
+
+
+def evaluar_resumen(filas: List[Dict], referencias: Dict[str, str], bertscore: bool) -> List[Dict]:
+    for fila in filas:
+        texto = fila.get("salida") or ""
+        fila["soporte"] = round(soporte_lexico(texto, referencias[fila["ministerio"]]), 4)
+        fila["palabras"] = len(texto.split())
+    if bertscore:
+        evaluables = [f for f in filas if f.get("salida")]
+        if evaluables:
+            # Una sola pasada de BERTScore para todas las celdas (carga el modelo una vez)
+            _, _, f1 = eval_metrics._compute_bertscore(
+                [f["salida"] for f in evaluables], [referencias[f["ministerio"]] for f in evaluables],
+                lang=EVAL_LANG, model_type=EVAL_MODEL_NAME, rescale_with_baseline=EVAL_RESCALE_WITH_BASELINE,
+            )
+            for fila, valor in zip(evaluables, f1):
+                fila["bertscore_f1"] = round(valor, 4)
+
+    tabla = []
+    for (variante, modelo), grupo in _agrupar(filas).items():
+        ok = [f for f in grupo if f.get("salida")]
+        fila = {
+            "variante": variante, "modelo": modelo, "ministerios": len(grupo),
+            "soporte": round(sum(f["soporte"] for f in ok) / len(ok), 4) if ok else 0.0,
+            "palabras": round(sum(f["palabras"] for f in ok) / len(ok), 1) if ok else 0.0,
+        }
+        if bertscore:
+            valores = [f["bertscore_f1"] for f in ok if "bertscore_f1" in f]
+            fila["bertscore_f1"] = round(sum(valores) / len(valores), 4) if valores else 0.0
+        fila.update(_costos(grupo))
+        tabla.append(fila)
+    return tabla
+
+
+# -------------------------------
+# Ejecución
+# -------------------------------
+
+def correr_experimento(
+    grilla: Dict,
+    etiquetadas: Path = Path(ETIQUETADAS_FILE),
+    workers: int = WORKERS,
+    usar_cache: bool = True,
+    bertscore: bool = False,
+    directorio: Path = EXPERIMENTOS_DIR,
+) -> Dict:
+    cache = CacheRespuestas(Path(directorio) / "cache", usar_cache)
+    if grilla["tarea"] == "resumen":
+        celdas, referencias = _celdas_resumen(grilla, etiquetadas, cache)
+    else:
+        celdas, oro = _celdas_clasificacion(grilla, etiquetadas, cache)
+    print(f"Celdas:           {len(celdas)} ({len(grilla['variantes'])} variante(s) × "
+          f"{len(grilla['modelos'])} modelo(s)), {workers} workers")
+
+    filas: List[Dict] = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+
+    def ejecutar(meta, clave, funcion) -> Dict:
+        try:
+            return {**meta, **_generar(cache, clave, funcion), "error": None}
+        except Exception as exc:
+            return {**meta, "salida": None, "latencia_s": 0.0, "uso": None, "cache": False,
+                    "error": f"{type(exc).__name__}: {exc}"[:300]}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="experimento") as pool:
+        futuros = [pool.submit(ejecutar, *celda) for celda in celdas]
+        for n, futuro in enumerate(as_completed(futuros), start=1):
+            fila = futuro.result()
+            with lock:
+                filas.append(fila)
+            if fila["error"]:
+                print(f"   ✗ {fila['variante']} / {fila['modelo']}: {fila['error']}")
+            if n % 10 == 0 or n == len(futuros):
+                print(f"   {n}/{len(futuros)} celdas")
+    duracion = time.perf_counter() - t0
+
+    if grilla["tarea"] == "resumen":
+        tabla = evaluar_resumen(filas, referencias, bertscore)
+    else:
+        tabla = evaluar_clasificacion(filas, oro)
+    return {
+        "nombre": grilla["nombre"],
+        "tarea": grilla["tarea"],
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "wall_time_s": round(duracion, 3),
+        "grilla": grilla,
+        "tabla": sorted(tabla, key=lambda f: (f["variante"], f["modelo"])),
+        "celdas": sorted(filas, key=lambda f: (f["variante"], f["modelo"], f.get("ministerio") or f.get("lote"))),
+    }
+
+
+_COLUMNAS = {
+    "resumen": [("soporte", "Soporte"), ("palabras", "Palabras"), ("bertscore_f1", "BERTScore")],
+    "clasificacion": [("exact_match", "Exact"), ("precision", "P"), ("recall", "R"), ("f1", "F1")],
+}
+
+
+def imprimir_tabla(resultado: Dict) -> None:
+    columnas = [(k, t) for k, t in _COLUMNAS[resultado["tarea"]] if any(k in f for f in resultado["tabla"])]
+    columnas += [("latencia_p50_s", "p50 s"), ("latencia_p95_s", "p95 s"), ("prompt_tokens", "Tok in"),
+                 ("completion_tokens", "Tok out"), ("costo_usd", "USD"), ("errores", "Err")]
+    print("════════════════════════════════════════")
+    print(f" Experimento {resultado['nombre']} ({resultado['tarea']}) 🧪 ")
+    print("════════════════════════════════════════")
+    print(f"{'Variante':<16} {'Modelo':<28} " + " ".join(f"{t:>9}" for _, t in columnas))
+    for fila in resultado["tabla"]:
+        valores = " ".join(f"{fila.get(k, ''):>9}" for k, _ in columnas)
+        print(f"{fila['variante'][:16]:<16} {fila['modelo'][:28]:<28} {valores}")
+    print("════════════════════════════════════════")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara variantes de prompt y modelos sobre el set etiquetado.")
+    parser.add_argument("grilla", help="JSON con tarea, modelos, variantes (y ministerios o límite).")
+    parser.add_argument("--input", default=ETIQUETADAS_FILE, help="Set etiquetado (noticias etiquetadas).")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Celdas generándose en paralelo.")
+    parser.add_argument("--bertscore", action="store_true", help="(resumen) Calcula BERTScore (requiere bert-score).")
+    parser.add_argument("--sin-cache", action="store_true", help="Regenera todas las celdas.")
+    parser.add_argument("--salida", default=None, help="JSON de resultado (por defecto en EXPERIMENTOS_DIR).")
+    args = parser.parse_args(argv)
+
+    grilla = cargar_grilla(Path(args.grilla))
+    resultado = correr_experimento(
+        grilla, Path(args.input), workers=args.workers, usar_cache=not args.sin_cache,
+        bertscore=args.bertscore,
+    )
+    imprimir_tabla(resultado)
+    salida = Path(args.salida) if args.salida else (
+        EXPERIMENTOS_DIR / f"{grilla['nombre']}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(salida, resultado)
+    print(f"→ Resultado (tabla y salidas por celda) en {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,115 @@
-import json
+import atexit, json
+import multiprocessing as mp
+import os, queue, threading, time
 import requests, re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 import sys
 sys.stdout.reconfigure(encoding="utf-8")
 
+from utils import metrics, profiling, sitemaps
+from utils.time_utils import format_since, parse_fecha
+from utils.urls import normalize_url
+
 HEADERS = {"User-Agent": "Mozilla/5.0"}
+# Mismo archivo que lee el clasificador (clasificador.config.INPUT_FILE)
+OUTPUT_FILE = "./data/noticias.json"
+# Descubrimiento de links en SITES: "home" (portada), "sitemap" (robots.txt + sitemaps,
+# con la portada como respaldo si el sitio no publica ninguno) o "ambos"
+DESCUBRIMIENTO = "home"
+# Máximo de sitemaps descargados por sitio al recorrer índices
+MAX_SITEMAPS_POR_SITIO = 8
+# Descargas (hilos) y parseo (procesos) desacoplados por una cola acotada:
+# con PARSE_WORKERS = 0 se parsea en los mismos hilos de descarga
+FETCH_WORKERS = 16
+PARSE_WORKERS = os.cpu_count() or 1
+COLA_MAX = 64
+# Con menos tareas (feeds o artículos) que esto se parsea en el propio hilo: no compensa el IPC
+PARSE_MIN_PROCESOS = 8
+# Los procesos de parseo no se crean con fork: el scraper y el servicio ya tienen hilos vivos
+PARSE_MP_CONTEXT = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+_pools_parseo = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_parseo(workers):
+    """Pool de procesos de parseo persistente (uno por tamaño), compartido entre llamadas."""
+    with _pools_lock:
+        pool = _pools_parseo.get(workers)
+        if pool is None:
+            pool = _pools_parseo[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp.get_context(PARSE_MP_CONTEXT)
+            )
+        return pool
+
+
+def _enviar_parseo(workers, func, *args):
+    """submit al pool de parseo; si un proceso murió (pool roto) lo reemplaza y reintenta una vez."""
+    pool = _pool_parseo(workers)
+    try:
+        return pool.submit(func, *args)
+    except BrokenProcessPool:
+        with _pools_lock:
+            if _pools_parseo.get(workers) is pool:
+                del _pools_parseo[workers]
+        pool.shutdown(wait=False, cancel_futures=True)
+        return _pool_parseo(workers).submit(func, *args)
+
+
+@atexit.register
+def _cerrar_pools_parseo():
+    with _pools_lock:
+        for pool in _pools_parseo.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+        _pools_parseo.clear()
+
+def _http_get(url: str, tipo: str, timeout: float) -> requests.Response:
+    """GET con HEADERS registrando un span `http_fetch` (tipo, host, status y bytes)."""
+    with metrics.span("http_fetch", tipo=tipo, host=urlparse(url).netloc) as sp:
+        r = requests.get(url, headers=HEADERS, timeout=timeout)
+        sp.set(status=r.status_code, bytes=len(r.content))
+    metrics.incr("http_fetch", tipo=tipo, status=r.status_code)
+    return r
+
+
+@contextmanager
+def _http_stream(url: str, tipo: str, timeout: float):
+    """Como `_http_get` pero sin leer el cuerpo: entrega el stream binario (descomprimido)."""
+    with metrics.span("http_fetch", tipo=tipo, host=urlparse(url).netloc) as sp:
+        with requests.get(url, headers=HEADERS, timeout=timeout, stream=True) as r:
+            sp.set(status=r.status_code)
+            metrics.incr("http_fetch", tipo=tipo, status=r.status_code)
+            r.raise_for_status()
+            r.raw.decode_content = True
+            r.raw.auto_close = False  # lo cierra el `with`; GzipFile puede leer después del EOF
+            try:
+                yield r.raw
+            finally:
+                sp.set(bytes=r.raw.tell())
+
 
 # Funcion para extraer los datos de la noticia desde el bloque JSON-LD
-def extract_jsonld(url: str) -> dict:
+def extract_jsonld(url: str, archivo=None) -> dict:
+    """
+    Descarga una noticia y extrae sus datos con `parse_jsonld_html`.
+
+    Con `archivo` (utils.html_archive.HtmlArchive) guarda la respuesta cruda antes de
+    parsear, así se puede re-extraer más adelante sin volver a descargarla.
+    """
+    contenido, encoding = _descargar_articulo(url, archivo)
+    return parse_jsonld_html(contenido.decode(encoding, errors="replace") if encoding else contenido, url)
+
+
+def parse_jsonld_html(html: str, url: str) -> dict:
     """Extrae metadatos y cuerpo de una noticia de Clarín desde el bloque JSON-LD."""
-    r = requests.get(url, headers=HEADERS, timeout=15)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
+    soup = BeautifulSoup(html, "lxml")
 
     for script in soup.find_all("script", {"type": "application/ld+json"}):
         if not script.string:
@@ -62,7 +158,7 @@ def extract_jsonld(url: str) -> dict:
 
 # Funcion para obtener los links de las noticias de la pagina
 def get_news_links(site, limit=30):
-    html = requests.get(site, headers=HEADERS, timeout=20).text
+    html = _http_get(site, "home", timeout=20).text
     soup = BeautifulSoup(html, "lxml")
     base = f"{urlparse(site).scheme}://{urlparse(site).netloc}"
     links = set()
@@ -89,66 +185,320 @@ def get_news_links(site, limit=30):
 
     return list(links)[:limit]
 
+RELEVANTES = [
+    "politica", "economia", "sociedad", "educacion", "seguridad",
+    "nacion", "elecciones", "actualidad", "argentina", "ciudades"
+]
+NO_RELEVANTES = [
+    "deportes", "futbol", "autos", "show", "fama", "espectaculos",
+    "gente", "moda", "estilo", "gastronomia", "viajes", "revista",
+    "salud", "bienestar", "icon", "elviajero", "television", "cultura"
+]
+
+
+def _es_relevante(texto: str) -> bool:
+    lower = texto.lower()
+    if any(x in lower for x in NO_RELEVANTES):
+        return False
+    return any(x in lower for x in RELEVANTES)
+
+
 # Funcion para filtrar los links de las noticias relevantes
 def filter_relevant_links(links):
-    relevantes = [
-        "politica", "economia", "sociedad", "educacion", "seguridad",
-        "nacion", "elecciones", "actualidad", "argentina", "ciudades"
-    ]
-    no_relevantes = [
-        "deportes", "futbol", "autos", "show", "fama", "espectaculos",
-        "gente", "moda", "estilo", "gastronomia", "viajes", "revista",
-        "salud", "bienestar", "icon", "elviajero", "television", "cultura"
-    ]
-
-    fil = []
-    for url in links:
-        lower = url.lower()
-        if any(x in lower for x in no_relevantes):
+    return [url for url in links if _es_relevante(url)]
+
+
+def _sitemaps_del_sitio(base: str) -> list:
+    """Sitemaps declarados en robots.txt (los de Google News primero) o /sitemap.xml."""
+    try:
+        declarados = sitemaps.sitemaps_en_robots(_http_get(f"{base}/robots.txt", "robots", timeout=15).text)
+    except Exception:
+        declarados = []
+    if not declarados:
+        return [f"{base}/sitemap.xml"]
+    news = [u for u in declarados if sitemaps.es_news_sitemap(u)]
+    # Con un sitemap de noticias alcanza: los demás suelen ser el archivo histórico completo
+    return news or declarados
+
+
+def get_sitemap_links(site, limit=30, since=None):
+    """
+    Links de `site` descubiertos vía robots.txt → sitemaps (índices y Google News sitemaps).
+
+    Filtra antes de descargar cualquier artículo: por fecha (`since`, epoch; también saltea
+    sitemaps hijos con <lastmod> anterior), por sección (mismas listas que
+    `filter_relevant_links`, sobre URL + sección) y duplicados. Devuelve los `limit` más
+    recientes (las entradas sin fecha van al final).
+    """
+    base = f"{urlparse(site).scheme}://{urlparse(site).netloc}"
+    pendientes = _sitemaps_del_sitio(base)
+    visitados, seen, entradas = set(), set(), []
+    conteo = {"viejas": 0, "seccion": 0, "sitemaps_salteados": 0}
+    while pendientes and len(visitados) < MAX_SITEMAPS_POR_SITIO:
+        url_sitemap = pendientes.pop(0)
+        if url_sitemap in visitados:
             continue
-        if any(x in lower for x in relevantes):
-            fil.append(url)
-    return fil
+        visitados.add(url_sitemap)
+        hijos = []
+        try:
+            with _http_stream(url_sitemap, "sitemap", timeout=20) as stream:
+                for tipo, e in sitemaps.iterar_sitemap(stream):
+                    if since is not None and e.fecha is not None and e.fecha < since:
+                        conteo["sitemaps_salteados" if tipo == "sitemap" else "viejas"] += 1
+                    elif tipo == "sitemap":
+                        hijos.append(e)
+                    elif not _es_relevante(f"{e.url} {e.seccion}"):
+                        conteo["seccion"] += 1
+                    else:
+                        nu = _normalize_url(e.url)
+                        if nu not in seen:
+                            seen.add(nu); entradas.append(e)
+        except Exception:
+            continue
+        # Índices: primero los sitemaps hijos más recientes
+        hijos.sort(key=lambda e: e.fecha or 0, reverse=True)
+        pendientes.extend(e.url for e in hijos)
+    for clave, n in conteo.items():
+        if n:
+            metrics.incr("sitemap_descartes", n, motivo=clave)
+    entradas.sort(key=lambda e: e.fecha or 0, reverse=True)
+    print(f"   🗺️ {len(visitados)} sitemap(s): {len(entradas)} links relevantes "
+          f"({conteo['viejas']} viejos, {conteo['seccion']} fuera de sección)")
+    return [e.url for e in entradas[:limit]]
 
 
 def _normalize_url(u: str) -> str:
+    return normalize_url(u)
+
+
+def _rss_item_timestamp(item):
+    """Fecha de publicación (epoch) de un <item> RSS según <pubDate>, o None si no se puede leer."""
+    pub = item.find("pubDate")
+    if not pub:
+        return None
+    try:
+        return parsedate_to_datetime(pub.get_text(strip=True)).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rss(xml, since=None):
+    """Links de los <item> de un feed RSS (con `since`, sin los items más viejos)."""
+    links = []
+    soup = BeautifulSoup(xml, "xml")
+    for item in soup.find_all("item"):
+        if since is not None:
+            ts = _rss_item_timestamp(item)
+            if ts is not None and ts < since:
+                continue
+        href = (item.find("link") or {}).get_text(strip=True) if item.find("link") else None
+        if not href:
+            guid = item.find("guid")
+            if guid and guid.get_text(strip=True).startswith("http") and (guid.get("isPermaLink", "false").lower() == "true" or True):
+                href = guid.get_text(strip=True)
+        if href and href.startswith("http"):
+            links.append(href)
+    return links
+
+
+def _descargar_feed(feed):
     try:
-        p = urlparse(u)
-        path = re.sub(r"/{2,}", "/", p.path).rstrip("/")
-        return f"{p.scheme}://{p.netloc}{path}"
+        return _http_get(feed, "rss", timeout=20).text
     except Exception:
-        return u
+        return None
 
 
-def get_rss_links(feed_urls):
+def get_rss_links(feed_urls, since=None, parse_workers=None):
+    """
+    Devuelve los links (normalizados y sin duplicados) de los feeds RSS.
+
+    Con `since` (epoch) descarta los items cuyo <pubDate> es anterior, antes de descargar
+    el artículo; los items sin fecha se conservan y se filtran luego por `Fecha`.
+    Los feeds se descargan en paralelo (hilos) y, si son al menos PARSE_MIN_PROCESOS, se
+    parsean en el pool de `parse_workers` procesos (por defecto PARSE_WORKERS); el orden del
+    resultado sigue el de `feed_urls`.
+    """
+    feed_urls = list(feed_urls)
+    parse_workers = PARSE_WORKERS if parse_workers is None else parse_workers
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(feed_urls) or 1)) as hilos:
+        xmls = [x for x in hilos.map(_descargar_feed, feed_urls) if x is not None]
+    if parse_workers > 1 and len(xmls) >= PARSE_MIN_PROCESOS:
+        por_feed = list(_pool_parseo(parse_workers).map(_parse_rss, xmls, [since] * len(xmls)))
+    else:
+        por_feed = [_parse_rss(x, since) for x in xmls]
+
     links, seen = [], set()
-    for feed in feed_urls:
-        try:
-            xml = requests.get(feed, headers=HEADERS, timeout=20).text
-            soup = BeautifulSoup(xml, "xml")
-            for item in soup.find_all("item"):
-                href = (item.find("link") or {}).get_text(strip=True) if item.find("link") else None
-                if not href:
-                    guid = item.find("guid")
-                    if guid and guid.get_text(strip=True).startswith("http") and (guid.get("isPermaLink", "false").lower() == "true" or True):
-                        href = guid.get_text(strip=True)
-                if href and href.startswith("http"):
-                    nu = _normalize_url(href)
-                    if nu not in seen:
-                        seen.add(nu); links.append(nu)
-        except Exception:
-            pass
+    for hrefs in por_feed:
+        for href in hrefs:
+            nu = _normalize_url(href)
+            if nu not in seen:
+                seen.add(nu); links.append(nu)
+    return links
+
+
+def _descargar_articulo(url, archivo=None):
+    """Descarga (y opcionalmente archiva) un artículo; devuelve los bytes y su encoding."""
+    r = _http_get(url, "articulo", timeout=15)
+    if archivo is not None:
+        archivo.guardar(url, r.status_code, r.content)
+    r.raise_for_status()
+    return r.content, r.encoding
+
+
+def _parsear_articulo(url, contenido, encoding):
+    """(worker) Decodifica y parsea un artículo; devuelve (artículo o None, segundos de CPU)."""
+    t0 = time.perf_counter()
+    html = contenido.decode(encoding, errors="replace") if encoding else contenido
+    try:
+        n = parse_jsonld_html(html, url)
+    except Exception:
+        n = None
+    return n, time.perf_counter() - t0
+
+
+def _extraer_articulos(links, archivo=None, fetch_workers=None, parse_workers=None):
+    """
+    Descarga y parsea `links` con un pipeline productor/consumidor.
+
+    `fetch_workers` hilos descargan los bytes y los dejan en una cola acotada (COLA_MAX);
+    el hilo principal los envía a `parse_workers` procesos (BeautifulSoup/lxml no libera
+    el GIL), con a lo sumo COLA_MAX parseos en vuelo. Si el parseo no da abasto, la cola
+    se llena y las descargas esperan (`espera_cola_s`). Con menos de PARSE_MIN_PROCESOS
+    links se parsea en los hilos de descarga. Devuelve una lista alineada con `links`
+    (None donde falló la descarga o no hubo JSON-LD).
+    """
+    fetch_workers = fetch_workers or FETCH_WORKERS
+    parse_workers = PARSE_WORKERS if parse_workers is None else parse_workers
+    if len(links) < PARSE_MIN_PROCESOS:
+        parse_workers = 0
+    resultados = [None] * len(links)
+    cola = queue.Queue(maxsize=COLA_MAX)
+    lock = threading.Lock()
+    pendientes = iter(enumerate(links))
+    etapas = {
+        "descarga": {"ok": 0, "error": 0, "bytes": 0, "espera_cola_s": 0.0},
+        "parseo": {"ok": 0, "error": 0, "cpu_s": 0.0},
+    }
+
+    def _registrar_parseo(i, n, cpu):
+        resultados[i] = n
+        with lock:
+            etapas["parseo"]["ok" if n else "error"] += 1
+            etapas["parseo"]["cpu_s"] += cpu
+
+    def descargador():
+        while True:
+            with lock:
+                item = next(pendientes, None)
+            if item is None:
+                return
+            i, url = item
+            try:
+                contenido, encoding = _descargar_articulo(url, archivo)
+            except Exception:
+                with lock:
+                    etapas["descarga"]["error"] += 1
+                continue
+            with lock:
+                etapas["descarga"]["ok"] += 1
+                etapas["descarga"]["bytes"] += len(contenido)
+            if parse_workers == 0:
+                _registrar_parseo(i, *_parsear_articulo(url, contenido, encoding))
+                continue
+            t0 = time.perf_counter()
+            cola.put((i, url, contenido, encoding))  # bloquea si el parseo va atrasado
+            with lock:
+                etapas["descarga"]["espera_cola_s"] += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    hilos = [threading.Thread(target=descargador, daemon=True) for _ in range(min(fetch_workers, len(links) or 1))]
+    for h in hilos:
+        h.start()
+
+    def _cerrar_cola():
+        for h in hilos:
+            h.join()
+        cola.put(None)
+
+    threading.Thread(target=_cerrar_cola, daemon=True).start()
+    if parse_workers > 0:
+        en_vuelo = {}
+
+        def _recolectar(terminados):
+            for fut in terminados:
+                i = en_vuelo.pop(fut)
+                try:
+                    n, cpu = fut.result()
+                except Exception as exc:  # p. ej. BrokenProcessPool si murió un proceso
+                    print(f"   ! Error parseando {links[i]}: {type(exc).__name__}: {exc}")
+                    n, cpu = None, 0.0
+                _registrar_parseo(i, n, cpu)
+
+        while (item := cola.get()) is not None:
+            i, url, contenido, encoding = item
+            en_vuelo[_enviar_parseo(parse_workers, _parsear_articulo, url, contenido, encoding)] = i
+            if len(en_vuelo) >= COLA_MAX:
+                _recolectar(wait(en_vuelo, return_when=FIRST_COMPLETED).done)
+        _recolectar(wait(en_vuelo).done)
+    else:
+        cola.get()
+    duracion = time.perf_counter() - t0
+
+    d, p = etapas["descarga"], etapas["parseo"]
+    for etapa, valores in etapas.items():
+        for resultado in ("ok", "error"):
+            if valores[resultado]:
+                metrics.incr("scraper_etapa", valores[resultado], etapa=etapa, resultado=resultado)
+    metrics.anotar(
+        descargas=d["ok"], bytes=d["bytes"], espera_cola_s=round(d["espera_cola_s"], 3),
+        parseos=p["ok"], parseo_cpu_s=round(p["cpu_s"], 3),
+    )
+    if links:
+        print(f"\n⚡ Descarga: {d['ok']} ok / {d['error']} errores, {d['bytes'] / 1e6:.1f} MB "
+              f"({d['ok'] / duracion:.1f}/s, {fetch_workers} hilos, espera por cola {d['espera_cola_s']:.1f}s)")
+        print(f"⚡ Parseo:   {p['ok']} ok / {p['error']} sin JSON-LD "
+              f"({p['ok'] / duracion:.1f}/s, {parse_workers or 'sin'} procesos, CPU {p['cpu_s']:.1f}s)")
+    return resultados
+
+
+def build_news_dataset(sites, feeds=None, limit=30, output_file=OUTPUT_FILE, store=None, since=None,
+                       descubrimiento=DESCUBRIMIENTO, archivo=None):
+    """
+    Recolecta links de `sites` (filtrados) y `feeds` (sin filtrar) y extrae cada artículo.
+
+    `descubrimiento` elige cómo se obtienen los links de `sites`: "home" (portada),
+    "sitemap" (robots.txt + sitemaps, ya filtrados por fecha y sección) o "ambos".
+    Con `archivo` (utils.html_archive.HtmlArchive) guarda el HTML crudo de cada artículo.
+
+    Sin `store` escribe todo en `output_file` (JSON). Con `store` (utils.storage.ArticleStore)
+    no descarga los links que ya están en la base y hace un upsert sólo de los nuevos.
+    Con `since` (epoch) se saltean los items RSS más viejos y se descartan los artículos
+    cuya `Fecha` es anterior al corte.
+    """
+    with metrics.span("scraper") as sp:
+        data = _build_news_dataset(sites, feeds, limit, output_file, store, since, descubrimiento, archivo)
+        sp.set(items=len(data))
+    return data
+
+
+def _links_del_sitio(site, limit, since, descubrimiento):
+    links = []
+    if descubrimiento in ("sitemap", "ambos"):
+        links = get_sitemap_links(site, limit, since=since)
+    if descubrimiento in ("home", "ambos") or not links:
+        links += filter_relevant_links(get_news_links(site, limit))
     return links
 
 
-def build_news_dataset(sites, feeds=None, limit=30):
+def _build_news_dataset(sites, feeds, limit, output_file, store, since, descubrimiento=DESCUBRIMIENTO,
+                        archivo=None):
     from datetime import datetime
     data, all_links, seen = [], [], set()
-    # Links desde home pages (filtrados)
+    # Links desde home pages o sitemaps (filtrados)
     for s in sites:
         print(f"\n🔹 {s}")
         try:
-            for link in filter_relevant_links(get_news_links(s, limit)):
+            for link in _links_del_sitio(s, limit, since, descubrimiento):
                 nu = _normalize_url(link)
                 if nu not in seen:
                     seen.add(nu); all_links.append(nu)
@@ -157,25 +507,196 @@ def build_news_dataset(sites, feeds=None, limit=30):
     # Agregar RSS DESPUES del filtro anterior (sin filtrar)
     if feeds:
         try:
-            for link in get_rss_links(feeds):
+            for link in get_rss_links(feeds, since=since):
                 nu = _normalize_url(link)
                 if nu not in seen:
                     seen.add(nu); all_links.append(nu)
         except Exception:
             pass
+    if store is not None:
+        ya_guardados = store.existing_urls(all_links)
+        all_links = [link for link in all_links if link not in ya_guardados]
+        print(f"\n🔎 {len(ya_guardados)} links ya estaban en {store.path}; quedan {len(all_links)} nuevos")
     # Extraer contenidos
-    for link in all_links:
+    fuera_de_ventana = 0
+    for link, n in zip(all_links, _extraer_articulos(all_links, archivo=archivo)):
+        if not n:
+            metrics.incr("scraper_articulos", resultado="error")
+            continue
+        if since is not None:
+            ts = parse_fecha(n.get("Fecha"))
+            if ts is not None and ts < since:
+                fuera_de_ventana += 1
+                metrics.incr("scraper_articulos", resultado="fuera_de_ventana")
+                continue
+        n.update({"Fuente_base": urlparse(link).netloc, "Extraido_en": datetime.now().isoformat()})
+        data.append(n)
+        metrics.incr("scraper_articulos", resultado="ok")
+        print(" ✅", (n.get("Titulo") or link)[:90])
+    if fuera_de_ventana:
+        print(f"\n⏳ {fuera_de_ventana} artículos descartados por fecha anterior a {format_since(since)}")
+    _guardar_dataset(data, output_file, store)
+    return data
+
+
+def _guardar_dataset(data, output_file, store):
+    if store is not None:
+        print(f"\n💾 Guardado en {store.path}: {store.upsert_articles(data)}")
+    else:
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"\n🗞️ Total: {len(data)} noticias")
+
+
+def _reextraer_bloque(tareas):
+    """(worker) Parsea un bloque de registros del archivo: [(ruta_segmento, entrada), ...]."""
+    from utils.html_archive import leer_registro
+
+    articulos, errores = [], 0
+    for ruta, e in tareas:
+        registro = leer_registro(ruta, e["offset"], e["largo"])
+        if registro.status != 200:
+            continue
         try:
-            n = extract_jsonld(link)
-            if n:
-                n.update({"Fuente_base": urlparse(link).netloc, "Extraido_en": datetime.now().isoformat()})
+            n = parse_jsonld_html(registro.html, registro.url)
+        except Exception:
+            errores += 1
+            continue
+        n.update({"Fuente_base": urlparse(registro.url).netloc, "Extraido_en": registro.fecha})
+        articulos.append(n)
+    return articulos, errores
+
+
+def reextraer(archivo, output_file=OUTPUT_FILE, store=None, since=None, workers=None, bloque=200):
+    """
+    Vuelve a extraer todos los artículos del archivo de HTML crudo, sin acceso a la red.
+
+    Los registros se reparten en bloques de `bloque` en el pool de parseo de `workers`
+    procesos (por defecto PARSE_WORKERS); un bloque cuyo proceso falla cuenta como errores.
+    Cada artículo conserva como `Extraido_en` la fecha de su descarga. La salida es la misma
+    que la del scraper (`output_file` o `store`), con la ventana `since`.
+    """
+    workers = workers or PARSE_WORKERS or 1
+    tareas = [(str(archivo.dir / e["segmento"]), e) for e in archivo.entradas()]
+    bloques = [tareas[i:i + bloque] for i in range(0, len(tareas), bloque)]
+    print(f"\n📦 Re-extrayendo {len(tareas)} registros de {archivo.dir} en {len(bloques)} bloque(s)")
+    data, errores, fuera_de_ventana = [], 0, 0
+    with metrics.span("reextraccion", registros=len(tareas)) as sp:
+        futuros = [_enviar_parseo(workers, _reextraer_bloque, b) for b in bloques]
+        for b, fut in zip(bloques, futuros):
+            try:
+                articulos, err = fut.result()
+            except Exception as exc:
+                print(f"   ! Error en un bloque de {len(b)} registros: {type(exc).__name__}: {exc}")
+                errores += len(b)
+                continue
+            errores += err
+            for n in articulos:
+                ts = parse_fecha(n.get("Fecha"))
+                if since is not None and ts is not None and ts < since:
+                    fuera_de_ventana += 1
+                    continue
                 data.append(n)
-                print(" ✅", n.get("Titulo", link)[:90])
+        sp.set(items=len(data), errores=errores)
+    print(f"   ✅ {len(data)} artículos | ✗ {errores} sin JSON-LD | ⏳ {fuera_de_ventana} fuera de ventana")
+    _guardar_dataset(data, output_file, store)
+    return data
+
+
+def sembrar_frontier(frontier, sites, feeds=None, limit=30, since=None, descubrimiento=DESCUBRIMIENTO):
+    """Descubre los links de `sites` y `feeds` y los agrega (deduplicados) a la frontera."""
+    nuevas = 0
+    for s in sites:
+        print(f"\n🔹 {s}")
+        try:
+            nuevas += frontier.agregar(_links_del_sitio(s, limit, since, descubrimiento), origen=s)
         except Exception:
             pass
-    with open("noticias.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"\n🗞️ Total: {len(data)} noticias")
+    if feeds:
+        try:
+            nuevas += frontier.agregar(get_rss_links(feeds, since=since), origen="rss")
+        except Exception:
+            pass
+    print(f"\n🌱 {nuevas} URL(s) nuevas en la frontera {frontier.path}")
+    return nuevas
+
+
+def trabajar_frontier(frontier, worker_id=None, hilos=None, archivo=None, since=None, esperar=False):
+    """
+    Worker de la frontera: `hilos` hilos reclaman URLs, las descargan, parsean y completan
+    hasta que no quede nada pendiente ni en curso (o indefinidamente con `esperar`).
+    La cortesía por dominio y los leases los maneja la frontera, así que pueden correr
+    varios workers a la vez, en este u otros procesos o máquinas.
+    """
+    from datetime import datetime
+    from utils.frontier import worker_id_por_defecto
+
+    worker_id = worker_id or worker_id_por_defecto()
+    hilos = hilos or FETCH_WORKERS
+    conteo = {"ok": 0, "error": 0, "fuera_de_ventana": 0, "lease_perdido": 0}
+    lock = threading.Lock()
+
+    def _contar(resultado):
+        with lock:
+            conteo[resultado] += 1
+        metrics.incr("scraper_articulos", resultado=resultado)
+
+    def _procesar(tarea):
+        """(artículo, error, definitivo): una página sin JSON-LD no mejora reintentándola."""
+        try:
+            contenido, encoding = _descargar_articulo(tarea.url, archivo)
+        except Exception as exc:
+            return None, f"descarga: {exc}", False
+        n, _ = _parsear_articulo(tarea.url, contenido, encoding)
+        if not n:
+            return None, "sin JSON-LD", True
+        n.update({"Fuente_base": urlparse(tarea.url).netloc, "Extraido_en": datetime.now().isoformat()})
+        return n, None, False
+
+    def _bucle():
+        while True:
+            tareas = frontier.reclamar(worker_id, 1)
+            if not tareas:
+                espera = frontier.proxima_disponibilidad()
+                if espera is None and not esperar:
+                    return
+                time.sleep(min(espera if espera is not None else 1.0, 1.0) or 0.05)
+                continue
+            tarea = tareas[0]
+            n, error, definitivo = _procesar(tarea)
+            if n is not None and since is not None:
+                ts = parse_fecha(n.get("Fecha"))
+                if ts is not None and ts < since:
+                    # Queda como hecha (no se vuelve a bajar) pero sin resultado que exportar
+                    if frontier.completar(tarea.url, worker_id):
+                        _contar("fuera_de_ventana")
+                    continue
+            if not frontier.completar(tarea.url, worker_id, resultado=n, error=error, definitivo=definitivo):
+                _contar("lease_perdido")
+            elif error is None:
+                _contar("ok")
+                print(" ✅", (n.get("Titulo") or tarea.url)[:90])
+            else:
+                _contar("error")
+
+    print(f"\n👷 Worker {worker_id} con {hilos} hilo(s) sobre {frontier.path}")
+    with metrics.span("frontier_worker", worker=worker_id, hilos=hilos) as sp:
+        threads = [threading.Thread(target=_bucle, daemon=True) for _ in range(hilos)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        sp.set(**conteo)
+    print(f"\n   ✅ {conteo['ok']} | ✗ {conteo['error']} | ⏳ {conteo['fuera_de_ventana']} fuera de ventana "
+          f"| leases perdidos {conteo['lease_perdido']}")
+    return conteo
+
+
+def exportar_frontier(frontier, output_file=OUTPUT_FILE, store=None):
+    """Guarda los artículos completados de la frontera como la salida normal del scraper."""
+    data = frontier.resultados()
+    _guardar_dataset(data, output_file, store)
     return data
 
 
@@ -215,4 +736,73 @@ FEEDS = [
 
 ]
 
-build_news_dataset(SITES, FEEDS, limit=150)
+if __name__ == "__main__":
+    import argparse
+    from utils.frontier import FRONTIER_FILE, abrir_frontier
+    from utils.html_archive import ARCHIVE_DIR, HtmlArchive
+    from utils.storage import STORE_FILE, ArticleStore
+    from utils.time_utils import add_window_args, resolve_since
+
+    parser = argparse.ArgumentParser(description="Scrapea noticias de SITES y FEEDS.")
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, default=None,
+        help=f"Guarda en la base SQLite (por defecto {STORE_FILE}) en lugar de {OUTPUT_FILE}.",
+    )
+    parser.add_argument(
+        "--descubrimiento", choices=["home", "sitemap", "ambos"], default=DESCUBRIMIENTO,
+        help="Cómo se obtienen los links de SITES: portada, sitemaps (robots.txt) o ambos.",
+    )
+    parser.add_argument(
+        "--archivar", nargs="?", const=ARCHIVE_DIR, default=None,
+        help=f"Guarda el HTML crudo de cada artículo en el archivo comprimido (por defecto {ARCHIVE_DIR}).",
+    )
+    parser.add_argument(
+        "--reextraer", nargs="?", const=ARCHIVE_DIR, default=None,
+        help="No descarga nada: re-extrae los artículos desde el archivo de HTML crudo.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="(--reextraer) Procesos en paralelo.")
+    parser.add_argument(
+        "--frontier", nargs="?", const=FRONTIER_FILE, default=None, metavar="DESTINO",
+        help=f"Usa la frontera compartida (SQLite, por defecto {FRONTIER_FILE}, o URL de "
+             "`python -m utils.frontier servir`) con --sembrar, --trabajar y/o --exportar.",
+    )
+    parser.add_argument("--sembrar", action="store_true", help="(--frontier) Agrega los links descubiertos.")
+    parser.add_argument("--trabajar", action="store_true", help="(--frontier) Reclama y descarga URLs.")
+    parser.add_argument("--exportar", action="store_true", help="(--frontier) Guarda los artículos extraídos.")
+    parser.add_argument("--worker-id", default=None, help="(--trabajar) Identificador del worker.")
+    parser.add_argument("--hilos", type=int, default=None, help=f"(--trabajar) Hilos de descarga ({FETCH_WORKERS}).")
+    parser.add_argument(
+        "--esperar", action="store_true",
+        help="(--trabajar) No termina cuando la frontera se vacía: espera URLs nuevas.",
+    )
+    add_window_args(parser)
+    profiling.add_profile_args(parser)
+    args = parser.parse_args()
+    corte = resolve_since(args.since, args.window)
+    store = ArticleStore(args.store) if args.store else None
+    try:
+        with profiling.perfilar("scraper", args.profile):
+            if args.reextraer:
+                reextraer(HtmlArchive(args.reextraer), store=store, since=corte, workers=args.workers)
+            elif args.frontier:
+                if not (args.sembrar or args.trabajar or args.exportar):
+                    parser.error("--frontier requiere --sembrar, --trabajar y/o --exportar")
+                with abrir_frontier(args.frontier) as frontier:
+                    if args.sembrar:
+                        sembrar_frontier(frontier, SITES, FEEDS, limit=150, since=corte,
+                                         descubrimiento=args.descubrimiento)
+                    if args.trabajar:
+                        trabajar_frontier(
+                            frontier, args.worker_id, args.hilos, since=corte, esperar=args.esperar,
+                            archivo=HtmlArchive(args.archivar) if args.archivar else None,
+                        )
+                    if args.exportar:
+                        exportar_frontier(frontier, store=store)
+            else:
+                build_news_dataset(
+                    SITES, FEEDS, limit=150, store=store, since=corte, descubrimiento=args.descubrimiento,
+                    archivo=HtmlArchive(args.archivar) if args.archivar else None,
+                )
+    finally:
+        if store is not None:
+            store.close()
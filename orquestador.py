@@ -1,89 +1,282 @@
-import subprocess
+import argparse
+import hashlib
+import json
 import sys
-from datetime import datetime
+import threading
 from pathlib import Path
+from typing import Dict, List, Optional
+
+import newsScraper
+import servicio
+from clasificador import budget, endpoints, filtro
+from clasificador import config as clasif_config
+from clasificador import openrouter_client
+from clasificador import pipeline_classificador
 from clasificador.schema import MINISTERIOS_VALIDOS
+from summarizer import config as summ_config
+from summarizer import pipeline_summarizer
+from utils import profiling
+from utils.dag import Stage, run_dag
+from utils.storage import STORE_FILE, ArticleStore
+from utils.time_utils import add_window_args, format_duration_hms, format_since, resolve_since
 
-# Python del venv (clave para evitar errores)
-PY = sys.executable
+LOGS_DIR = Path("data/outputs/logs")
+MANIFESTS_DIR = Path("data/outputs/manifests")
+STATE_FILE = Path("data/outputs/.orquestador_state.json")
 
 
 # -------------------------------
 # Funciones auxiliares
 # -------------------------------
 
-def log_path(script_name: str) -> Path:
-    """Genera un path de log con timestamp."""
-    logs_dir = Path("data/outputs/logs")
-    logs_dir.mkdir(parents=True, exist_ok=True)
+_cache_etiquetadas: Dict[tuple, List[Dict]] = {}
+_cache_lock = threading.Lock()
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return logs_dir / f"{script_name}_{ts}.log"
 
+def _cargar_etiquetadas(path: Path) -> List[Dict]:
+    """Lee el JSON etiquetado una sola vez por versión del archivo (mtime + tamaño)."""
+    if not path.exists():
+        return []
+    st = path.stat()
+    clave = (str(path), st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if clave not in _cache_etiquetadas:
+            _cache_etiquetadas.clear()
+            _cache_etiquetadas[clave] = json.loads(path.read_text(encoding="utf-8"))
+        return _cache_etiquetadas[clave]
 
-def run(command: list[str], log_file: Path):
-    """Ejecuta un comando python y guarda stdout/stderr en un log."""
-    print(f"\n▶ Ejecutando: {' '.join(command)}")
-    print(f"   ➜ Log: {log_file}")
 
-    with log_file.open("w", encoding="utf-8") as lf:
-        process = subprocess.Popen(
-            command,
-            stdout=lf,
-            stderr=lf,
-            text=True
-        )
-        process.wait()
+def _huella_ministerio(ministerio: str, store: Optional[ArticleStore] = None) -> str:
+    """Hash de los artículos de un ministerio: otros ministerios no invalidan su resumen."""
+    if store is not None:
+        articulos = store.articles_by_ministerio(ministerio)
+    else:
+        articulos = [
+            a for a in _cargar_etiquetadas(Path(summ_config.INPUT_FILE))
+            if ministerio in (a.get("ministerio") or [])
+        ]
+    contenido = json.dumps(articulos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def _params_resumen() -> Dict:
+    """Lo que cambia un resumen además de sus artículos: modelos, prompts y uso del digest."""
+    prompts = pipeline_summarizer.SUMMARIZE_PROMPT_SYSTEM + "\0" + pipeline_summarizer.SUMMARIZE_PROMPT_USER
+    return {
+        "modelo": openrouter_client.OPENROUTER_MODEL,
+        "fallbacks": openrouter_client.FALLBACK_MODELS,
+        "prompts": hashlib.sha256(prompts.encode("utf-8")).hexdigest()[:16],
+        "usar_digest": pipeline_summarizer.USAR_DIGEST,
+        "digest_cuerpo_max": pipeline_summarizer.DIGEST_CUERPO_MAX_CHARS,
+    }
+
+
+def construir_etapas(
+    store: Optional[ArticleStore] = None,
+    since: Optional[float] = None,
+    digest: bool = clasif_config.DIGEST,
+    descubrimiento: str = newsScraper.DESCUBRIMIENTO,
+    filtrar: bool = True,
+) -> List[Stage]:
+    """
+    Define el DAG: scraper → filtro → clasificador → un resumen por ministerio (en paralelo).
 
-    if process.returncode == 0:
-        print("   ✓ OK")
+    Con `store` las etapas leen/escriben la base SQLite; el clasificador ya es incremental
+    (sólo procesa pendientes), así que no se cachea por hash de archivo.
+    `since` (epoch) acota todas las etapas a la ventana temporal; el corte ya resuelto forma
+    parte de la huella de cada etapa (con --window cambia en cada corrida, como los datos).
+    Con `digest` el clasificador devuelve también el digest que usan los resúmenes.
+    `descubrimiento` es el modo de búsqueda de links del scraper ("home", "sitemap", "ambos").
+    Con `filtrar` (por defecto) la etapa "filtro" descarta, sin usar el LLM, los artículos
+    vacíos, cortos, en otro idioma, de secciones fuera de tema, etc. (clasificador/filtro.py).
+    """
+    params_ventana = {"since": format_since(since)} if since is not None else {}
+    etapas = [
+        Stage(
+            name="scraper",
+            func=lambda: {"noticias": len(newsScraper.build_news_dataset(
+                newsScraper.SITES, newsScraper.FEEDS, limit=150, store=store, since=since,
+                descubrimiento=descubrimiento,
+            ))},
+            outputs=[store.path if store is not None else Path(newsScraper.OUTPUT_FILE)],
+            cacheable=False,  # depende de la red, siempre se ejecuta
+        ),
+    ]
+    previa = "scraper"
+    entrada_clasificador = clasif_config.INPUT_FILE
+    if filtrar:
+        previa = "filtro"
+        if store is not None:
+            etapas.append(Stage(
+                name="filtro",
+                func=lambda: filtro.run_filtro(store, since=since),
+                deps=["scraper"],
+                outputs=[store.path],
+                cacheable=False,
+            ))
+        else:
+            entrada_clasificador = clasif_config.FILTRADAS_FILE
+            etapas.append(Stage(
+                name="filtro",
+                func=lambda: filtro.run_filtro(since=since),
+                deps=["scraper"],
+                inputs=[Path(clasif_config.INPUT_FILE)],
+                outputs=[Path(clasif_config.FILTRADAS_FILE)],
+                params={
+                    "min_palabras": clasif_config.FILTRO_MIN_PALABRAS,
+                    "min_palabras_en_vivo": clasif_config.FILTRO_MIN_PALABRAS_EN_VIVO,
+                    "max_boilerplate": clasif_config.FILTRO_MAX_BOILERPLATE,
+                    "min_stopwords_idioma": clasif_config.FILTRO_MIN_STOPWORDS_IDIOMA,
+                    "secciones": clasif_config.FILTRO_SECCIONES_DESCARTADAS,
+                    **params_ventana,
+                },
+            ))
+    if store is not None:
+        etapas.append(Stage(
+            name="clasificador",
+            func=lambda: pipeline_classificador.run_pipeline(store, since=since, digest=digest),
+            deps=[previa],
+            outputs=[store.path],
+            cacheable=False,
+        ))
     else:
-        print("   ✗ ERROR (ver log)")
+        etapas.append(Stage(
+            name="clasificador",
+            func=lambda: pipeline_classificador.run_pipeline(
+                since=since, input_file=entrada_clasificador, digest=digest
+            ),
+            deps=[previa],
+            inputs=[Path(entrada_clasificador)],
+            outputs=[Path(clasif_config.OUTPUT_FILE)],
+            params={"lote": clasif_config.LOTE, "digest": digest, **params_ventana},
+        ))
+    params_resumen = _params_resumen()
+    for ministerio in sorted(MINISTERIOS_VALIDOS):
+        etapas.append(
+            Stage(
+                name=f"resumen_{ministerio}",
+                func=lambda m=ministerio: pipeline_summarizer.run_pipeline(
+                    m, estricto=True, store=store, since=since
+                ),
+                deps=["clasificador"],
+                inputs=[store.path if store is not None else Path(summ_config.INPUT_FILE)],
+                outputs=[Path(summ_config.OUTPUT_FILE) / f"{ministerio}.json"],
+                params={"ministerio": ministerio, **params_resumen, **params_ventana},
+                fingerprint=lambda m=ministerio: _huella_ministerio(m, store),
+            )
+        )
+    return etapas
 
 
 # -------------------------------
 # Orquestación
 # -------------------------------
 
-def main():
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ejecuta scraper, clasificador y resúmenes como un DAG en el mismo proceso."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=len(MINISTERIOS_VALIDOS),
+        help="Etapas ejecutándose en paralelo (por defecto, una por ministerio).",
+    )
+    parser.add_argument(
+        "--forzar", action="store_true",
+        help="Ignora la caché y ejecuta todas las etapas aunque sus entradas no hayan cambiado.",
+    )
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, default=None,
+        help=f"Usa la base SQLite de artículos (por defecto {STORE_FILE}) en lugar de los JSON.",
+    )
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="Modo servicio: consulta los feeds periódicamente y procesa sólo lo nuevo.",
+    )
+    parser.add_argument(
+        "--intervalo", type=float, default=3600.0,
+        help="(daemon) Segundos entre consultas a los feeds.",
+    )
+    parser.add_argument(
+        "--ciclos", type=int, default=None,
+        help="(daemon) Cantidad de consultas antes de terminar (por defecto, indefinido).",
+    )
+    parser.add_argument(
+        "--feeds", nargs="+", default=None,
+        help="(daemon) URLs RSS a consultar en lugar de newsScraper.FEEDS.",
+    )
+    parser.add_argument(
+        "--digest", action="store_true", default=clasif_config.DIGEST,
+        help="Clasifica y extrae un digest por artículo en el mismo llamado; los resúmenes lo usan "
+             "en lugar del cuerpo completo.",
+    )
+    parser.add_argument(
+        "--descubrimiento", choices=["home", "sitemap", "ambos"], default=newsScraper.DESCUBRIMIENTO,
+        help="Cómo busca links el scraper en SITES: portada, sitemaps (robots.txt) o ambos.",
+    )
+    parser.add_argument(
+        "--sin-filtro", action="store_true",
+        help="No ejecuta el filtro previo: el clasificador recibe todos los artículos scrapeados.",
+    )
+    add_window_args(parser)
+    profiling.add_profile_args(parser)
+    args = parser.parse_args(argv)
+    store = ArticleStore(args.store) if args.store else None
+    try:
+        with profiling.perfilar("orquestador", args.profile):
+            return _ejecutar(args, store)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def _ejecutar(args: argparse.Namespace, store: Optional[ArticleStore]) -> int:
+    if args.daemon:
+        if args.since:
+            print("✗ --since no aplica al modo daemon; usar --window (ventana móvil).")
+            return 2
+        servicio.run_service(
+            args.feeds, intervalo=args.intervalo, ciclos=args.ciclos, store=store,
+            window=args.window, digest=args.digest,
+        )
+        return 0
 
     print("\n══════════════════════════════════════════")
     print("      ORQUESTADOR COMPLETO DE PIPELINES")
     print("══════════════════════════════════════════")
+    print(f"\nUsando Python: {sys.executable}")
 
-    print(f"\nUsando Python: {PY}")
-
-    # -------------------------------------------------------
-    # 1) Scraper → obtiene noticias (se ejecuta como script)
-    # -------------------------------------------------------
-    run(
-        [PY, "newsScraper.py"],
-        log_path("newsScraper")
-    )
-
-    # -------------------------------------------------------
-    # 2) Clasificador → ejecutado como módulo
-    # -------------------------------------------------------
-    run(
-        [PY, "-m", "clasificador.pipeline_classificador"],
-        log_path("pipeline_classificador")
+    manifiesto = run_dag(
+        construir_etapas(
+            store, since=resolve_since(args.since, args.window),
+            digest=args.digest, descubrimiento=args.descubrimiento, filtrar=not args.sin_filtro,
+        ),
+        state_file=STATE_FILE,
+        manifest_dir=MANIFESTS_DIR,
+        log_dir=LOGS_DIR,
+        max_workers=args.workers,
+        force=args.forzar,
     )
 
-    # -------------------------------------------------------
-    # 3) Summarizer por ministerio → ejecutado como módulo
-    # -------------------------------------------------------
-    for ministerio in MINISTERIOS_VALIDOS:
-        print(f"\n📌 Generando resumen para: {ministerio}")
-
-        run(
-            [PY, "-m", "summarizer.pipeline_summarizer", "--ministerio", ministerio],
-            log_path(f"summarizer_{ministerio}")
+    print(f"\nDuración total: {format_duration_hms(manifiesto['wall_time_s'])}")
+    estado_presupuesto = budget.estado_actual()
+    if estado_presupuesto is not None:
+        budget.imprimir_estado(estado_presupuesto)
+    llm = openrouter_client.estadisticas_llm()
+    if llm["hedges"] or llm["fallbacks"]:
+        print(
+            f"Hedging: {llm['hedges']}/{llm['llamadas']} llamadas ({llm['tasa_hedge']:.1%}), "
+            f"gana el duplicado {llm['tasa_victoria_hedge']:.1%} | fallbacks: {llm['fallbacks']}"
         )
-
-    print("\n🎉 Todos los procesos han finalizado.")
-    print("→ Revisar logs en ./data/outputs/logs/")
+    endpoints.reportar()
+    if manifiesto["status"] == "ok":
+        print("\n🎉 Todos los procesos han finalizado.")
+    else:
+        print("\n✗ El pipeline terminó con errores.")
+    print(f"→ Revisar manifiesto en {manifiesto['manifest_path']}")
+    print(f"→ Revisar logs en ./{LOGS_DIR}/")
     print("→ Revisar resúmenes en ./data/resumenes/")
+    return 0 if manifiesto["status"] == "ok" else 1
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
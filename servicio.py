@@ -0,0 +1,432 @@
+"""
+Modo servicio: pipeline incremental continuo (scraper → clasificador → resúmenes).
+
+En lugar de rehacer todo en cada corrida, el servicio:
+- consulta los FEEDS cada `intervalo` segundos y encola sólo los links nuevos;
+- descarga los artículos con varios workers y los clasifica en micro-lotes a medida
+  que llegan (hasta `LOTE` artículos o `espera_lote` segundos);
+- regenera únicamente los resúmenes de los ministerios afectados por artículos nuevos.
+
+Las etapas se comunican con colas acotadas: si el clasificador (LLM) se atrasa, las
+colas se llenan y los productores se bloquean (backpressure) en vez de acumular memoria.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+from urllib.parse import urlparse
+
+import newsScraper
+from clasificador import budget
+from clasificador.budget import PresupuestoAgotado
+from clasificador import filtro
+from clasificador.config import DIGEST, INDICE_ARTICULOS, LOTE, OUTPUT_FILE
+from clasificador.pipeline_classificador import armar_salida, clasificar_lote
+from clasificador.schema import ClasifOut
+from summarizer import pipeline_summarizer
+from utils import metrics
+from utils.article_index import convertir_articulos
+from utils.json_utils import write_json_atomic
+from utils.storage import ArticleStore
+from utils.time_utils import format_duration_hms, resolve_since
+
+MAX_REINTENTOS = 3
+BACKOFF_INICIAL_S = 1.0
+INDICE_CADA_S = 300.0  # sin store, el .idx/.blob se regenera como mucho cada 5 min y al terminar
+
+_FIN = object()  # centinela para cerrar las colas en orden
+
+
+class ServicioIncremental:
+    """
+    Servicio de larga duración que mantiene actualizadas las noticias etiquetadas y los
+    resúmenes por ministerio.
+
+    Parámetros:
+    - feeds: URLs RSS a consultar (por defecto newsScraper.FEEDS).
+    - intervalo: segundos entre consultas a los feeds.
+    - ciclos: cantidad de consultas antes de terminar (None = indefinido). Al terminar
+      se vacían las colas, se clasifica lo pendiente y se refrescan los resúmenes.
+    - workers_descarga: threads que descargan artículos en paralelo.
+    - espera_lote: segundos máximos esperando completar un micro-lote.
+    - espera_resumen: segundos que se acumulan ministerios afectados antes de resumir.
+    - max_cola: tamaño máximo de cada cola entre etapas.
+    - store: base SQLite de artículos; si se indica, cada micro-lote se guarda con un upsert
+      (O(nuevos)) en lugar de reescribir `salida_etiquetadas` completo.
+    - window: ventana móvil (p. ej. "24h"); en cada consulta se ignoran los items RSS más
+      viejos (y se olvidan los links vistos antes del corte) y los resúmenes se generan sólo
+      con artículos de la ventana.
+    - digest: clasifica en modo combinado (ministerios + digest por artículo).
+    """
+
+    def __init__(
+        self,
+        feeds: Optional[Sequence[str]] = None,
+        *,
+        intervalo: float = 3600.0,
+        ciclos: Optional[int] = None,
+        workers_descarga: int = 4,
+        espera_lote: float = 10.0,
+        espera_resumen: float = 60.0,
+        max_cola: int = 200,
+        salida_etiquetadas: str = OUTPUT_FILE,
+        store: Optional[ArticleStore] = None,
+        window: Optional[str] = None,
+        digest: bool = DIGEST,
+    ):
+        self.feeds = list(feeds if feeds is not None else newsScraper.FEEDS)
+        self.intervalo = intervalo
+        self.ciclos = ciclos
+        self.workers_descarga = workers_descarga
+        self.espera_lote = espera_lote
+        self.espera_resumen = espera_resumen
+        self.salida_etiquetadas = Path(salida_etiquetadas)
+        self.store = store
+        self.window = window
+        self.digest = digest
+
+        self.cola_links: "queue.Queue" = queue.Queue(maxsize=max_cola)
+        self.cola_articulos: "queue.Queue" = queue.Queue(maxsize=max(2 * LOTE, 1))
+        self.detener = threading.Event()
+
+        self._lock = threading.Lock()
+        self._etiquetadas: List[Dict] = self._cargar_etiquetadas()
+        # Links ya procesados o en proceso (normalizados) → cuándo se vieron; se podan en cada
+        # consulta (ver `_podar_vistos`) para que no crezca indefinidamente
+        ahora = time.time()
+        self._vistos: Dict[str, float] = {
+            newsScraper._normalize_url(a.get("Link") or ""): ahora for a in self._etiquetadas
+        }
+        self._ministerios_sucios: Set[str] = set()
+        self._indice_pendiente = False
+        self._ultimo_indice = time.monotonic()
+        self._json_pendiente = False  # descartados por el filtro aún no escritos (sin store)
+        self._cond_resumen = threading.Condition()
+        self._clasificacion_terminada = False
+        self.stats: Dict[str, int] = {
+            "ciclos": 0, "links_nuevos": 0, "descargados": 0, "errores_descarga": 0, "filtrados": 0,
+            "lotes": 0, "clasificados": 0, "errores_lote": 0, "resumenes": 0,
+        }
+
+    # ---------------------------------------------------------------
+    # Estado persistido
+    # ---------------------------------------------------------------
+
+    def _cargar_etiquetadas(self) -> List[Dict]:
+        if self.store is not None or not self.salida_etiquetadas.exists():
+            return []
+        return json.loads(self.salida_etiquetadas.read_text(encoding="utf-8"))
+
+    def _indexar(self, forzar: bool = False) -> None:
+        """
+        Regenera el índice de `salida_etiquetadas` si hay cambios y pasó INDICE_CADA_S (o con
+        `forzar`). Mientras tanto el índice queda desactualizado y los lectores usan el JSON.
+        Se llama con `_lock` tomado.
+        """
+        if not INDICE_ARTICULOS or not self._indice_pendiente:
+            return
+        if not forzar and time.monotonic() - self._ultimo_indice < INDICE_CADA_S:
+            return
+        convertir_articulos(self._etiquetadas, self.salida_etiquetadas)
+        self._indice_pendiente = False
+        self._ultimo_indice = time.monotonic()
+
+    def _guardar_descartado(self, articulo: Dict) -> None:
+        """
+        Persiste un artículo descartado por el filtro como etiquetado sin ministerio (como
+        `filtro.run_filtro` con store): no se reclasifica ni se vuelve a descargar tras un
+        reinicio. Sin store se escribe junto con el próximo micro-lote o al terminar.
+        """
+        registro = armar_salida(articulo, [])
+        if self.store is not None:
+            self.store.upsert_articles([registro])
+            return
+        with self._lock:
+            self._etiquetadas.append(registro)
+            self._json_pendiente = True
+
+    def _escribir_etiquetadas(self) -> None:
+        """Reescribe `salida_etiquetadas` (e índice, si toca). Se llama con `_lock` tomado."""
+        write_json_atomic(self.salida_etiquetadas, self._etiquetadas)
+        self._json_pendiente = False
+        self._indice_pendiente = True
+        self._indexar()
+
+    def _sumar(self, clave: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[clave] += n
+        metrics.incr(f"servicio_{clave}", n)
+
+    # ---------------------------------------------------------------
+    # Etapas
+    # ---------------------------------------------------------------
+
+    def _podar_vistos(self, corte: Optional[float]) -> None:
+        """
+        Olvida los links vistos antes del corte de la ventana (el RSS ya descarta esos items
+        por fecha) y, con store, los que ya están guardados: `existing_urls` los cubre.
+        Corre en el poller antes de consultar, así un link podado no se vuelve a encolar.
+        """
+        with self._lock:
+            if corte is not None:
+                for link in [l for l, visto in self._vistos.items() if visto < corte]:
+                    del self._vistos[link]
+            candidatos = list(self._vistos)
+        if self.store is None or not candidatos:
+            return
+        guardados = self.store.existing_urls(candidatos)
+        with self._lock:
+            for link in guardados:
+                self._vistos.pop(link, None)
+
+    def _poller(self) -> None:
+        """Consulta los feeds periódicamente y encola los links que no se vieron."""
+        ciclo = 0
+        try:
+            while not self.detener.is_set():
+                ciclo += 1
+                t0 = time.time()
+                nuevos = 0
+                corte = resolve_since(window=self.window)
+                self._podar_vistos(corte)
+                links = [
+                    newsScraper._normalize_url(l)
+                    for l in newsScraper.get_rss_links(self.feeds, since=corte)
+                ]
+                guardados = self.store.existing_urls(links) if self.store is not None else set()
+                for nu in links:
+                    if nu in guardados:
+                        continue
+                    with self._lock:
+                        if nu in self._vistos:
+                            continue
+                        self._vistos[nu] = time.time()
+                    self._encolar(self.cola_links, nu)
+                    nuevos += 1
+                self._sumar("ciclos")
+                self._sumar("links_nuevos", nuevos)
+                print(f"[poll {ciclo}] {nuevos} links nuevos en {format_duration_hms(time.time() - t0)}")
+
+                if self.ciclos is not None and ciclo >= self.ciclos:
+                    break
+                self.detener.wait(self.intervalo)
+        finally:
+            # También si una consulta lanza: sin los centinelas run() esperaría para siempre
+            for _ in range(self.workers_descarga):
+                self.cola_links.put(_FIN)
+
+    def _encolar(self, cola: "queue.Queue", item) -> None:
+        """put bloqueante que igual responde a `detener` (backpressure)."""
+        while True:
+            try:
+                cola.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if self.detener.is_set():
+                    return
+
+    def _descargador(self) -> None:
+        while True:
+            link = self.cola_links.get()
+            if link is _FIN:
+                return
+            if self.detener.is_set():
+                continue
+            try:
+                articulo = newsScraper.extract_jsonld(link)
+            except Exception as exc:
+                self._sumar("errores_descarga")
+                print(f"   ! Error descargando {link}: {exc}")
+                with self._lock:
+                    self._vistos.pop(link, None)  # se reintenta en el próximo ciclo
+                continue
+            articulo.update({
+                "Fuente_base": urlparse(link).netloc,
+                "Extraido_en": datetime.now().isoformat(),
+            })
+            self._sumar("descargados")
+            if filtro.evaluar(articulo) is not None:
+                self._guardar_descartado(articulo)
+                self._sumar("filtrados")  # queda en _vistos: no se vuelve a descargar
+                continue
+            self._encolar(self.cola_articulos, (link, articulo))
+
+    @metrics.medido("servicio.micro_lote")
+    def _clasificar_con_reintentos(self, lote: List[Dict]) -> Optional[Dict[int, ClasifOut]]:
+        backoff = BACKOFF_INICIAL_S
+        for intento in range(1, MAX_REINTENTOS + 1):
+            metrics.anotar(items=len(lote), intentos=intento)
+            try:
+                return {r.idx: r for r in clasificar_lote(lote, 0, con_digest=self.digest)}
+            except PresupuestoAgotado as err:
+                print(f"   ✖ {err}. Deteniendo el servicio.")
+                self.detener.set()
+                return None
+            except Exception as err:
+                print(f"   ! Error en micro-lote (intento {intento}/{MAX_REINTENTOS}): {err}")
+                if intento == MAX_REINTENTOS or self.detener.is_set():
+                    return None
+                time.sleep(backoff)
+                backoff *= 2
+        return None
+
+    def _procesar_lote(self, pendientes: List[tuple]) -> None:
+        """Clasifica un micro-lote de (link normalizado, artículo) y persiste el resultado."""
+        t0 = time.time()
+        lote = [articulo for _, articulo in pendientes]
+        clasificacion = self._clasificar_con_reintentos(lote)
+        if clasificacion is None:
+            self._sumar("errores_lote")
+            with self._lock:
+                for link, _ in pendientes:  # se reintentan en el próximo ciclo
+                    self._vistos.pop(link, None)
+            return
+
+        nuevos = []
+        for i, art in enumerate(lote):
+            respuesta = clasificacion.get(i)
+            nuevos.append(armar_salida(
+                art,
+                respuesta.ministerio if respuesta is not None else [],
+                getattr(respuesta, "digest", None),
+            ))
+        afectados = {m for registro in nuevos for m in registro["ministerio"]}
+        if self.store is not None:
+            self.store.upsert_articles(nuevos)
+        else:
+            with self._lock:
+                self._etiquetadas.extend(nuevos)
+                for registro in nuevos:
+                    self._vistos[newsScraper._normalize_url(registro.get("Link") or "")] = time.time()
+                self._escribir_etiquetadas()
+
+        self._sumar("lotes")
+        self._sumar("clasificados", len(nuevos))
+        print(
+            f"[clasificador] micro-lote de {len(lote)} en {format_duration_hms(time.time() - t0)} "
+            f"→ ministerios afectados: {', '.join(sorted(afectados)) or '-'}"
+        )
+        if afectados:
+            with self._cond_resumen:
+                self._ministerios_sucios |= afectados
+                self._cond_resumen.notify()
+
+    def _clasificador(self) -> None:
+        """Arma micro-lotes de hasta LOTE artículos o `espera_lote` segundos."""
+        terminado = False
+        while not terminado:
+            item = self.cola_articulos.get()
+            if item is _FIN:
+                break
+            lote = [item]
+            limite = time.time() + self.espera_lote
+            while len(lote) < LOTE:
+                restante = limite - time.time()
+                if restante <= 0:
+                    break
+                try:
+                    item = self.cola_articulos.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _FIN:
+                    terminado = True
+                    break
+                lote.append(item)
+            self._procesar_lote(lote)
+
+        with self._cond_resumen:
+            self._clasificacion_terminada = True
+            self._cond_resumen.notify()
+
+    def _resumidor(self) -> None:
+        """Regenera sólo los resúmenes de los ministerios con artículos nuevos."""
+        while True:
+            with self._cond_resumen:
+                while not self._ministerios_sucios and not self._clasificacion_terminada:
+                    self._cond_resumen.wait()
+                if not self._ministerios_sucios and self._clasificacion_terminada:
+                    return
+                terminado = self._clasificacion_terminada
+            if not terminado:
+                # Acumula cambios de varios micro-lotes antes de llamar al LLM
+                self.detener.wait(self.espera_resumen)
+            with self._cond_resumen:
+                pendientes = sorted(self._ministerios_sucios)
+                self._ministerios_sucios.clear()
+            for ministerio in pendientes:
+                try:
+                    pipeline_summarizer.run_pipeline(
+                        ministerio, estricto=True, store=self.store,
+                        since=resolve_since(window=self.window),
+                    )
+                    self._sumar("resumenes")
+                except Exception as exc:
+                    print(f"   ! Error resumiendo {ministerio}: {exc}")
+                    with self._cond_resumen:
+                        self._ministerios_sucios.add(ministerio)
+                    if self._clasificacion_terminada:
+                        return
+
+    # ---------------------------------------------------------------
+    # Ciclo de vida
+    # ---------------------------------------------------------------
+
+    def run(self) -> Dict[str, int]:
+        """Arranca todas las etapas y bloquea hasta que terminan (o se pide detener)."""
+        print("══════════════════════════════════════════")
+        print("   SERVICIO INCREMENTAL DE NOTICIAS")
+        print("══════════════════════════════════════════")
+        print(f"Feeds: {len(self.feeds)} | Intervalo: {format_duration_hms(self.intervalo)} | "
+              f"Ciclos: {self.ciclos or '∞'}")
+
+        t0 = time.time()
+        threads = [threading.Thread(target=self._poller, name="poller")]
+        descargadores = [
+            threading.Thread(target=self._descargador, name=f"descarga-{i}")
+            for i in range(self.workers_descarga)
+        ]
+        clasificador = threading.Thread(target=self._clasificador, name="clasificador")
+        resumidor = threading.Thread(target=self._resumidor, name="resumidor")
+        for t in threads + descargadores + [clasificador, resumidor]:
+            t.daemon = True
+            t.start()
+
+        try:
+            threads[0].join()
+            for t in descargadores:
+                t.join()
+            self.cola_articulos.put(_FIN)
+            clasificador.join()
+            resumidor.join()
+        except KeyboardInterrupt:
+            self.detener.set()
+        with self._lock:
+            if self._json_pendiente:
+                self._escribir_etiquetadas()
+            self._indexar(forzar=True)
+
+        print(f"Servicio detenido tras {format_duration_hms(time.time() - t0)}: {self.stats}")
+        estado = budget.estado_actual()
+        if estado is not None:
+            budget.imprimir_estado(estado)
+        return dict(self.stats)
+
+
+def run_service(feeds: Optional[Sequence[str]] = None, **kwargs) -> Dict[str, int]:
+    """Crea el servicio, instala handlers de SIGINT/SIGTERM y lo ejecuta."""
+    servicio = ServicioIncremental(feeds, **kwargs)
+
+    def _detener(signum, frame):
+        print("Señal recibida, deteniendo el servicio…")
+        servicio.detener.set()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, _detener)
+        signal.signal(signal.SIGTERM, _detener)
+    return servicio.run()
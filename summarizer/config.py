@@ -10,3 +10,6 @@ EVAL_RESCALE_WITH_BASELINE = True
 
 # Parámetros
 LOTE = 10
+
+# Si los artículos traen `digest` (clasificador en modo --digest) se usa en lugar del Cuerpo
+USAR_DIGEST = True
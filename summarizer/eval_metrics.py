@@ -6,6 +6,9 @@ from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from clasificador.schema import MINISTERIOS_VALIDOS
+from utils import profiling
+from utils.article_index import abrir_si_vigente
+from utils.storage import STORE_FILE, ArticleStore
 
 from .config import (
     EVAL_LANG,
@@ -95,34 +98,54 @@ def _match_pairs(
     )
 
 
-def _load_articles(path: Path) -> List[ArticleRecord]:
-    """Lee artículos etiquetados y devuelve una lista con ministerios y contenido completo."""
+def _to_article_record(raw: Dict) -> Optional[ArticleRecord]:
+    """Convierte un artículo etiquetado en ArticleRecord (None si no tiene ministerio o texto)."""
+    ministerios = raw.get("ministerio") or []
+    if not ministerios:
+        return None
+    if isinstance(ministerios, str):
+        ministerios = [ministerios]
+    ministerios = [str(m).strip() for m in ministerios if str(m).strip()]
+    if not ministerios:
+        return None
+    partes: List[str] = []
+    for campo in ("Titulo", "Descripcion", "Cuerpo"):
+        valor = raw.get(campo)
+        if isinstance(valor, str) and valor.strip():
+            partes.append(valor.strip())
+    if not partes:
+        return None
+    contenido = "\n\n".join(partes)
+    return ArticleRecord(ministerios=ministerios, contenido=contenido)
+
+
+def _load_articles(path: Path, ministerio: Optional[str] = None) -> List[ArticleRecord]:
+    """
+    Lee artículos etiquetados y devuelve una lista con ministerios y contenido completo.
+
+    Con `ministerio` y un índice vigente (utils.article_index) sólo se materializan los
+    artículos de ese ministerio; si no, se lee el JSON completo.
+    """
+    if ministerio is not None:
+        indice = abrir_si_vigente(path)
+        if indice is not None:
+            with indice:
+                registros = (_to_article_record(raw) for raw in indice.articulos(indice.por_ministerio(ministerio)))
+                return [registro for registro in registros if registro is not None]
     data = json.loads(path.read_text(encoding="utf-8"))
     if not isinstance(data, list):
         raise ValueError(
             f"El archivo {path} debe contener una lista de artículos con campo 'ministerio'."
         )
 
-    registros: List[ArticleRecord] = []
-    for idx, raw in enumerate(data):
-        ministerios = raw.get("ministerio") or []
-        if not ministerios:
-            continue
-        if isinstance(ministerios, str):
-            ministerios = [ministerios]
-        ministerios = [str(m).strip() for m in ministerios if str(m).strip()]
-        if not ministerios:
-            continue
-        partes: List[str] = []
-        for campo in ("Titulo", "Descripcion", "Cuerpo"):
-            valor = raw.get(campo)
-            if isinstance(valor, str) and valor.strip():
-                partes.append(valor.strip())
-        if not partes:
-            continue
-        contenido = "\n\n".join(partes)
-        registros.append(ArticleRecord(ministerios=ministerios, contenido=contenido))
-    return registros
+    registros = (_to_article_record(raw) for raw in data)
+    return [registro for registro in registros if registro is not None]
+
+
+def _load_articles_from_store(store: ArticleStore, ministerio: str) -> List[ArticleRecord]:
+    """Lee de la base SQLite sólo los artículos del ministerio (consulta indexada)."""
+    registros = (_to_article_record(raw) for raw in store.articles_by_ministerio(ministerio))
+    return [registro for registro in registros if registro is not None]
 
 
 def _aggregate_articles_by_ministerio(
@@ -177,8 +200,14 @@ def evaluate_bertscore(
     lang: str = EVAL_LANG,
     model_type: Optional[str] = DEFAULT_MODEL,
     rescale_with_baseline: bool = EVAL_RESCALE_WITH_BASELINE,
+    store: Optional[ArticleStore] = None,
 ) -> Dict:
-    """Evalúa BERTScore para el resumen generado de un ministerio dado."""
+    """
+    Evalúa BERTScore para el resumen generado de un ministerio dado.
+
+    Si se pasa `store`, la referencia se arma consultando la base SQLite en lugar de
+    leer `source_path` completo.
+    """
     pred_records = _load_json(pred_path)
     objetivo = next(
         (registro for registro in pred_records if registro.ministerio == ministerio),
@@ -190,7 +219,12 @@ def evaluate_bertscore(
             f"en {pred_path}."
         )
 
-    articulos = _load_articles(source_path)
+    with profiling.etapa("eval.lectura"):
+        if store is not None:
+            articulos = _load_articles_from_store(store, ministerio)
+            source_path = store.path
+        else:
+            articulos = _load_articles(source_path, ministerio)
     referencias = _aggregate_articles_by_ministerio(articulos)
     referencia = referencias.get(ministerio)
 
@@ -200,13 +234,14 @@ def evaluate_bertscore(
             f"para el ministerio '{ministerio}'."
         )
 
-    precision, recall, f1 = _compute_bertscore(
-        [objetivo.resumen],
-        [referencia],
-        lang=lang,
-        model_type=model_type,
-        rescale_with_baseline=rescale_with_baseline,
-    )
+    with profiling.etapa("eval.bertscore"):
+        precision, recall, f1 = _compute_bertscore(
+            [objetivo.resumen],
+            [referencia],
+            lang=lang,
+            model_type=model_type,
+            rescale_with_baseline=rescale_with_baseline,
+        )
 
     resultado = {
         "ministerio": ministerio,
@@ -255,14 +290,29 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         choices=sorted(MINISTERIOS_VALIDOS),
         help="Ministerio a evaluar (debe coincidir con el usado al generar el resumen).",
     )
+    parser.add_argument(
+        "--store",
+        nargs="?",
+        const=STORE_FILE,
+        default=None,
+        help=f"Arma la referencia desde la base SQLite (por defecto {STORE_FILE}).",
+    )
+    profiling.add_profile_args(parser)
     args = parser.parse_args(argv)
     ministerio = args.ministerio.strip()
 
-    results = evaluate_bertscore(
-        pred_path=DEFAULT_PRED_PATH,
-        source_path=DEFAULT_SOURCE_PATH,
-        ministerio=ministerio,
-    )
+    store = ArticleStore(args.store) if args.store else None
+    try:
+        with profiling.perfilar("eval_metrics", args.profile):
+            results = evaluate_bertscore(
+                pred_path=DEFAULT_PRED_PATH,
+                source_path=DEFAULT_SOURCE_PATH,
+                ministerio=ministerio,
+                store=store,
+            )
+    finally:
+        if store is not None:
+            store.close()
 
     _pretty_print(results)
 
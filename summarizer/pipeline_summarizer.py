@@ -2,28 +2,61 @@ import argparse
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 import time
 import sys
 sys.stdout.reconfigure(encoding="utf-8")
 
-from .config import INPUT_FILE, OUTPUT_FILE
+from .config import INPUT_FILE, OUTPUT_FILE, USAR_DIGEST
 from .schema import SummOut
 from .prompts import SUMMARIZE_PROMPT_SYSTEM, SUMMARIZE_PROMPT_USER
+from clasificador import endpoints
+from clasificador.config import DIGEST_CUERPO_MAX_CHARS
 from clasificador.schema import MINISTERIOS_VALIDOS
 from clasificador.openrouter_client import call_openrouter_api
-from utils.time_utils import format_duration_hms
+from utils import metrics, profiling
+from utils.article_index import abrir_si_vigente
+from utils.storage import STORE_FILE, ArticleStore
+from utils.time_index import filter_since
+from utils.time_utils import add_window_args, format_duration_hms, format_since, resolve_since
+
+
+def _formatear_digest(digest: Dict) -> str:
+    """Líneas de hechos, cifras y actores del digest generado por el clasificador."""
+    lineas = []
+    for campo, etiqueta in (("hechos", "Hechos"), ("cifras", "Cifras"), ("actores", "Actores")):
+        valores = digest.get(campo) or []
+        if valores:
+            lineas.append(f"   {etiqueta}: {'; '.join(valores)}")
+    return "\n".join(lineas)
 
 
 def _formatear_articulos(articulos: Iterable[Dict]) -> str:
-    """Arma un bloque de texto numerado con título, fuente, fecha y contenido de cada artículo."""
+    """
+    Arma un bloque de texto numerado con título, fuente, fecha y contenido de cada artículo.
+
+    Si el artículo trae `digest` (clasificador en modo --digest) y USAR_DIGEST está activo,
+    se envían sus hechos/cifras/actores en lugar de la descripción y el cuerpo completos,
+    salvo que el cuerpo supere DIGEST_CUERPO_MAX_CHARS: el clasificador lo recortó al armar
+    el digest y el resto no estaría cubierto.
+    """
     segmentos: List[str] = []
     for idx, articulo in enumerate(articulos, start=1):
         titulo = (articulo.get("Titulo") or "").strip()
-        descripcion = (articulo.get("Descripcion") or "").strip()
-        cuerpo = (articulo.get("Cuerpo") or articulo.get("Descripcion") or "").strip()
         fuente = articulo.get("Fuente", "")
         fecha = articulo.get("Fecha", "")
+        digest = articulo.get("digest") if USAR_DIGEST else None
+        if len(articulo.get("Cuerpo") or "") > DIGEST_CUERPO_MAX_CHARS:
+            digest = None
+        if digest and any(digest.get(c) for c in ("hechos", "cifras", "actores")):
+            segmentos.append(
+                f"{idx}. Título: {titulo}\n"
+                f"   Fuente: {fuente} | Fecha: {fecha}\n"
+                f"{_formatear_digest(digest)}"
+            )
+            continue
+        descripcion = (articulo.get("Descripcion") or "").strip()
+        cuerpo = (articulo.get("Cuerpo") or articulo.get("Descripcion") or "").strip()
         segmentos.append(
             f"{idx}. Título: {titulo}\n"
             f"   Fuente: {fuente} | Fecha: {fecha}\n"
@@ -45,30 +78,64 @@ def _envolver_markdown(ministerio: str, total: int, cuerpo: str) -> str:
     )
 
 
-def resumir_ministerio(ministerio: str, articulos: List[Dict]) -> str:
-    """Genera un resumen agregado para un ministerio usando OpenRouter."""
-    listado = _formatear_articulos(articulos)
-    messages = [
-        {"role": "system", "content": SUMMARIZE_PROMPT_SYSTEM},
-        {
-            "role": "user",
-            "content": SUMMARIZE_PROMPT_USER.format(
-                ministerio=ministerio, total=len(articulos), noticias=listado
-            ),
-        },
+def mensajes_resumen(
+    ministerio: str, total: int, listado: str, prompts: Optional[Dict[str, str]] = None
+) -> List[Dict[str, str]]:
+    """
+    Mensajes del resumen a partir del listado ya formateado. `prompts` reemplaza
+    SUMMARIZE_PROMPT_SYSTEM / SUMMARIZE_PROMPT_USER por nombre (runner de experimentos).
+    """
+    prompts = prompts or {}
+    user = prompts.get("SUMMARIZE_PROMPT_USER") or SUMMARIZE_PROMPT_USER
+    return [
+        {"role": "system", "content": prompts.get("SUMMARIZE_PROMPT_SYSTEM") or SUMMARIZE_PROMPT_SYSTEM},
+        {"role": "user", "content": user.format(ministerio=ministerio, total=total, noticias=listado)},
     ]
 
+
+def resumir_ministerio(
+    ministerio: str, articulos: List[Dict], propagar_errores: bool = False
+) -> str:
+    """
+    Genera un resumen agregado para un ministerio usando OpenRouter.
+
+    Si la API falla se informa el error y se devuelve "", salvo que `propagar_errores`
+    sea True, en cuyo caso se relanza la excepción.
+    """
+    listado = _formatear_articulos(articulos)
+    metrics.anotar(prompt_chars=len(listado))
+    messages = mensajes_resumen(ministerio, len(articulos), listado)
+
     try:
         respuesta = call_openrouter_api(messages)
         return respuesta.strip()
     except Exception as exc:
         print(f"   ! Error generando resumen del ministerio '{ministerio}': {exc}")
+        if propagar_errores:
+            raise
         return ""
 
 
-def run_pipeline(ministerio: str) -> None:
-    input_file = Path(INPUT_FILE)
-    output_dir  = Path(OUTPUT_FILE)
+@metrics.medido("summarizer")
+def run_pipeline(
+    ministerio: str,
+    estricto: bool = False,
+    store: Optional[ArticleStore] = None,
+    since: Optional[float] = None,
+    input_file: str = INPUT_FILE,
+    output_dir: str = OUTPUT_FILE,
+) -> None:
+    """
+    Genera el resumen de `ministerio` y lo guarda en `output_dir`/<ministerio>.json
+    (por defecto OUTPUT_FILE), leyendo los artículos de `input_file` (por defecto INPUT_FILE).
+
+    Con `estricto=True` un error de la API se relanza sin escribir la salida, para que
+    el orquestador pueda detectar el fallo en lugar de guardar un resumen vacío.
+    Si se pasa `store`, los artículos se consultan en la base SQLite en lugar de `input_file`.
+    Con `since` (epoch) sólo se resumen los artículos publicados desde ese corte.
+    """
+    input_file = Path(input_file)
+    output_dir  = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     # archivo final → data/resumenes/<ministerio>.json
     output_file = output_dir / f"{ministerio}.json"
@@ -76,29 +143,52 @@ def run_pipeline(ministerio: str) -> None:
     print("════════════════════════════════════════")
     print(" Summarizer por ministerio 📰✨ ")
     print("════════════════════════════════════════")
-    print(f"Archivo entrada:  {input_file}")
+    print(f"Archivo entrada:  {store.path if store is not None else input_file}")
     print(f"Archivo salida:   {output_file}")
     print(f"Ministerio:       {ministerio}")
+    print(f"Ventana:          {format_since(since)}")
     print("────────────────────────────────────────")
 
     t0 = time.time()
-    articulos = json.loads(input_file.read_text(encoding="utf-8"))
-    total_articulos = len(articulos)
-    print(
-        f"Leídos {total_articulos} artículos en "
-        f"{format_duration_hms(time.time() - t0)}"
-    )
+    if store is not None:
+        # Consulta indexada por ministerio: no se leen los artículos de otros ministerios
+        articulos_filtrados = store.articles_by_ministerio(ministerio, since=since)
+        print(
+            f"Leídos {len(articulos_filtrados)} artículos de '{ministerio}' desde "
+            f"{store.path} en {format_duration_hms(time.time() - t0)}"
+        )
+    elif (indice := abrir_si_vigente(input_file)) is not None:
+        # Índice + blob: se filtra por metadatos y sólo se leen los cuerpos del ministerio
+        with indice:
+            if len(indice) == 0:
+                print("No hay artículos para procesar. Saliendo.")
+                return
+            with profiling.etapa("summarizer.lectura"):
+                articulos_filtrados = list(indice.articulos(indice.por_ministerio(ministerio, since)))
+        print(
+            f"Leídos {len(articulos_filtrados)} de {len(indice)} artículos desde el índice "
+            f"en {format_duration_hms(time.time() - t0)}"
+        )
+    else:
+        with profiling.etapa("summarizer.lectura"):
+            articulos = json.loads(input_file.read_text(encoding="utf-8"))
+        total_articulos = len(articulos)
+        print(
+            f"Leídos {total_articulos} artículos en "
+            f"{format_duration_hms(time.time() - t0)}"
+        )
 
-    if total_articulos == 0:
-        print("No hay artículos para procesar. Saliendo.")
-        return
+        if total_articulos == 0:
+            print("No hay artículos para procesar. Saliendo.")
+            return
 
-    articulos_filtrados = [
-        articulo
-        for articulo in articulos
-        if ministerio in (articulo.get("ministerio") or [])
-    ]
+        articulos_filtrados = [
+            articulo
+            for articulo in filter_since(articulos, since)
+            if ministerio in (articulo.get("ministerio") or [])
+        ]
 
+    metrics.anotar(ministerio=ministerio, items=len(articulos_filtrados))
     if not articulos_filtrados:
         print(f"No se encontraron artículos etiquetados con '{ministerio}'.")
         output = SummOut(
@@ -113,7 +203,7 @@ def run_pipeline(ministerio: str) -> None:
     )
 
     t_inicio = time.time()
-    resumen = resumir_ministerio(ministerio, articulos_filtrados)
+    resumen = resumir_ministerio(ministerio, articulos_filtrados, propagar_errores=estricto)
     duracion = format_duration_hms(time.time() - t_inicio)
     print(f"   ✓ Resumen generado en {duracion}")
     print("────────────────────────────────────────")
@@ -147,6 +237,12 @@ def _parse_args() -> argparse.Namespace:
         required=True,
         help=f"Ministerio objetivo ({', '.join(sorted(MINISTERIOS_VALIDOS))})",
     )
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, default=None,
+        help=f"Lee los artículos de la base SQLite (por defecto {STORE_FILE}) en lugar de INPUT_FILE.",
+    )
+    add_window_args(parser)
+    profiling.add_profile_args(parser)
     args = parser.parse_args()
     ministerio_normalizado = args.ministerio.strip()
     if ministerio_normalizado not in MINISTERIOS_VALIDOS:
@@ -160,4 +256,11 @@ def _parse_args() -> argparse.Namespace:
 
 if __name__ == "__main__":
     params = _parse_args()
-    run_pipeline(params.ministerio)
+    corte = resolve_since(params.since, params.window)
+    with profiling.perfilar("summarizer", params.profile):
+        if params.store:
+            with ArticleStore(params.store) as store:
+                run_pipeline(params.ministerio, store=store, since=corte)
+        else:
+            run_pipeline(params.ministerio, since=corte)
+    endpoints.reportar()
@@ -0,0 +1,70 @@
+"""Gate de regresión de benchmarks/micro.py (sin correr los benchmarks completos)."""
+import json
+
+import pytest
+
+from benchmarks import micro
+
+
+def _resultado(ops, ruido=0.0, pico_mb=10.0, caso="normalize_url"):
+    return {"casos": [{"caso": caso, "ops_por_s": ops, "ruido": ruido, "pico_mb": pico_mb}],
+            "meta": {"commit": "x"}}
+
+
+def test_caida_dentro_del_umbral_no_es_regresion():
+    fila, = micro.comparar_con_baseline(_resultado(90.0), _resultado(100.0), umbral=0.15)
+    assert fila["regresion"] == []
+
+
+def test_caida_mayor_al_umbral_es_regresion():
+    fila, = micro.comparar_con_baseline(_resultado(80.0), _resultado(100.0), umbral=0.15)
+    assert fila["regresion"] == ["ops/s"]
+
+
+def test_ruido_amplia_la_tolerancia():
+    fila, = micro.comparar_con_baseline(_resultado(80.0, ruido=0.01), _resultado(100.0, ruido=0.01),
+                                        umbral=0.15)
+    assert fila["tolerancia"] == pytest.approx(0.21)
+    assert fila["regresion"] == []
+
+
+def test_tolerancia_acotada_con_ruido_alto():
+    # Con ruido de 50 % la tolerancia sin tope superaría el 300 %: el gate no podría fallar
+    fila, = micro.comparar_con_baseline(_resultado(40.0, ruido=0.5), _resultado(100.0, ruido=0.5),
+                                        umbral=0.15)
+    assert fila["tolerancia"] == pytest.approx(micro.TOLERANCIA_MAX * 0.15)
+    assert fila["regresion"] == ["ops/s"]
+
+
+def test_memoria_ignora_diferencias_chicas():
+    chica, = micro.comparar_con_baseline(_resultado(100.0, pico_mb=1.5), _resultado(100.0, pico_mb=1.0))
+    grande, = micro.comparar_con_baseline(_resultado(100.0, pico_mb=20.0), _resultado(100.0, pico_mb=10.0))
+    assert chica["regresion"] == []
+    assert grande["regresion"] == ["memoria"]
+
+
+def test_fusionar_baseline_reemplaza_solo_los_casos_medidos():
+    baseline = {"casos": [{"caso": "a", "ops_por_s": 1.0}, {"caso": "b", "ops_por_s": 2.0}], "meta": {}}
+    nuevo = {"casos": [{"caso": "b", "ops_por_s": 3.0}, {"caso": "c", "ops_por_s": 4.0}], "meta": {"commit": "y"}}
+    fusion = micro.fusionar_baseline(baseline, nuevo)
+    assert [(c["caso"], c["ops_por_s"]) for c in fusion["casos"]] == [("a", 1.0), ("b", 3.0), ("c", 4.0)]
+    assert fusion["meta"] == {"commit": "y"}
+
+
+def test_sin_baseline_falla(tmp_path):
+    args = ["--articulos", "50", "--muestra-html", "2", "--repeticiones", "1",
+            "--solo", "normalize_url", "--baseline", str(tmp_path / "no_existe.json")]
+    assert micro.main(args) == 2
+
+
+def test_regresion_sale_con_codigo_1(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    args = ["--articulos", "50", "--muestra-html", "2", "--repeticiones", "1",
+            "--solo", "normalize_url", "--baseline", str(baseline), "--reintentos", "0"]
+    assert micro.main(args + ["--guardar-baseline"]) == 0
+    datos = json.loads(baseline.read_text(encoding="utf-8"))
+    for caso in datos["casos"]:
+        caso["ops_por_s"] *= 100  # baseline 100 veces más rápida que cualquier corrida real
+        caso["ruido"] = 0.0
+    baseline.write_text(json.dumps(datos), encoding="utf-8")
+    assert micro.main(args) == 1
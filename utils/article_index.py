@@ -0,0 +1,238 @@
+"""
+Índice compacto de artículos etiquetados + cuerpos en un blob mapeado en memoria.
+
+El summarizer y la evaluación sólo necesitan los artículos de un ministerio, pero leer
+noticias_etiquetadas.json obliga a parsear (y mantener en memoria) todos los cuerpos.
+Este módulo separa el archivo en dos:
+
+- <json>.idx: JSON chico con los metadatos livianos (título, fuente, fecha, link, ...),
+  los ministerios y, por artículo, el offset/largo de su registro en el blob. Se carga en
+  objetos con __slots__ y un índice ministerio → posiciones.
+- <json>.blob: concatenación de registros JSON (UTF-8) con los campos pesados
+  (Descripcion, Cuerpo, digest). Se abre con mmap y sólo se decodifican los registros
+  que se materializan.
+
+El índice guarda el tamaño y mtime del JSON de origen: si el JSON cambió después de la
+conversión, `abrir_si_vigente` devuelve None y los llamadores vuelven a leer el JSON.
+
+Uso:
+    python -m utils.article_index convertir data/noticias_etiquetadas.json
+    python -m utils.article_index bench data/noticias_etiquetadas.json [--ministerio Salud]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import mmap
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils.time_index import article_timestamp
+
+# Campos que van al blob; el resto queda en el índice
+CAMPOS_PESADOS = ("Descripcion", "Cuerpo", "digest")
+_VERSION = 1
+
+
+def rutas(json_path: Path) -> tuple:
+    json_path = Path(json_path)
+    return json_path.with_name(json_path.name + ".idx"), json_path.with_name(json_path.name + ".blob")
+
+
+def _firma(json_path: Path) -> Dict:
+    st = Path(json_path).stat()
+    return {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class ArticuloIndexado:
+    """Metadatos de un artículo y la ubicación de sus campos pesados en el blob."""
+
+    __slots__ = ("meta", "ministerios", "fecha_ts", "offset", "largo")
+
+    def __init__(self, meta: tuple, ministerios: tuple, fecha_ts: Optional[float], offset: int, largo: int):
+        self.meta = meta
+        self.ministerios = ministerios
+        self.fecha_ts = fecha_ts
+        self.offset = offset
+        self.largo = largo
+
+
+def convertir_articulos(articulos: Sequence[Dict], json_path: Path) -> Dict:
+    """
+    Escribe <json>.idx y <json>.blob para `articulos`, que deben ser el contenido actual
+    de `json_path` (la firma del índice se toma de ese archivo).
+    """
+    idx_path, blob_path = rutas(json_path)
+    campos = sorted({k for a in articulos for k in a if k not in CAMPOS_PESADOS and k != "ministerio"})
+    filas, offset = [], 0
+    tmp_blob = blob_path.with_suffix(".blob.tmp")
+    with open(tmp_blob, "wb") as blob:
+        for a in articulos:
+            pesado = json.dumps(
+                {k: a[k] for k in CAMPOS_PESADOS if k in a}, ensure_ascii=False
+            ).encode("utf-8")
+            blob.write(pesado)
+            filas.append([
+                [a.get(c) for c in campos], list(a.get("ministerio") or []),
+                article_timestamp(a), offset, len(pesado),
+            ])
+            offset += len(pesado)
+    indice = {
+        "version": _VERSION, "origen": _firma(json_path), "campos": campos, "filas": filas,
+    }
+    tmp_idx = idx_path.with_suffix(".idx.tmp")
+    tmp_idx.write_text(json.dumps(indice, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_blob, blob_path)
+    os.replace(tmp_idx, idx_path)
+    return {"articulos": len(filas), "idx_bytes": idx_path.stat().st_size, "blob_bytes": offset}
+
+
+def convertir(json_path: Path) -> Dict:
+    """Convierte un noticias_etiquetadas.json existente."""
+    articulos = json.loads(Path(json_path).read_text(encoding="utf-8"))
+    return convertir_articulos(articulos, json_path)
+
+
+class ArticleIndex:
+    def __init__(self, json_path: Path):
+        self.json_path = Path(json_path)
+        idx_path, blob_path = rutas(self.json_path)
+        indice = json.loads(idx_path.read_text(encoding="utf-8"))
+        self.origen: Dict = indice["origen"]
+        self.campos: tuple = tuple(indice["campos"])
+        self.entradas: List[ArticuloIndexado] = [
+            ArticuloIndexado(tuple(meta), tuple(ministerios), ts, offset, largo)
+            for meta, ministerios, ts, offset, largo in indice["filas"]
+        ]
+        self._por_ministerio: Dict[str, List[int]] = {}
+        for i, e in enumerate(self.entradas):
+            for m in e.ministerios:
+                self._por_ministerio.setdefault(m, []).append(i)
+        self._archivo = open(blob_path, "rb")
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        self._blob = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ) if tamano else b""
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    def vigente(self) -> bool:
+        """True si el JSON de origen no cambió desde la conversión."""
+        try:
+            return _firma(self.json_path) == self.origen
+        except FileNotFoundError:
+            return False
+
+    def por_ministerio(self, ministerio: str, since: Optional[float] = None) -> List[ArticuloIndexado]:
+        """Entradas etiquetadas con `ministerio` (y fecha >= since), en el orden del JSON."""
+        entradas = [self.entradas[i] for i in self._por_ministerio.get(ministerio, [])]
+        if since is not None:
+            entradas = [e for e in entradas if e.fecha_ts is not None and e.fecha_ts >= since]
+        return entradas
+
+    def materializar(self, entrada: ArticuloIndexado) -> Dict:
+        """Reconstruye el artículo completo (mismo dict que en el JSON)."""
+        articulo = dict(zip(self.campos, entrada.meta))
+        articulo.update(json.loads(self._blob[entrada.offset:entrada.offset + entrada.largo]))
+        articulo["ministerio"] = list(entrada.ministerios)
+        return articulo
+
+    def articulos(self, entradas: Iterable[ArticuloIndexado]) -> Iterator[Dict]:
+        for e in entradas:
+            yield self.materializar(e)
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._archivo.close()
+
+    def __enter__(self) -> "ArticleIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def abrir_si_vigente(json_path: Path) -> Optional[ArticleIndex]:
+    """ArticleIndex de `json_path` si existe y corresponde a su contenido actual; si no, None."""
+    idx_path, blob_path = rutas(json_path)
+    if not (idx_path.exists() and blob_path.exists() and Path(json_path).exists()):
+        return None
+    try:
+        indice = ArticleIndex(json_path)
+    except (ValueError, KeyError, OSError):
+        return None
+    if not indice.vigente():
+        indice.close()
+        return None
+    return indice
+
+
+def _medir(func) -> Dict:
+    """Tiempo (sin tracemalloc, que lo distorsiona) y memoria pico (en una segunda pasada)."""
+    gc.collect()
+    t0 = time.perf_counter()
+    resultado = func()
+    duracion = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": round(duracion, 4), "pico_mb": round(pico / 1e6, 2), "articulos": resultado}
+
+
+def bench(json_path: Path, ministerio: str) -> Dict:
+    """
+    Compara, para un ministerio: leer el JSON completo y filtrar; filtrar sólo con los
+    metadatos del índice; y filtrar con el índice materializando los cuerpos del blob.
+    """
+    def con_json():
+        articulos = json.loads(Path(json_path).read_text(encoding="utf-8"))
+        return len([a for a in articulos if ministerio in (a.get("ministerio") or [])])
+
+    def con_indice():
+        with ArticleIndex(json_path) as indice:
+            return len(indice.por_ministerio(ministerio))
+
+    def con_indice_y_cuerpos():
+        with ArticleIndex(json_path) as indice:
+            return len(list(indice.articulos(indice.por_ministerio(ministerio))))
+
+    return {
+        "json": _medir(con_json),
+        "indice": _medir(con_indice),
+        "indice+cuerpos": _medir(con_indice_y_cuerpos),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Índice de artículos + blob de cuerpos.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_conv = sub.add_parser("convertir", help="Genera <json>.idx y <json>.blob.")
+    p_conv.add_argument("json_path")
+    p_bench = sub.add_parser("bench", help="Compara tiempo y memoria pico contra leer el JSON.")
+    p_bench.add_argument("json_path")
+    p_bench.add_argument("--ministerio", default="Economía")
+    args = parser.parse_args(argv)
+
+    if args.comando == "convertir":
+        r = convertir(Path(args.json_path))
+        print(f"✓ {r['articulos']} artículos → índice {r['idx_bytes'] / 1e3:.0f} KB, "
+              f"blob {r['blob_bytes'] / 1e6:.1f} MB")
+        return 0
+
+    if abrir_si_vigente(Path(args.json_path)) is None:
+        convertir(Path(args.json_path))
+    r = bench(Path(args.json_path), args.ministerio)
+    for nombre, m in r.items():
+        print(f"{nombre:<15} {m['articulos']} artículos de '{args.ministerio}' en {m['segundos']:.3f}s, "
+              f"pico de memoria {m['pico_mb']:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
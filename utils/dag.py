@@ -0,0 +1,304 @@
+"""
+Ejecutor mínimo de DAGs para orquestar las etapas del pipeline en el mismo proceso.
+
+- Cada etapa (`Stage`) declara sus dependencias, archivos de entrada/salida y parámetros.
+- Las etapas independientes se ejecutan en paralelo con un pool de threads.
+- Si una etapa falla, sus dependientes no se ejecutan (quedan como "omitida").
+- Si la huella (hash de contenido de entradas + parámetros) no cambió desde la última
+  ejecución exitosa y las salidas existen, la etapa se saltea ("cache": "hit").
+- Cada corrida deja un manifiesto JSON con tiempos, tamaños y estado de cada etapa.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import metrics
+from utils.json_utils import write_json_atomic
+from utils.time_utils import format_duration_hms
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[], Optional[Dict[str, Any]]]
+    deps: List[str] = field(default_factory=list)
+    inputs: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    cacheable: bool = True
+    # Permite reemplazar el hash de archivos completos por uno más específico
+    # (p. ej. sólo los artículos de un ministerio dentro de un JSON compartido).
+    fingerprint: Optional[Callable[[], str]] = None
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Devuelve el sha256 del contenido de `path` (o un marcador si no existe)."""
+    if not path.exists():
+        return "missing"
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _total_bytes(paths: List[Path]) -> int:
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+
+def stage_fingerprint(stage: Stage) -> str:
+    """Huella de una etapa: nombre, parámetros y hash de contenido de sus entradas."""
+    h = hashlib.sha256()
+    h.update(stage.name.encode("utf-8"))
+    h.update(json.dumps(stage.params, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    if stage.fingerprint is not None:
+        h.update(stage.fingerprint().encode("utf-8"))
+    else:
+        for path in sorted(stage.inputs, key=str):
+            h.update(str(path).encode("utf-8"))
+            h.update(file_sha256(path).encode("utf-8"))
+    return h.hexdigest()
+
+
+class _StdoutRouter:
+    """
+    Reemplazo de sys.stdout/sys.stderr que envía lo que escribe cada thread a su propio log.
+
+    Los threads no registrados (p. ej. el principal) siguen escribiendo en el stream original.
+    """
+
+    def __init__(self, original):
+        self._original = original
+        self._destinos: Dict[int, Any] = {}
+
+    def registrar(self, destino) -> None:
+        self._destinos[threading.get_ident()] = destino
+
+    def desregistrar(self) -> None:
+        self._destinos.pop(threading.get_ident(), None)
+
+    def _actual(self):
+        return self._destinos.get(threading.get_ident(), self._original)
+
+    def write(self, texto: str) -> int:
+        return self._actual().write(texto)
+
+    def flush(self) -> None:
+        self._actual().flush()
+
+    def reconfigure(self, *args, **kwargs) -> None:
+        if hasattr(self._original, "reconfigure"):
+            self._original.reconfigure(*args, **kwargs)
+
+    def __getattr__(self, nombre):
+        return getattr(self._original, nombre)
+
+
+def _validar(stages: List[Stage]) -> Dict[str, Stage]:
+    por_nombre: Dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in por_nombre:
+            raise ValueError(f"Etapa duplicada: '{stage.name}'.")
+        por_nombre[stage.name] = stage
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in por_nombre:
+                raise ValueError(f"La etapa '{stage.name}' depende de '{dep}', que no existe.")
+
+    # Detección de ciclos (DFS)
+    visitando, visitados = set(), set()
+
+    def _dfs(nombre: str) -> None:
+        if nombre in visitados:
+            return
+        if nombre in visitando:
+            raise ValueError(f"Ciclo detectado en el DAG en la etapa '{nombre}'.")
+        visitando.add(nombre)
+        for dep in por_nombre[nombre].deps:
+            _dfs(dep)
+        visitando.discard(nombre)
+        visitados.add(nombre)
+
+    for nombre in por_nombre:
+        _dfs(nombre)
+    return por_nombre
+
+
+def _leer_estado(state_file: Path) -> Dict[str, Dict[str, Any]]:
+    if not state_file.exists():
+        return {}
+    try:
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def run_dag(
+    stages: List[Stage],
+    *,
+    state_file: Path,
+    manifest_dir: Path,
+    log_dir: Optional[Path] = None,
+    max_workers: int = 4,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Ejecuta las etapas respetando dependencias y devuelve el manifiesto de la corrida.
+
+    Parámetros:
+    - stages: etapas del DAG (el orden de la lista sólo se usa para desempatar).
+    - state_file: JSON con la huella de la última ejecución exitosa de cada etapa.
+    - manifest_dir: carpeta donde se escribe `run_<timestamp>.json`.
+    - log_dir: si se indica, la salida de cada etapa se redirige a `<etapa>_<timestamp>.log`.
+    - max_workers: cantidad máxima de etapas ejecutándose en simultáneo.
+    - force: ignora la caché y ejecuta todas las etapas.
+
+    Retorna:
+    - Diccionario del manifiesto; `manifest["status"]` es "ok" o "error".
+    """
+    por_nombre = _validar(stages)
+    estado = _leer_estado(state_file)
+    estado_lock = threading.Lock()
+
+    run_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    t_inicio = time.time()
+    resultados: Dict[str, Dict[str, Any]] = {}
+
+    router: Optional[_StdoutRouter] = None
+    if log_dir is not None:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        router = _StdoutRouter(sys.stdout)
+        router_err = _StdoutRouter(sys.stderr)
+        sys.stdout, sys.stderr = router, router_err
+
+    def _ejecutar(stage: Stage) -> Dict[str, Any]:
+        registro: Dict[str, Any] = {
+            "deps": list(stage.deps),
+            "params": stage.params,
+            "inputs": [str(p) for p in stage.inputs],
+            "outputs": [str(p) for p in stage.outputs],
+            "input_bytes": _total_bytes(stage.inputs),
+        }
+        t0 = time.time()
+        huella = stage_fingerprint(stage) if stage.cacheable else None
+        registro["fingerprint"] = huella
+
+        with estado_lock:
+            previo = estado.get(stage.name, {})
+        if (
+            not force
+            and huella is not None
+            and previo.get("fingerprint") == huella
+            and all(p.exists() for p in stage.outputs)
+        ):
+            metrics.incr("etapas", etapa=stage.name, cache="hit")
+            registro.update({
+                "status": "ok",
+                "cache": "hit",
+                "wall_time_s": round(time.time() - t0, 4),
+                "output_bytes": _total_bytes(stage.outputs),
+            })
+            return registro
+
+        log_file = None
+        if router is not None:
+            log_file = log_dir / f"{stage.name}_{run_ts}.log"
+            registro["log"] = str(log_file)
+            destino = log_file.open("w", encoding="utf-8")
+            router.registrar(destino)
+            router_err.registrar(destino)
+        try:
+            with metrics.span("etapa", etapa=stage.name):
+                stats = stage.func()
+            registro["status"] = "ok"
+            if isinstance(stats, dict):
+                registro["stats"] = stats
+        except BaseException as exc:  # incluye SystemExit de los scripts
+            registro["status"] = "error"
+            registro["error"] = f"{type(exc).__name__}: {exc}"
+            traceback.print_exc()
+        finally:
+            if router is not None:
+                router.desregistrar()
+                router_err.desregistrar()
+                destino.close()
+
+        registro["cache"] = "miss" if stage.cacheable else "disabled"
+        registro["wall_time_s"] = round(time.time() - t0, 4)
+        registro["output_bytes"] = _total_bytes(stage.outputs)
+        if registro["status"] == "ok" and huella is not None:
+            with estado_lock:
+                estado[stage.name] = {
+                    "fingerprint": huella,
+                    "finished_at": datetime.now().isoformat(),
+                }
+                write_json_atomic(state_file, estado)
+        return registro
+
+    pendientes = [s.name for s in stages]
+    en_curso: Dict[Future, str] = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etapa") as pool:
+            while pendientes or en_curso:
+                for nombre in list(pendientes):
+                    stage = por_nombre[nombre]
+                    estados_deps = [resultados.get(d, {}).get("status") for d in stage.deps]
+                    if any(e in ("error", "omitida") for e in estados_deps):
+                        pendientes.remove(nombre)
+                        fallidas = [d for d in stage.deps if resultados[d]["status"] != "ok"]
+                        resultados[nombre] = {
+                            "deps": list(stage.deps),
+                            "status": "omitida",
+                            "cache": None,
+                            "error": f"Dependencias fallidas: {', '.join(fallidas)}",
+                            "wall_time_s": 0.0,
+                        }
+                        print(f"   ⏭ {nombre}: omitida (falló {', '.join(fallidas)})")
+                    elif all(e == "ok" for e in estados_deps):
+                        pendientes.remove(nombre)
+                        print(f"▶ {nombre}")
+                        en_curso[pool.submit(_ejecutar, stage)] = nombre
+
+                if not en_curso:
+                    continue
+                listos, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for fut in listos:
+                    nombre = en_curso.pop(fut)
+                    registro = fut.result()
+                    resultados[nombre] = registro
+                    duracion = format_duration_hms(registro["wall_time_s"])
+                    if registro["status"] == "ok" and registro["cache"] == "hit":
+                        print(f"   ⏩ {nombre}: sin cambios en las entradas (cache)")
+                    elif registro["status"] == "ok":
+                        print(f"   ✓ {nombre}: OK en {duracion}")
+                    else:
+                        print(f"   ✗ {nombre}: ERROR en {duracion} → {registro['error']}")
+    finally:
+        if router is not None:
+            sys.stdout, sys.stderr = router._original, router_err._original
+
+    manifiesto = {
+        "run_id": run_ts,
+        "started_at": datetime.fromtimestamp(t_inicio).isoformat(),
+        "finished_at": datetime.now().isoformat(),
+        "wall_time_s": round(time.time() - t_inicio, 4),
+        "status": "ok" if all(r["status"] == "ok" for r in resultados.values()) else "error",
+        "force": force,
+        "max_workers": max_workers,
+        "stages": {s.name: resultados[s.name] for s in stages},
+    }
+    manifest_path = manifest_dir / f"run_{run_ts}.json"
+    write_json_atomic(manifest_path, manifiesto)
+    manifiesto["manifest_path"] = str(manifest_path)
+    return manifiesto
@@ -0,0 +1,227 @@
+"""
+Servidor local de feeds RSS y artículos con JSON-LD (para probar el scraper sin red).
+
+Toma artículos de un JSON con el formato de data/noticias.json y los publica:
+- /rss/<n>.xml  → feed RSS n (los artículos se reparten entre los feeds).
+- /nota/<i>     → página HTML del artículo i con el bloque JSON-LD que lee `extract_jsonld`.
+- /robots.txt   → declara /sitemap.xml (índice) y /sitemap-news.xml.
+- /sitemap-news.xml → Google News sitemap con los artículos visibles (fecha y sección,
+  tomada del `Link` original, en <news:keywords>).
+- /sitemap.xml  → índice que apunta al de noticias y a /sitemap-archivo.xml.gz (gzip, todos).
+
+Sólo los primeros `visibles` artículos aparecen en los feeds; `publicar(n)` agrega
+los siguientes n, lo que permite simular noticias nuevas entre ciclos de polling.
+
+Uso:
+    python -m utils.fake_feeds --puerto 8765 --visibles 40
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.sitemaps import seccion_de_url
+
+
+def _pub_date(fecha: Optional[str]) -> str:
+    try:
+        dt = datetime.fromisoformat((fecha or "").replace("Z", "+00:00"))
+    except ValueError:
+        dt = datetime.now(timezone.utc)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeFeedServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status: int, cuerpo, tipo: str) -> None:
+        data = cuerpo if isinstance(cuerpo, bytes) else cuerpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        partes = self.path.split("?", 1)[0].strip("/").split("/")
+        sitemaps = {
+            "robots.txt": (self.server.render_robots, "text/plain"),
+            "sitemap.xml": (self.server.render_indice_sitemaps, "application/xml"),
+            "sitemap-news.xml": (self.server.render_sitemap_news, "application/xml"),
+            "sitemap-archivo.xml.gz": (self.server.render_sitemap_archivo, "application/gzip"),
+        }
+        if len(partes) == 1 and partes[0] in sitemaps:
+            render, tipo = sitemaps[partes[0]]
+            self._responder(200, render(), tipo)
+            return
+        try:
+            if len(partes) == 2 and partes[0] == "rss" and partes[1].endswith(".xml"):
+                n = int(partes[1][:-4])
+                self._responder(200, self.server.render_feed(n), "application/rss+xml")
+                return
+            if len(partes) == 2 and partes[0] == "nota":
+                html = self.server.render_articulo(int(partes[1]))
+                if html is not None:
+                    self._responder(200, html, "text/html")
+                    return
+        except ValueError:
+            pass
+        self._responder(404, "not found", "text/plain")
+
+
+class FakeFeedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        articulos: List[Dict],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        feeds: int = 2,
+        visibles: Optional[int] = None,
+    ):
+        super().__init__((host, port), _Handler)
+        self.articulos = articulos
+        self.n_feeds = feeds
+        self._lock = threading.Lock()
+        self.visibles = len(articulos) if visibles is None else min(visibles, len(articulos))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def feed_urls(self) -> List[str]:
+        return [f"{self.base_url}/rss/{n}.xml" for n in range(self.n_feeds)]
+
+    def publicar(self, n: int) -> None:
+        """Hace visibles los siguientes `n` artículos en los feeds."""
+        with self._lock:
+            self.visibles = min(self.visibles + n, len(self.articulos))
+
+    def render_feed(self, n: int) -> str:
+        with self._lock:
+            visibles = self.visibles
+        items = []
+        for i in range(n, visibles, self.n_feeds):
+            art = self.articulos[i]
+            items.append(
+                "<item>"
+                f"<title>{escape(art.get('Titulo') or '')}</title>"
+                f"<link>{self.base_url}/nota/{i}</link>"
+                f"<pubDate>{_pub_date(art.get('Fecha'))}</pubDate>"
+                "</item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<rss version="2.0"><channel><title>Feed {n}</title>{"".join(items)}</channel></rss>'
+        )
+
+    def render_robots(self) -> str:
+        return (
+            "User-agent: *\nAllow: /\n"
+            f"Sitemap: {self.base_url}/sitemap.xml\n"
+            f"Sitemap: {self.base_url}/sitemap-news.xml\n"
+        )
+
+    def render_indice_sitemaps(self) -> str:
+        hoy = datetime.now(timezone.utc).date().isoformat()
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"<sitemap><loc>{self.base_url}/sitemap-news.xml</loc><lastmod>{hoy}</lastmod></sitemap>"
+            f"<sitemap><loc>{self.base_url}/sitemap-archivo.xml.gz</loc></sitemap>"
+            "</sitemapindex>"
+        )
+
+    def _urlset(self, indices, news: bool) -> str:
+        entradas = []
+        for i in indices:
+            art = self.articulos[i]
+            loc = f"<loc>{self.base_url}/nota/{i}</loc>"
+            if news:
+                entradas.append(
+                    f"<url>{loc}<news:news>"
+                    "<news:publication><news:name>Fake</news:name><news:language>es</news:language></news:publication>"
+                    f"<news:publication_date>{escape(art.get('Fecha') or '')}</news:publication_date>"
+                    f"<news:title>{escape(art.get('Titulo') or '')}</news:title>"
+                    f"<news:keywords>{escape(seccion_de_url(art.get('Link') or ''))}</news:keywords>"
+                    "</news:news></url>"
+                )
+            else:
+                entradas.append(f"<url>{loc}<lastmod>{escape(art.get('Fecha') or '')}</lastmod></url>")
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+            'xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">'
+            f'{"".join(entradas)}</urlset>'
+        )
+
+    def render_sitemap_news(self) -> str:
+        with self._lock:
+            visibles = self.visibles
+        return self._urlset(range(visibles), news=True)
+
+    def render_sitemap_archivo(self) -> bytes:
+        return gzip.compress(self._urlset(range(len(self.articulos)), news=False).encode("utf-8"))
+
+    def render_articulo(self, i: int) -> Optional[str]:
+        if not 0 <= i < len(self.articulos):
+            return None
+        art = self.articulos[i]
+        jsonld = {
+            "@context": "https://schema.org",
+            "@type": "NewsArticle",
+            "headline": art.get("Titulo"),
+            "description": art.get("Descripcion"),
+            "articleBody": art.get("Cuerpo") or "",
+            "datePublished": art.get("Fecha"),
+            "author": {"@type": "Person", "name": art.get("Autor") or ""},
+            "publisher": {"@type": "Organization", "name": art.get("Fuente") or "Fake"},
+            "url": f"{self.base_url}/nota/{i}",
+        }
+        bloque = json.dumps(jsonld, ensure_ascii=False).replace("</", "<\\/")
+        return (
+            "<html><head>"
+            f'<script type="application/ld+json">{bloque}</script>'
+            f"</head><body><h1>{escape(art.get('Titulo') or '')}</h1></body></html>"
+        )
+
+    def iniciar_en_thread(self) -> "FakeFeedServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local de feeds RSS de prueba.")
+    parser.add_argument("--fuente", default="./data/noticias.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--feeds", type=int, default=2)
+    parser.add_argument("--visibles", type=int, default=None)
+    args = parser.parse_args()
+
+    articulos = json.loads(Path(args.fuente).read_text(encoding="utf-8"))
+    server = FakeFeedServer(articulos, args.host, args.puerto, args.feeds, args.visibles)
+    print(f"Fake feeds escuchando en {server.base_url}")
+    for url in server.feed_urls:
+        print(f"   • {url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
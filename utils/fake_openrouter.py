@@ -0,0 +1,285 @@
+"""
+Servidor local compatible con la API de chat completions de OpenRouter (para pruebas y benchmarks).
+
+Responde de forma determinística sin llamar a ningún modelo:
+- Si el mensaje del usuario es el payload del clasificador ({"items": [...]}) devuelve
+  la lista JSON [{"idx": ..., "ministerio": [...]}] usando palabras clave (con "digest"
+  armado por reglas si las instrucciones lo piden).
+- Si el mensaje del usuario es la tabla compacta del clasificador ("ITEMS" + TSV) responde
+  en el formato compacto [{"i": ..., "m": [códigos]}] (con "h"/"c"/"a" si el sistema pide digest).
+- En cualquier otro caso devuelve un resumen Markdown con la estructura del summarizer.
+- Con `canned` devuelve, en orden y de forma cíclica, las respuestas fijas indicadas.
+
+Para simular un proveedor real se puede configurar latencia (base + jitter), una fracción
+de respuestas de cola muy lentas, modelos caídos (siempre 500), una tasa de errores 500 y
+una tasa de respuestas 429 (con Retry-After). Las decisiones aleatorias usan
+un generador con semilla, así que dos corridas con la misma configuración son comparables.
+
+Uso:
+    python -m utils.fake_openrouter --puerto 8766 --latencia 0.8 --jitter 0.4 --tasa-429 0.05
+    export OPENROUTER_API_URL=http://127.0.0.1:8766/api/v1/chat/completions
+    export OPENROUTER_API_KEY=fake
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PALABRAS_CLAVE: Dict[str, List[str]] = {
+    "Salud": ["salud", "hospital", "médic", "vacuna", "enfermedad", "pacientes", "dengue"],
+    "Educación": ["educaci", "escuela", "universidad", "docente", "alumnos", "estudiantes"],
+    "Seguridad": ["policía", "polici", "delito", "robo", "crimen", "detenido", "narco", "homicidio"],
+    "Trabajo": ["trabaj", "empleo", "salario", "sindicato", "paro", "gremio", "cgt"],
+    "Economía": ["econom", "inflación", "dólar", "mercado", "fmi", "impuesto", "exporta", "tarifa"],
+}
+
+
+def clasificar_por_palabras(texto: str) -> List[str]:
+    """Asigna ministerios según palabras clave (determinístico, sin modelo)."""
+    texto = texto.lower()
+    return [m for m, claves in PALABRAS_CLAVE.items() if any(c in texto for c in claves)]
+
+
+_CIFRA = re.compile(r"[^.;:]{0,40}\b\d[\d.,]*\s*(?:%|millones|mil|pesos|dólares)?[^.;:]{0,30}")
+_ACTOR = re.compile(r"\b(?:[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\s){1,3}[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\b")
+
+
+def digest_por_reglas(titulo: str, descripcion: str, cuerpo: str) -> Dict[str, List[str]]:
+    """Digest determinístico: primeras oraciones, fragmentos con números y nombres propios."""
+    oraciones = [o.strip() for o in re.split(r"(?<=[.!?])\s+", f"{descripcion} {cuerpo}") if o.strip()]
+    texto = f"{titulo}. {descripcion} {cuerpo}"
+    actores: List[str] = []
+    for actor in _ACTOR.findall(texto):
+        if actor not in actores:
+            actores.append(actor)
+    return {
+        "hechos": [o[:200] for o in oraciones[:2]] or [titulo],
+        "cifras": [c.strip()[:120] for c in _CIFRA.findall(cuerpo)[:5]],
+        "actores": actores[:5],
+    }
+
+
+def _respuesta_clasificacion(items: List[Dict[str, Any]], con_digest: bool = False) -> str:
+    salida = []
+    for item in items:
+        texto = " ".join(str(item.get(k) or "") for k in ("titulo", "description", "body"))
+        registro = {"idx": item.get("idx"), "ministerio": clasificar_por_palabras(texto)}
+        if con_digest:
+            registro["digest"] = digest_por_reglas(
+                str(item.get("titulo") or ""), str(item.get("description") or ""), str(item.get("body") or "")
+            )
+        salida.append(registro)
+    return json.dumps(salida, ensure_ascii=False)
+
+
+def _respuesta_compacta(tabla: str, con_digest: bool = False) -> str:
+    from clasificador.prompt_builder import CODIGOS, leer_tabla
+
+    codigo_de = {nombre: codigo for codigo, nombre in CODIGOS.items()}
+    salida = []
+    for fila in leer_tabla(tabla):
+        texto = " ".join(fila.get(k) or "" for k in ("t", "d", "b"))
+        registro: Dict[str, Any] = {
+            "i": int(fila["i"]),
+            "m": [codigo_de[m] for m in clasificar_por_palabras(texto)],
+        }
+        if con_digest:
+            digest = digest_por_reglas(fila.get("t") or "", fila.get("d") or "", fila.get("b") or "")
+            registro.update(h=digest["hechos"], c=digest["cifras"], a=digest["actores"])
+        salida.append(registro)
+    return json.dumps(salida, ensure_ascii=False)
+
+
+def _respuesta_resumen(prompt: str) -> str:
+    titulos = [
+        linea.split("Título:", 1)[1].strip()
+        for linea in prompt.splitlines()
+        if "Título:" in linea
+    ]
+    evidencias = "\n".join(f"{i}. {t}" for i, t in enumerate(titulos[:10], start=1))
+    return (
+        "**Panorama general**\n"
+        f"- Resumen generado localmente a partir de {len(titulos)} artículos.\n\n"
+        "**Evidencias clave**\n"
+        f"{evidencias or '1. Sin artículos.'}\n\n"
+        "**Impacto y próximos pasos**\n"
+        "- Respuesta de prueba del servidor local."
+    )
+
+
+def generar_contenido(messages: List[Dict[str, str]]) -> str:
+    """Genera el contenido de la respuesta según el tipo de pedido."""
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    if user.startswith("ITEMS\n"):
+        sistema = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        return _respuesta_compacta(user, "digest" in sistema)
+    try:
+        payload = json.loads(user)
+    except (TypeError, json.JSONDecodeError):
+        payload = None
+    if isinstance(payload, dict) and isinstance(payload.get("items"), list):
+        con_digest = "digest" in str(payload.get("instrucciones") or "")
+        return _respuesta_clasificacion(payload["items"], con_digest)
+    return _respuesta_resumen(user)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeOpenRouterServer"
+
+    def log_message(self, format, *args):  # silencia el log por request
+        pass
+
+    def _responder(self, status: int, cuerpo: Dict[str, Any]) -> None:
+        data = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(largo).decode("utf-8"))
+            messages = payload["messages"]
+        except (ValueError, KeyError):
+            self._responder(400, {"error": {"message": "payload inválido"}})
+            return
+
+        resultado, demora = self.server.decidir(payload.get("model"))
+        if demora > 0:
+            time.sleep(demora)
+        if resultado == "429":
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.server.config.retry_after_s))
+            self.send_header("Content-Type", "application/json")
+            cuerpo = b'{"error": {"code": 429, "message": "Rate limit exceeded (fake)"}}'
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            return
+        if resultado == "500":
+            self._responder(500, {"error": {"code": 500, "message": "Internal error (fake)"}})
+            return
+
+        contenido = self.server.contenido(messages)
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        self._responder(200, {
+            "id": "fake-completion",
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": contenido}}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(contenido) // 4,
+                "total_tokens": (prompt_chars + len(contenido)) // 4,
+            },
+        })
+
+
+@dataclass
+class FakeConfig:
+    latencia_s: float = 0.0      # demora base de cada respuesta
+    jitter_s: float = 0.0        # demora adicional uniforme en [0, jitter_s]
+    tasa_error: float = 0.0      # probabilidad de responder 500
+    tasa_429: float = 0.0        # probabilidad de responder 429
+    retry_after_s: int = 1       # valor del header Retry-After en los 429
+    tasa_lenta: float = 0.0      # probabilidad de una respuesta de cola (muy lenta)
+    latencia_lenta_s: float = 10.0  # demora de esas respuestas
+    modelos_caidos: Optional[List[str]] = None  # modelos que siempre responden 500
+    semilla: int = 1234
+    canned: Optional[List[str]] = None  # respuestas fijas (se devuelven en ciclo)
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeConfig] = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeConfig()
+        self._rng = random.Random(self.config.semilla)
+        self._lock = threading.Lock()
+        self._canned_pos = 0
+        self.requests = 0
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "429": 0, "500": 0, "lentas": 0}
+
+    def decidir(self, modelo: Optional[str] = None):
+        """Decide (con la semilla) el resultado y la demora del próximo request."""
+        cfg = self.config
+        with self._lock:
+            self.requests += 1
+            self.stats["requests"] += 1
+            sorteo = self._rng.random()
+            demora = cfg.latencia_s + (self._rng.uniform(0, cfg.jitter_s) if cfg.jitter_s else 0.0)
+            if cfg.tasa_lenta and self._rng.random() < cfg.tasa_lenta:
+                demora = cfg.latencia_lenta_s
+                self.stats["lentas"] += 1
+            if modelo and modelo in (cfg.modelos_caidos or []):
+                resultado = "500"
+            elif sorteo < cfg.tasa_429:
+                resultado = "429"
+            elif sorteo < cfg.tasa_429 + cfg.tasa_error:
+                resultado = "500"
+            else:
+                resultado = "ok"
+            self.stats[resultado] += 1
+        # Los 429 se devuelven rápido, como haría un proveedor real
+        return resultado, (0.0 if resultado == "429" else demora)
+
+    def contenido(self, messages: List[Dict[str, str]]) -> str:
+        if self.config.canned:
+            with self._lock:
+                respuesta = self.config.canned[self._canned_pos % len(self.config.canned)]
+                self._canned_pos += 1
+            return respuesta
+        return generar_contenido(messages)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def iniciar_en_thread(self) -> "FakeOpenRouterServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local compatible con OpenRouter.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Demora base por respuesta (s).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Demora extra uniforme máxima (s).")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Proporción de respuestas 500.")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429.")
+    parser.add_argument("--tasa-lenta", type=float, default=0.0, help="Proporción de respuestas de cola.")
+    parser.add_argument("--latencia-lenta", type=float, default=10.0, help="Demora de esas respuestas (s).")
+    parser.add_argument(
+        "--modelos-caidos", nargs="*", default=None, help="Modelos que siempre responden 500."
+    )
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument(
+        "--canned", default=None,
+        help="JSON con una lista de respuestas fijas que se devuelven en ciclo.",
+    )
+    args = parser.parse_args()
+    canned = json.loads(Path(args.canned).read_text(encoding="utf-8")) if args.canned else None
+    config = FakeConfig(
+        latencia_s=args.latencia, jitter_s=args.jitter, tasa_error=args.tasa_error,
+        tasa_429=args.tasa_429, tasa_lenta=args.tasa_lenta, latencia_lenta_s=args.latencia_lenta,
+        modelos_caidos=args.modelos_caidos, semilla=args.semilla, canned=canned,
+    )
+    server = FakeOpenRouterServer(args.host, args.puerto, config)
+    print(f"Fake OpenRouter escuchando en {server.url} ({config})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
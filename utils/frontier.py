@@ -0,0 +1,462 @@
+"""
+Frontera de crawl compartida para varios workers del scraper (procesos o máquinas).
+
+Los links descubiertos (portadas, sitemaps, RSS) se agregan a la frontera deduplicados
+por URL normalizada; cada worker reclama URLs con un lease, las descarga y las completa
+con el artículo extraído (o el error). La frontera garantiza:
+
+- dedup: la URL normalizada es la clave; agregar una URL ya conocida no hace nada;
+- cortesía por dominio global: al reclamar una URL de un dominio, ese dominio no vuelve a
+  entregarse hasta `proximo = ahora + intervalo` (INTERVALO_DOMINIO_S o el configurado
+  para el dominio), sin importar qué worker la pida;
+- leases: una URL reclamada queda "en_curso" hasta `lease_hasta`; si el worker muere sin
+  completarla, el lease vence y vuelve a "pendiente" (hasta MAX_INTENTOS intentos);
+- reintentos: un error vuelve a "pendiente" con backoff exponencial (REINTENTO_BASE_S),
+  salvo los definitivos (p. ej. una página sin JSON-LD), que pasan directo a "error".
+
+Backends (misma interfaz, ver `abrir_frontier`):
+- `SQLiteFrontier`: archivo SQLite en modo WAL; cada reclamo es una transacción
+  `BEGIN IMMEDIATE`, así que varios procesos de la misma máquina comparten la frontera.
+- `FrontierRemoto`: cliente HTTP de `servir` (`python -m utils.frontier servir`), que
+  expone una SQLiteFrontier a workers en otras máquinas (el papel de un Redis compartido).
+
+Uso:
+    python newsScraper.py --frontier data/frontier.db --sembrar --descubrimiento ambos
+    python newsScraper.py --frontier data/frontier.db --trabajar --worker-id a   # N veces
+    python newsScraper.py --frontier data/frontier.db --exportar [--store]
+    python -m utils.frontier servir data/frontier.db --host 0.0.0.0 --puerto 8790
+    python newsScraper.py --frontier http://host:8790 --trabajar
+    python -m utils.frontier stats data/frontier.db
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from utils.urls import normalize_url
+
+FRONTIER_FILE = "./data/frontier.db"
+INTERVALO_DOMINIO_S = 1.0   # separación mínima entre requests al mismo dominio
+LEASE_S = 120.0             # tiempo para completar una URL reclamada
+MAX_INTENTOS = 3
+REINTENTO_BASE_S = 30.0     # backoff tras un error: 30 s, 60 s, ...
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url              TEXT PRIMARY KEY,
+    dominio          TEXT NOT NULL,
+    estado           TEXT NOT NULL DEFAULT 'pendiente',  -- pendiente | en_curso | hecho | error
+    prioridad        INTEGER NOT NULL DEFAULT 0,
+    disponible_desde REAL NOT NULL DEFAULT 0,
+    intentos         INTEGER NOT NULL DEFAULT 0,
+    worker           TEXT,
+    lease_hasta      REAL,
+    origen           TEXT,
+    agregado_en      REAL,
+    terminado_en     REAL,
+    error            TEXT,
+    resultado        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_urls_cola ON urls(estado, dominio, prioridad DESC, agregado_en);
+CREATE INDEX IF NOT EXISTS idx_urls_lease ON urls(estado, lease_hasta);
+CREATE TABLE IF NOT EXISTS dominios (
+    dominio     TEXT PRIMARY KEY,
+    intervalo_s REAL,
+    proximo     REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class Tarea:
+    url: str
+    dominio: str
+    intentos: int
+    lease_hasta: float
+
+
+def dominio_de(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def worker_id_por_defecto() -> str:
+    import os
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SQLiteFrontier:
+    def __init__(
+        self,
+        path: str = FRONTIER_FILE,
+        intervalo_dominio_s: float = INTERVALO_DOMINIO_S,
+        lease_s: float = LEASE_S,
+        max_intentos: int = MAX_INTENTOS,
+    ):
+        self.path = Path(path)
+        self.intervalo_dominio_s = intervalo_dominio_s
+        self.lease_s = lease_s
+        self.max_intentos = max_intentos
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SQLiteFrontier":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _transaccion(self, func):
+        """Ejecuta `func(cursor)` con la base bloqueada para escritura (entre procesos)."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = func(cur)
+                cur.execute("COMMIT")
+                return resultado
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    def agregar(self, urls: Iterable[str], prioridad: int = 0, origen: str = "") -> int:
+        """Agrega las URLs (normalizadas) que no estaban; devuelve cuántas eran nuevas."""
+        filas = {}
+        for u in urls:
+            nu = normalize_url(u)
+            if nu.startswith("http"):
+                filas.setdefault(nu, dominio_de(nu))
+        ahora = time.time()
+
+        def _agregar(cur):
+            antes = self._conn.total_changes
+            cur.executemany(
+                "INSERT OR IGNORE INTO urls (url, dominio, prioridad, origen, agregado_en) VALUES (?, ?, ?, ?, ?)",
+                [(u, d, prioridad, origen, ahora) for u, d in filas.items()],
+            )
+            nuevas = self._conn.total_changes - antes
+            cur.executemany(
+                "INSERT OR IGNORE INTO dominios (dominio) VALUES (?)", [(d,) for d in set(filas.values())]
+            )
+            return nuevas
+
+        return self._transaccion(_agregar) if filas else 0
+
+    def configurar_dominio(self, dominio: str, intervalo_s: Optional[float]) -> None:
+        """Intervalo propio de un dominio (p. ej. su Crawl-delay); None vuelve al por defecto."""
+        self._transaccion(lambda cur: cur.execute(
+            "INSERT INTO dominios (dominio, intervalo_s) VALUES (?, ?) "
+            "ON CONFLICT(dominio) DO UPDATE SET intervalo_s = excluded.intervalo_s",
+            (dominio.lower(), intervalo_s),
+        ))
+
+    def _vencer_leases(self, cur, ahora: float) -> int:
+        """Devuelve a pendiente (o a error, sin intentos restantes) los leases vencidos."""
+        cur.execute(
+            "UPDATE urls SET estado = 'error', worker = NULL, error = 'lease vencido', terminado_en = ? "
+            "WHERE estado = 'en_curso' AND lease_hasta < ? AND intentos >= ?",
+            (ahora, ahora, self.max_intentos),
+        )
+        cur.execute(
+            "UPDATE urls SET estado = 'pendiente', worker = NULL "
+            "WHERE estado = 'en_curso' AND lease_hasta < ?",
+            (ahora,),
+        )
+        return cur.rowcount
+
+    def reclamar(self, worker: str, n: int = 1) -> List[Tarea]:
+        """
+        Reclama hasta `n` URLs, a lo sumo una por dominio, sólo de dominios cuyo intervalo
+        de cortesía ya pasó. Devuelve [] si no hay nada disponible por ahora.
+        """
+        def _reclamar(cur):
+            ahora = time.time()
+            self._vencer_leases(cur, ahora)
+            dominios = [d for (d,) in cur.execute(
+                "SELECT d.dominio FROM dominios d WHERE d.proximo <= ? AND EXISTS ("
+                "  SELECT 1 FROM urls u WHERE u.dominio = d.dominio AND u.estado = 'pendiente'"
+                "  AND u.disponible_desde <= ?) ORDER BY d.proximo LIMIT ?",
+                (ahora, ahora, n),
+            ).fetchall()]
+            tareas = []
+            lease_hasta = ahora + self.lease_s
+            for dominio in dominios:
+                url, intentos = cur.execute(
+                    "SELECT url, intentos FROM urls WHERE dominio = ? AND estado = 'pendiente' "
+                    "AND disponible_desde <= ? ORDER BY prioridad DESC, agregado_en LIMIT 1",
+                    (dominio, ahora),
+                ).fetchone()
+                cur.execute(
+                    "UPDATE urls SET estado = 'en_curso', worker = ?, lease_hasta = ?, intentos = intentos + 1 "
+                    "WHERE url = ?",
+                    (worker, lease_hasta, url),
+                )
+                cur.execute(
+                    "UPDATE dominios SET proximo = ? + COALESCE(intervalo_s, ?) WHERE dominio = ?",
+                    (ahora, self.intervalo_dominio_s, dominio),
+                )
+                tareas.append(Tarea(url, dominio, intentos + 1, lease_hasta))
+            return tareas
+
+        return self._transaccion(_reclamar)
+
+    def completar(
+        self, url: str, worker: str, resultado: Optional[Dict] = None, error: Optional[str] = None,
+        definitivo: bool = False,
+    ) -> bool:
+        """
+        Cierra una URL reclamada por `worker`: "hecho" con `resultado`, o reintento/"error"
+        con `error` (directo a "error", sin reintentos, si es `definitivo`). Devuelve False si
+        el lease ya no es de este worker (venció y otro la tomó).
+        """
+        def _completar(cur):
+            ahora = time.time()
+            fila = cur.execute(
+                "SELECT intentos FROM urls WHERE url = ? AND estado = 'en_curso' AND worker = ?",
+                (url, worker),
+            ).fetchone()
+            if fila is None:
+                return False
+            if error is None:
+                cur.execute(
+                    "UPDATE urls SET estado = 'hecho', worker = NULL, terminado_en = ?, error = NULL, "
+                    "resultado = ? WHERE url = ?",
+                    (ahora, json.dumps(resultado, ensure_ascii=False) if resultado is not None else None, url),
+                )
+            elif definitivo or fila[0] >= self.max_intentos:
+                cur.execute(
+                    "UPDATE urls SET estado = 'error', worker = NULL, terminado_en = ?, error = ? WHERE url = ?",
+                    (ahora, error[:500], url),
+                )
+            else:
+                cur.execute(
+                    "UPDATE urls SET estado = 'pendiente', worker = NULL, error = ?, disponible_desde = ? "
+                    "WHERE url = ?",
+                    (error[:500], ahora + REINTENTO_BASE_S * 2 ** (fila[0] - 1), url),
+                )
+            return True
+
+        return self._transaccion(_completar)
+
+    def proxima_disponibilidad(self) -> Optional[float]:
+        """Segundos hasta que pueda haber algo para reclamar (0 = ya); None si no queda nada."""
+        with self._lock:
+            ahora = time.time()
+            pendientes = self._conn.execute(
+                "SELECT MIN(MAX(u.disponible_desde, d.proximo)) FROM urls u JOIN dominios d USING (dominio) "
+                "WHERE u.estado = 'pendiente'"
+            ).fetchone()[0]
+            leases = self._conn.execute(
+                "SELECT MIN(lease_hasta) FROM urls WHERE estado = 'en_curso'"
+            ).fetchone()[0]
+        candidatos = [t for t in (pendientes, leases) if t is not None]
+        return max(0.0, min(candidatos) - ahora) if candidatos else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            por_estado = dict(self._conn.execute("SELECT estado, COUNT(*) FROM urls GROUP BY estado"))
+            por_worker = dict(self._conn.execute(
+                "SELECT worker, COUNT(*) FROM urls WHERE estado = 'en_curso' GROUP BY worker"
+            ))
+            dominios = self._conn.execute("SELECT COUNT(*) FROM dominios").fetchone()[0]
+        return {
+            "urls": sum(por_estado.values()),
+            **{e: por_estado.get(e, 0) for e in ("pendiente", "en_curso", "hecho", "error")},
+            "dominios": dominios,
+            "en_curso_por_worker": por_worker,
+        }
+
+    def resultados(self) -> List[Dict]:
+        """Artículos extraídos (estado "hecho" con resultado), en orden de llegada."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT resultado FROM urls WHERE estado = 'hecho' AND resultado IS NOT NULL "
+                "ORDER BY terminado_en"
+            ).fetchall()
+        return [json.loads(r) for (r,) in filas]
+
+
+# -------------------------------
+# Servidor HTTP y cliente remoto
+# -------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FrontierServidor"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # silencia el log por request
+        pass
+
+    def _responder(self, status: int, cuerpo: Any) -> None:
+        data = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        f = self.server.frontier
+        if self.path == "/stats":
+            self._responder(200, f.stats())
+        elif self.path == "/proxima":
+            self._responder(200, {"segundos": f.proxima_disponibilidad()})
+        elif self.path == "/resultados":
+            self._responder(200, f.resultados())
+        else:
+            self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self):
+        f = self.server.frontier
+        largo = int(self.headers.get("Content-Length") or 0)
+        try:
+            p = json.loads(self.rfile.read(largo).decode("utf-8"))
+            if self.path == "/agregar":
+                self._responder(200, {"nuevas": f.agregar(p["urls"], p.get("prioridad", 0), p.get("origen", ""))})
+            elif self.path == "/reclamar":
+                self._responder(200, [asdict(t) for t in f.reclamar(p["worker"], p.get("n", 1))])
+            elif self.path == "/completar":
+                self._responder(200, {"ok": f.completar(
+                    p["url"], p["worker"], p.get("resultado"), p.get("error"), bool(p.get("definitivo")),
+                )})
+            else:
+                self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+        except (ValueError, KeyError) as exc:
+            self._responder(400, {"error": f"payload inválido: {exc}"})
+
+
+class FrontierServidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, frontier: SQLiteFrontier, host: str = "127.0.0.1", port: int = 8790):
+        super().__init__((host, port), _Handler)
+        self.frontier = frontier
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def iniciar_en_thread(self) -> "FrontierServidor":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FrontierRemoto:
+    """Misma interfaz que SQLiteFrontier, contra un `FrontierServidor`."""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.path = self.url
+        self.timeout = timeout
+        self._sesion = requests.Session()
+
+    def _post(self, ruta: str, payload: Dict) -> Any:
+        r = self._sesion.post(f"{self.url}{ruta}", json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def _get(self, ruta: str) -> Any:
+        r = self._sesion.get(f"{self.url}{ruta}", timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def agregar(self, urls: Iterable[str], prioridad: int = 0, origen: str = "") -> int:
+        return self._post("/agregar", {"urls": list(urls), "prioridad": prioridad, "origen": origen})["nuevas"]
+
+    def reclamar(self, worker: str, n: int = 1) -> List[Tarea]:
+        return [Tarea(**t) for t in self._post("/reclamar", {"worker": worker, "n": n})]
+
+    def completar(
+        self, url: str, worker: str, resultado: Optional[Dict] = None, error: Optional[str] = None,
+        definitivo: bool = False,
+    ) -> bool:
+        return self._post("/completar", {
+            "url": url, "worker": worker, "resultado": resultado, "error": error, "definitivo": definitivo,
+        })["ok"]
+
+    def proxima_disponibilidad(self) -> Optional[float]:
+        return self._get("/proxima")["segundos"]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._get("/stats")
+
+    def resultados(self) -> List[Dict]:
+        return self._get("/resultados")
+
+    def close(self) -> None:
+        self._sesion.close()
+
+    def __enter__(self) -> "FrontierRemoto":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def abrir_frontier(destino: str = FRONTIER_FILE):
+    """FrontierRemoto si `destino` es una URL http(s); si no, SQLiteFrontier sobre ese archivo."""
+    if destino.startswith(("http://", "https://")):
+        return FrontierRemoto(destino)
+    return SQLiteFrontier(destino)
+
+
+def imprimir_stats(s: Dict[str, Any], destino: str) -> None:
+    print(f"{s['urls']} URL(s) en {s['dominios']} dominio(s) ({destino})")
+    print(f"   pendientes {s['pendiente']} | en curso {s['en_curso']} | hechas {s['hecho']} | error {s['error']}")
+    for worker, n in sorted(s["en_curso_por_worker"].items()):
+        print(f"   {worker}: {n} en curso")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Frontera de crawl compartida del scraper.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_stats = sub.add_parser("stats", help="Estado de la frontera.")
+    p_stats.add_argument("destino", nargs="?", default=FRONTIER_FILE)
+    p_servir = sub.add_parser("servir", help="Expone una frontera SQLite por HTTP para otras máquinas.")
+    p_servir.add_argument("path", nargs="?", default=FRONTIER_FILE)
+    p_servir.add_argument("--host", default="127.0.0.1",
+                          help="Interfaz de escucha (0.0.0.0 para aceptar workers de otras máquinas).")
+    p_servir.add_argument("--puerto", type=int, default=8790)
+    p_dom = sub.add_parser("dominio", help="Fija el intervalo de cortesía de un dominio.")
+    p_dom.add_argument("dominio")
+    p_dom.add_argument("intervalo_s", type=float)
+    p_dom.add_argument("--path", default=FRONTIER_FILE)
+    args = parser.parse_args(argv)
+
+    if args.comando == "stats":
+        with abrir_frontier(args.destino) as f:
+            imprimir_stats(f.stats(), args.destino)
+    elif args.comando == "dominio":
+        with SQLiteFrontier(args.path) as f:
+            f.configurar_dominio(args.dominio, args.intervalo_s)
+        print(f"✓ {args.dominio}: una request cada {args.intervalo_s}s")
+    else:
+        server = FrontierServidor(SQLiteFrontier(args.path), args.host, args.puerto)
+        print(f"Frontera {args.path} escuchando en {server.url}")
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
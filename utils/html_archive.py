@@ -0,0 +1,146 @@
+"""
+Archivo append-only del HTML crudo descargado por el scraper (estilo WARC).
+
+Permite re-extraer artículos (por ejemplo, después de mejorar `parse_jsonld_html`) sin
+volver a descargar nada, incluso notas que ya no están online.
+
+Formato en disco (directorio ARCHIVE_DIR):
+- seg-00000.gz, seg-00001.gz, ...: cada respuesta es un miembro gzip independiente
+  (una línea JSON de cabecera + los bytes del cuerpo). Un segmento es un .gz válido y,
+  con el offset, cualquier registro se lee con un seek + una descompresión.
+  Se abre un segmento nuevo al superar SEGMENTO_MAX_BYTES.
+- index.jsonl: una línea por registro {"url", "segmento", "offset", "largo", "status",
+  "fecha"}, con la URL normalizada como clave; ante descargas repetidas vale la última.
+
+Uso:
+    python newsScraper.py --archivar                 # scrapea guardando el HTML
+    python newsScraper.py --reextraer [--workers 8]  # re-extrae desde el archivo, sin red
+    python -m utils.html_archive stats
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from utils.urls import normalize_url
+
+ARCHIVE_DIR = "./data/html_archive"
+SEGMENTO_MAX_BYTES = 64 * 1024 * 1024
+_INDICE = "index.jsonl"
+
+
+@dataclass
+class RegistroHtml:
+    url: str
+    status: int
+    fecha: str  # ISO 8601 de la descarga
+    contenido: bytes
+
+    @property
+    def html(self) -> str:
+        return self.contenido.decode("utf-8", errors="replace")
+
+
+def leer_registro(path: Path, offset: int, largo: int) -> RegistroHtml:
+    """Lee el miembro gzip [offset, offset + largo) de un segmento."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        crudo = zlib.decompress(f.read(largo), wbits=31)
+    cabecera, _, contenido = crudo.partition(b"\n")
+    meta = json.loads(cabecera)
+    return RegistroHtml(meta["url"], meta["status"], meta["fecha"], contenido)
+
+
+class HtmlArchive:
+    def __init__(self, directorio: str = ARCHIVE_DIR, segmento_max_bytes: int = SEGMENTO_MAX_BYTES):
+        self.dir = Path(directorio)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segmento_max_bytes = segmento_max_bytes
+        self._lock = threading.Lock()
+        self._indice: Dict[str, Dict] = {}
+        ruta_indice = self.dir / _INDICE
+        if ruta_indice.exists():
+            with open(ruta_indice, encoding="utf-8") as f:
+                for linea in f:
+                    if linea.strip():
+                        entrada = json.loads(linea)
+                        self._indice[entrada["url"]] = entrada
+        segmentos = sorted(self.dir.glob("seg-*.gz"))
+        self._segmento = int(segmentos[-1].stem[4:]) if segmentos else 0
+
+    def _ruta_segmento(self, n: int) -> Path:
+        return self.dir / f"seg-{n:05d}.gz"
+
+    def guardar(self, url: str, status: int, contenido: bytes, fecha: Optional[str] = None) -> Dict:
+        """Agrega una respuesta al segmento actual y su entrada al índice."""
+        clave = normalize_url(url)
+        fecha = fecha or datetime.now().isoformat()
+        cabecera = json.dumps({"url": clave, "status": status, "fecha": fecha}, ensure_ascii=False)
+        miembro = gzip.compress(cabecera.encode("utf-8") + b"\n" + contenido)
+        with self._lock:
+            ruta = self._ruta_segmento(self._segmento)
+            if ruta.exists() and ruta.stat().st_size >= self.segmento_max_bytes:
+                self._segmento += 1
+                ruta = self._ruta_segmento(self._segmento)
+            with open(ruta, "ab") as f:
+                offset = f.tell()
+                f.write(miembro)
+            entrada = {
+                "url": clave, "segmento": ruta.name, "offset": offset, "largo": len(miembro),
+                "status": status, "fecha": fecha,
+            }
+            with open(self.dir / _INDICE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            self._indice[clave] = entrada
+        return entrada
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._indice
+
+    def __len__(self) -> int:
+        return len(self._indice)
+
+    def leer(self, url: str) -> Optional[RegistroHtml]:
+        entrada = self._indice.get(normalize_url(url))
+        if entrada is None:
+            return None
+        return leer_registro(self.dir / entrada["segmento"], entrada["offset"], entrada["largo"])
+
+    def entradas(self) -> List[Dict]:
+        """Última entrada de cada URL, ordenadas por segmento y offset (lectura secuencial)."""
+        return sorted(self._indice.values(), key=lambda e: (e["segmento"], e["offset"]))
+
+    def iterar(self) -> Iterator[RegistroHtml]:
+        for e in self.entradas():
+            yield leer_registro(self.dir / e["segmento"], e["offset"], e["largo"])
+
+    def stats(self) -> Dict:
+        segmentos = sorted(self.dir.glob("seg-*.gz"))
+        return {
+            "urls": len(self._indice),
+            "segmentos": len(segmentos),
+            "bytes_comprimidos": sum(p.stat().st_size for p in segmentos),
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Archivo de HTML crudo del scraper.")
+    parser.add_argument("comando", choices=["stats"])
+    parser.add_argument("--archivo", default=ARCHIVE_DIR, help="Directorio del archivo.")
+    args = parser.parse_args(argv)
+
+    s = HtmlArchive(args.archivo).stats()
+    print(f"{s['urls']} URL(s) en {s['segmentos']} segmento(s), "
+          f"{s['bytes_comprimidos'] / 1e6:.1f} MB comprimidos ({args.archivo})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,17 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+def write_json_atomic(path: Path, data: Any, indent: int = 2) -> None:
+    """
+    Escribe `data` como JSON en `path` de forma atómica (archivo temporal + os.replace).
+
+    Evita que un lector concurrente (otra etapa, el orquestador) vea un archivo a medio escribir.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=indent), encoding="utf-8")
+    os.replace(tmp, path)
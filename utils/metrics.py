@@ -0,0 +1,373 @@
+"""
+Métricas estructuradas y trazas para las etapas del pipeline.
+
+- `span(nombre, **attrs)` mide un bloque (fetch HTTP, llamada al LLM, lote, etapa) y
+  agrega una línea JSON a METRICS_DIR/trace.jsonl con duración, estado, atributos y el
+  span padre (los spans anidados en el mismo thread forman una traza). Al pasar
+  TRACE_MAX_BYTES el archivo rota a trace.jsonl.1 … .TRACE_ROTACIONES (se borra el más viejo).
+- `medido(nombre)` decora una función completa y `anotar(**attrs)` completa el span
+  abierto (p. ej. con `items`, que el reporte usa para calcular el throughput).
+- `incr(nombre, valor, **labels)` acumula contadores (tokens, requests, reintentos…).
+- Con --profile (utils.profiling) cada span registra además su memoria pico.
+- `flush()` escribe METRICS_DIR/<job>.prom en formato textfile de Prometheus
+  (node_exporter --collector.textfile.directory); se llama solo al salir del proceso.
+
+Reporte por etapa (p50/p95/p99 y throughput) a partir de las trazas acumuladas:
+    python -m utils.metrics reporte [--trace data/outputs/metrics/trace.jsonl] [--ultimas 5]
+
+`PIPELINE_METRICS=0` desactiva la escritura; `PIPELINE_METRICS_DIR` cambia el directorio.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils import profiling
+
+METRICS_DIR = Path(os.getenv("PIPELINE_METRICS_DIR", "data/outputs/metrics"))
+TRACE_FILE = METRICS_DIR / "trace.jsonl"
+HABILITADO = os.getenv("PIPELINE_METRICS", "1") != "0"
+FLUSH_CADA_S = 15.0  # procesos largos (daemon) reescriben el .prom como mucho cada 15 s
+RESERVORIO = 1024    # muestras de duración por span para los cuantiles del .prom
+TRACE_MAX_BYTES = 50 * 1024 * 1024  # trace.jsonl rota al pasar este tamaño (daemon)…
+TRACE_ROTACIONES = 3                # …y se conservan estos archivos viejos
+
+RUN_ID = os.getenv("PIPELINE_RUN_ID") or f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+JOB = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] not in ("", "-c") else "python"
+
+
+class _Duraciones:
+    """Cantidad y suma exactas más una muestra uniforme acotada (reservoir sampling)."""
+
+    __slots__ = ("n", "suma", "muestra")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.suma = 0.0
+        self.muestra: List[float] = []
+
+    def agregar(self, duracion: float) -> None:
+        self.n += 1
+        self.suma += duracion
+        if len(self.muestra) < RESERVORIO:
+            self.muestra.append(duracion)
+        else:
+            i = _rng.randrange(self.n)
+            if i < RESERVORIO:
+                self.muestra[i] = duracion
+
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_local = threading.local()
+_rng = random.Random()
+_contadores: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+_duraciones: Dict[Tuple[str, str], _Duraciones] = defaultdict(_Duraciones)
+_ultimo_flush = time.monotonic()
+_trace_bytes: Optional[int] = None  # tamaño estimado de TRACE_FILE (se relee antes de rotar)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por interpolación lineal (0 si no hay valores)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100.0
+    piso = int(k)
+    techo = min(piso + 1, len(ordenados) - 1)
+    return ordenados[piso] + (ordenados[techo] - ordenados[piso]) * (k - piso)
+
+
+def configurar(job: Optional[str] = None, habilitado: Optional[bool] = None) -> None:
+    """Cambia el nombre del job (archivo .prom) o activa/desactiva la escritura."""
+    global JOB, HABILITADO
+    if job is not None:
+        JOB = job
+    if habilitado is not None:
+        HABILITADO = habilitado
+
+
+class Span:
+    """Bloque medido; `set()` agrega atributos conocidos recién al final (tokens, status HTTP…)."""
+
+    __slots__ = ("nombre", "attrs", "span_id", "padre", "traza", "inicio")
+
+    def __init__(self, nombre: str, attrs: Dict[str, Any], padre: Optional["Span"]):
+        self.nombre = nombre
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:12]
+        self.padre = padre.span_id if padre else None
+        self.traza = padre.traza if padre else self.span_id
+        self.inicio = time.time()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(nombre: str, **attrs: Any) -> Iterator[Span]:
+    """Mide el bloque y registra el span (también si termina con excepción)."""
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    actual = Span(nombre, attrs, pila[-1] if pila else None)
+    pila.append(actual)
+    t0 = time.perf_counter()
+    estado, error = "ok", None
+    try:
+        with profiling.etapa(nombre):  # no-op sin --profile
+            yield actual
+    except BaseException as exc:
+        estado, error = "error", f"{type(exc).__name__}: {exc}"[:300]
+        raise
+    finally:
+        pila.pop()
+        _registrar_span(actual, time.perf_counter() - t0, estado, error)
+
+
+def anotar(**attrs: Any) -> None:
+    """Agrega atributos al span abierto más interno del thread actual (si hay uno)."""
+    pila = getattr(_local, "pila", None)
+    if pila:
+        pila[-1].set(**attrs)
+
+
+def medido(nombre: str, **attrs: Any) -> Callable:
+    """Decorador: ejecuta la función dentro de `span(nombre, **attrs)`."""
+    def decorador(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            with span(nombre, **attrs):
+                return func(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def incr(nombre: str, valor: float = 1, **labels: Any) -> None:
+    """Suma `valor` al contador `nombre` con las etiquetas dadas."""
+    clave = (nombre, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _contadores[clave] += valor
+
+
+def _registrar_span(sp: Span, duracion: float, estado: str, error: Optional[str]) -> None:
+    global _trace_bytes
+    registro = {
+        "ts": round(sp.inicio, 3),
+        "run": RUN_ID,
+        "job": JOB,
+        "traza": sp.traza,
+        "span_id": sp.span_id,
+        "padre": sp.padre,
+        "nombre": sp.nombre,
+        "dur_s": round(duracion, 6),
+        "estado": estado,
+        "attrs": sp.attrs,
+    }
+    if error:
+        registro["error"] = error
+    linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        _duraciones[(sp.nombre, estado)].agregar(duracion)
+        if not HABILITADO:
+            return
+        TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _rotar_trace_si_corresponde()
+        with TRACE_FILE.open("a", encoding="utf-8") as f:
+            f.write(linea)
+        _trace_bytes += len(linea.encode("utf-8"))
+    if time.monotonic() - _ultimo_flush > FLUSH_CADA_S:
+        flush()
+
+
+def _rotados(path: Path) -> List[Path]:
+    """trace.jsonl.N … trace.jsonl.1 (del más viejo al más nuevo)."""
+    return [path.with_name(f"{path.name}.{n}") for n in range(TRACE_ROTACIONES, 0, -1)]
+
+
+def _rotar_trace_si_corresponde() -> None:
+    """Rota TRACE_FILE si pasó TRACE_MAX_BYTES. Se llama con `_lock` tomado."""
+    global _trace_bytes
+    if _trace_bytes is not None and _trace_bytes < TRACE_MAX_BYTES:
+        return
+    # Primera escritura o límite alcanzado: manda el tamaño real (otro proceso pudo rotar)
+    _trace_bytes = TRACE_FILE.stat().st_size if TRACE_FILE.exists() else 0
+    if _trace_bytes < TRACE_MAX_BYTES:
+        return
+    rotados = _rotados(TRACE_FILE)
+    try:
+        for viejo, nuevo in zip(rotados[1:], rotados):  # .N-1 → .N, …, .1 → .2
+            if viejo.exists():
+                os.replace(viejo, nuevo)
+        os.replace(TRACE_FILE, rotados[-1])
+    except FileNotFoundError:
+        pass  # otro proceso rotó al mismo tiempo
+    _trace_bytes = 0
+
+
+def _labels(pares) -> str:
+    if not pares:
+        return ""
+    cuerpo = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in pares)
+    return "{" + cuerpo + "}"
+
+
+def _nombre_prom(nombre: str) -> str:
+    return "pipeline_" + "".join(c if c.isalnum() else "_" for c in nombre)
+
+
+def render_prometheus() -> str:
+    """Texto en formato de exposición de Prometheus con contadores y resúmenes de spans."""
+    with _lock:
+        contadores = dict(_contadores)
+        duraciones = {k: (v.n, v.suma, list(v.muestra)) for k, v in _duraciones.items()}
+    lineas: List[str] = []
+    por_nombre: Dict[str, List] = defaultdict(list)
+    for (nombre, pares), valor in sorted(contadores.items()):
+        por_nombre[nombre].append((pares, valor))
+    for nombre, series in por_nombre.items():
+        metrica = _nombre_prom(nombre) + "_total"
+        lineas.append(f"# TYPE {metrica} counter")
+        lineas.extend(f"{metrica}{_labels(pares)} {valor:g}" for pares, valor in series)
+    if duraciones:
+        lineas.append("# TYPE pipeline_span_seconds summary")
+        for (nombre, estado), (n, suma, muestra) in sorted(duraciones.items()):
+            base = [("span", nombre), ("estado", estado)]
+            for q in (0.5, 0.95, 0.99):
+                lineas.append(
+                    f"pipeline_span_seconds{_labels(base + [('quantile', q)])} "
+                    f"{percentil(muestra, q * 100):.6f}"
+                )
+            lineas.append(f"pipeline_span_seconds_sum{_labels(base)} {suma:.6f}")
+            lineas.append(f"pipeline_span_seconds_count{_labels(base)} {n}")
+    return "\n".join(lineas) + "\n"
+
+
+def flush() -> None:
+    """
+    Reescribe METRICS_DIR/<JOB>.prom de forma atómica (lo que espera el textfile collector).
+    Serializado con `_flush_lock`: varios threads pueden disparar el flush periódico a la vez.
+    """
+    global _ultimo_flush
+    _ultimo_flush = time.monotonic()
+    if not HABILITADO or (not _contadores and not _duraciones):
+        return
+    with _flush_lock:
+        destino = METRICS_DIR / f"{JOB}.prom"
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_suffix(f".prom.{os.getpid()}.tmp")
+        tmp.write_text(render_prometheus(), encoding="utf-8")
+        os.replace(tmp, destino)
+
+
+atexit.register(flush)
+
+
+# -------------------------------
+# Reporte
+# -------------------------------
+
+def _clave_reporte(registro: Dict[str, Any]) -> str:
+    attrs = registro.get("attrs") or {}
+    etapa = attrs.get("etapa")
+    return f"{registro['nombre']}[{etapa}]" if etapa else registro["nombre"]
+
+
+def leer_trazas(path: Path = TRACE_FILE, ultimas: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lee los spans de `path` y de sus rotaciones (.N … .1, del más viejo al más nuevo);
+    con `ultimas` se queda con las N corridas más recientes.
+    """
+    path = Path(path)
+    registros = []
+    for archivo in _rotados(path) + [path]:
+        if not archivo.exists():
+            continue
+        with archivo.open(encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registros.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue  # línea truncada por un proceso interrumpido
+    if ultimas:
+        orden: Dict[str, float] = {}
+        for r in registros:
+            orden[r["run"]] = max(orden.get(r["run"], 0.0), r["ts"])
+        recientes = set(sorted(orden, key=orden.get)[-ultimas:])
+        registros = [r for r in registros if r["run"] in recientes]
+    return registros
+
+
+def resumir(registros: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Agrega los spans por nombre (y etapa): cantidad, errores, p50/p95/p99 y throughput."""
+    grupos: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in registros:
+        grupos[_clave_reporte(r)].append(r)
+    resumen = {}
+    for clave, spans in sorted(grupos.items()):
+        duraciones = [s["dur_s"] for s in spans]
+        total = sum(duraciones)
+        items = sum((s.get("attrs") or {}).get("items") or 0 for s in spans)
+        resumen[clave] = {
+            "n": len(spans),
+            "errores": sum(1 for s in spans if s["estado"] != "ok"),
+            "corridas": len({s["run"] for s in spans}),
+            "p50_s": round(percentil(duraciones, 50), 4),
+            "p95_s": round(percentil(duraciones, 95), 4),
+            "p99_s": round(percentil(duraciones, 99), 4),
+            "total_s": round(total, 3),
+            "por_s": round(len(spans) / total, 3) if total else 0.0,
+            "items_por_s": round(items / total, 3) if total and items else None,
+        }
+    return resumen
+
+
+def imprimir_reporte(resumen: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'span':<32} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'items/s':>9}")
+    print("─" * 84)
+    for clave, r in resumen.items():
+        items = f"{r['items_por_s']:.2f}" if r["items_por_s"] is not None else "-"
+        print(
+            f"{clave[:32]:<32} {r['n']:>6} {r['errores']:>5} {r['p50_s']:>8.3f}s "
+            f"{r['p95_s']:>8.3f}s {r['p99_s']:>8.3f}s {items:>9}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reportes sobre las trazas del pipeline.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    rep = sub.add_parser("reporte", help="Latencias p50/p95/p99 y throughput por etapa.")
+    rep.add_argument("--trace", default=str(TRACE_FILE), help="Archivo JSONL de trazas.")
+    rep.add_argument("--ultimas", type=int, default=None, help="Sólo las N corridas más recientes.")
+    rep.add_argument("--json", action="store_true", help="Imprime el resumen como JSON.")
+    args = parser.parse_args(argv)
+
+    configurar(habilitado=False)  # el reporte no debe generar métricas propias
+    registros = leer_trazas(Path(args.trace), args.ultimas)
+    if not registros:
+        print(f"No hay trazas en {args.trace}.")
+        return 1
+    resumen = resumir(registros)
+    if args.json:
+        print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    else:
+        print(f"{len(registros)} spans de {len({r['run'] for r in registros})} corrida(s) en {args.trace}")
+        imprimir_reporte(resumen)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    raise SystemExit(main())
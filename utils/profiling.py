@@ -0,0 +1,206 @@
+"""
+Perfilado opcional de los puntos de entrada (--profile).
+
+Con el perfilado activo, `perfilar(nombre, directorio)` registra durante toda la ejecución:
+- cProfile del thread principal → <nombre>_<ts>.pstats (y el top 25 por tiempo acumulado
+  en consola);
+- un muestreador de stacks de todos los threads cada PROFILE_INTERVALO_S segundos →
+  <nombre>_<ts>.collapsed (formato "stack;plegado cuenta", entrada directa de
+  flamegraph.pl, speedscope o inferno);
+- tracemalloc: pico de memoria total y por etapa, con tiempo de pared, en
+  <nombre>_<ts>.json. Cada span de utils.metrics (etapas del DAG, lotes del clasificador,
+  http_fetch, ...) cuenta como etapa; `etapa(...)` marca fases sin span (lectura/escritura).
+
+Sin --profile `perfilar` y `etapa` no hacen nada (un chequeo de un booleano), así que los
+puntos de entrada pueden dejarlos siempre puestos.
+
+Limitaciones: cProfile sólo ve el thread principal (los demás quedan en el .collapsed)
+y los procesos hijos (parseo del scraper) no se perfilan. Los picos por etapa de etapas
+que corren en paralelo (resúmenes del orquestador) se solapan.
+
+Ejemplo:
+    python -m clasificador.pipeline_classificador --profile
+    flamegraph.pl data/outputs/profiles/clasificador_*.collapsed > clasificador.svg
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILES_DIR = "./data/outputs/profiles"
+PROFILE_INTERVALO_S = float(os.getenv("PROFILE_INTERVALO_S", "0.005"))
+
+_activo = False
+_etapas: List[Dict] = []
+_abiertas: List[Dict] = []  # etapas en curso (pueden anidarse o correr en paralelo)
+_lock = threading.Lock()
+
+
+def activo() -> bool:
+    return _activo
+
+
+def add_profile_args(parser: argparse.ArgumentParser) -> None:
+    """Agrega --profile [DIR] a un parser de argparse."""
+    parser.add_argument(
+        "--profile", nargs="?", const=PROFILES_DIR, default=None, metavar="DIR",
+        help=f"Perfila la ejecución (cProfile, stacks para flamegraph y memoria pico) "
+             f"y guarda los resultados en DIR (por defecto {PROFILES_DIR}).",
+    )
+
+
+def _etiqueta(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Muestreador(threading.Thread):
+    """Toma los stacks de todos los threads (menos el propio) a intervalos regulares."""
+
+    def __init__(self, intervalo: float):
+        super().__init__(name="profiling-muestreador", daemon=True)
+        self.intervalo = intervalo
+        self.stacks: Counter = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+
+    def run(self) -> None:
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            nombres = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(_etiqueta(frame))
+                    frame = frame.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.stacks[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def detener(self) -> None:
+        self._detener.set()
+        self.join()
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Registra tiempo de pared y memoria pico (tracemalloc) de una etapa si hay perfilado."""
+    if not _activo:
+        yield
+        return
+    with _lock:
+        # El pico de tracemalloc es global: antes de reiniciarlo se acredita a las abiertas
+        _acreditar_pico()
+        tracemalloc.reset_peak()
+        actual_inicio, _ = tracemalloc.get_traced_memory()
+        registro = {"pico": actual_inicio}
+        _abiertas.append(registro)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _acreditar_pico()
+            del _abiertas[next(i for i, r in enumerate(_abiertas) if r is registro)]
+            actual, _ = tracemalloc.get_traced_memory()
+            _etapas.append({
+                "etapa": nombre,
+                "thread": threading.current_thread().name,
+                "wall_time_s": round(time.perf_counter() - t0, 4),
+                "memoria_inicio_mb": round(actual_inicio / 1e6, 2),
+                "memoria_fin_mb": round(actual / 1e6, 2),
+                "pico_mb": round(registro["pico"] / 1e6, 2),
+            })
+
+
+def _acreditar_pico() -> None:
+    _, pico = tracemalloc.get_traced_memory()
+    for registro in _abiertas:
+        registro["pico"] = max(registro["pico"], pico)
+
+
+def _agrupar(etapas: List[Dict]) -> List[Dict]:
+    """Agrega las etapas por nombre: cantidad, tiempo total y máximo pico de memoria."""
+    grupos: Dict[str, Dict] = {}
+    for e in etapas:
+        g = grupos.setdefault(e["etapa"], {"etapa": e["etapa"], "n": 0, "wall_time_s": 0.0, "pico_mb": 0.0})
+        g["n"] += 1
+        g["wall_time_s"] = round(g["wall_time_s"] + e["wall_time_s"], 4)
+        g["pico_mb"] = max(g["pico_mb"], e["pico_mb"])
+    return sorted(grupos.values(), key=lambda g: g["wall_time_s"], reverse=True)
+
+
+def _top(perfil: cProfile.Profile, n: int = 25) -> str:
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(n)
+    return salida.getvalue()
+
+
+@contextmanager
+def perfilar(nombre: str, directorio: Optional[str]):
+    """Perfila el bloque si `directorio` no es None (el valor de --profile)."""
+    global _activo
+    if directorio is None:
+        yield
+        return
+
+    destino = Path(directorio)
+    destino.mkdir(parents=True, exist_ok=True)
+    base = destino / f"{nombre}_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    _etapas.clear()
+    tracemalloc.start()
+    _activo = True
+    muestreador = _Muestreador(PROFILE_INTERVALO_S)
+    muestreador.start()
+    perfil = cProfile.Profile()
+    t0 = time.perf_counter()
+    perfil.enable()
+    try:
+        with etapa("total"):
+            yield
+    finally:
+        perfil.disable()
+        duracion = time.perf_counter() - t0
+        muestreador.detener()
+        _activo = False
+        pico = max((e["pico_mb"] for e in _etapas if e["etapa"] == "total"), default=0.0)
+        tracemalloc.stop()
+
+        perfil.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for pila, cuenta in muestreador.stacks.most_common():
+                f.write(f"{pila} {cuenta}\n")
+        resumen = {
+            "nombre": nombre,
+            "wall_time_s": round(duracion, 4),
+            "pico_mb": pico,
+            "muestras": muestreador.muestras,
+            "intervalo_s": PROFILE_INTERVALO_S,
+            "por_etapa": _agrupar(_etapas),
+            "etapas": list(_etapas),
+        }
+        Path(f"{base}.json").write_text(json.dumps(resumen, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        print("════════════════════════════════════════")
+        print(f" Perfil de {nombre} 🔬 ")
+        print("════════════════════════════════════════")
+        print(_top(perfil))
+        print(f"{'Etapa':<28} {'N':>6} {'Tiempo':>9} {'Pico MB':>9}")
+        for g in resumen["por_etapa"]:
+            print(f"{g['etapa']:<28} {g['n']:>6} {g['wall_time_s']:>8.2f}s {g['pico_mb']:>9.1f}")
+        print(f"→ {base}.pstats | {base}.collapsed ({muestreador.muestras} muestras) | {base}.json")
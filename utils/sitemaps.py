@@ -0,0 +1,100 @@
+"""
+Lectura de sitemaps (robots.txt, sitemap index, urlset y Google News sitemaps).
+
+El parseo es incremental (`xml.etree.ElementTree.iterparse` sobre el stream de la respuesta):
+cada <url>/<sitemap> se procesa y se libera al cerrarse, así que un sitemap de decenas
+de MB no se carga entero en memoria y se puede cortar la descarga en cualquier momento.
+
+De cada entrada se toma la URL, la fecha de publicación (<news:publication_date> o, si
+falta, <lastmod>), el título de Google News y una sección: la primera de <news:keywords>
+o el primer segmento del path de la URL.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.time_utils import parse_fecha
+
+
+@dataclass
+class EntradaSitemap:
+    url: str
+    fecha: Optional[float] = None  # epoch
+    seccion: str = ""
+    titulo: str = ""
+
+
+def sitemaps_en_robots(texto: str) -> List[str]:
+    """URLs declaradas con `Sitemap:` en un robots.txt (sin duplicados, en orden)."""
+    urls: List[str] = []
+    for linea in texto.splitlines():
+        clave, _, valor = linea.partition(":")
+        valor = valor.strip()
+        if clave.strip().lower() == "sitemap" and valor.startswith("http") and valor not in urls:
+            urls.append(valor)
+    return urls
+
+
+def es_news_sitemap(url: str) -> bool:
+    """Heurística por nombre: los sitemaps de Google News suelen llevar "news" en la URL."""
+    return "news" in urlparse(url).path.lower()
+
+
+def seccion_de_url(url: str) -> str:
+    """Primer segmento del path ("https://x.com/politica/nota.html" → "politica")."""
+    partes = [p for p in urlparse(url).path.split("/") if p]
+    return partes[0].lower() if len(partes) > 1 else ""
+
+
+def abrir_descomprimido(stream: BinaryIO) -> BinaryIO:
+    """Devuelve el stream tal cual o envuelto en GzipFile si el contenido es gzip (.xml.gz)."""
+    buffer = stream if isinstance(stream, io.BufferedReader) else io.BufferedReader(stream)
+    if buffer.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=buffer)
+    return buffer
+
+
+def _local(tag: str) -> str:
+    """Nombre del tag sin namespace ("{http://...}loc" → "loc")."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _fecha(texto: Optional[str]) -> Optional[float]:
+    # Google News admite fechas sin hora ("2025-10-23"), que fromisoformat también acepta
+    return parse_fecha(texto.strip()) if texto else None
+
+
+def iterar_sitemap(stream: BinaryIO) -> Iterator[Tuple[str, EntradaSitemap]]:
+    """
+    Recorre un sitemap en streaming y produce ("url", entrada) por cada artículo de un
+    urlset o ("sitemap", entrada) por cada sitemap hijo de un índice (fecha = <lastmod>).
+    """
+    campos: dict = {}
+    raiz = None
+    for evento, elem in ET.iterparse(abrir_descomprimido(stream), events=("start", "end")):
+        nombre = _local(elem.tag)
+        if evento == "start":
+            if raiz is None:
+                raiz = elem
+            elif nombre in ("url", "sitemap"):
+                campos = {}
+            continue
+        if nombre in ("loc", "lastmod", "publication_date", "keywords", "title"):
+            campos.setdefault(nombre, (elem.text or "").strip())
+        elif nombre in ("url", "sitemap"):
+            loc = campos.get("loc")
+            if loc:
+                fecha = _fecha(campos.get("publication_date")) or _fecha(campos.get("lastmod"))
+                if nombre == "sitemap":
+                    yield "sitemap", EntradaSitemap(loc, fecha)
+                else:
+                    palabras = [k.strip().lower() for k in (campos.get("keywords") or "").split(",") if k.strip()]
+                    yield "url", EntradaSitemap(
+                        loc, fecha, palabras[0] if palabras else seccion_de_url(loc), campos.get("title", "")
+                    )
+            raiz.clear()  # libera también las entradas ya procesadas
@@ -0,0 +1,382 @@
+"""
+Almacenamiento compartido de artículos en SQLite (modo WAL).
+
+Reemplaza la reescritura completa de data/noticias.json / data/noticias_etiquetadas.json:
+- el scraper hace upserts por lote (sólo escribe lo nuevo o lo que cambió);
+- el clasificador toma sólo los artículos sin etiquetar o cuyo contenido cambió;
+- el summarizer y la evaluación consultan por ministerio usando índices.
+
+Tabla `articles` (clave: URL normalizada) con índices por hash de contenido y fecha, y
+tabla `article_ministerio` con índice por ministerio. La exportación a JSON mantiene el
+formato de siempre para compatibilidad.
+
+Uso:
+    python -m utils.storage importar data/noticias_etiquetadas.json
+    python -m utils.storage exportar data/noticias_etiquetadas.json
+    python -m utils.storage stats
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from utils.json_utils import write_json_atomic
+from utils.time_utils import parse_fecha
+from utils.urls import normalize_url
+
+STORE_FILE = "./data/noticias.db"
+
+# Campo del JSON → columna de la tabla
+CAMPOS = [
+    ("Titulo", "titulo"),
+    ("Descripcion", "descripcion"),
+    ("Autor", "autor"),
+    ("Fuente", "fuente"),
+    ("Fecha", "fecha"),
+    ("Link", "link"),
+    ("Cuerpo", "cuerpo"),
+    ("Fuente_base", "fuente_base"),
+    ("Extraido_en", "extraido_en"),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url          TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    titulo       TEXT,
+    descripcion  TEXT,
+    autor        TEXT,
+    fuente       TEXT,
+    fecha        TEXT,
+    fecha_ts     REAL,
+    link         TEXT,
+    cuerpo       TEXT,
+    fuente_base  TEXT,
+    extraido_en  TEXT,
+    ministerio   TEXT,
+    digest       TEXT,
+    labeled_hash TEXT,
+    updated_at   REAL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_hash ON articles(content_hash);
+CREATE INDEX IF NOT EXISTS idx_articles_fecha ON articles(fecha_ts);
+CREATE TABLE IF NOT EXISTS article_ministerio (
+    ministerio TEXT NOT NULL,
+    url        TEXT NOT NULL REFERENCES articles(url) ON DELETE CASCADE,
+    PRIMARY KEY (ministerio, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_article_ministerio_url ON article_ministerio(url);
+"""
+
+_CHUNK = 500  # límite de parámetros por consulta IN (...)
+
+
+def content_hash(articulo: Dict) -> str:
+    """Hash del contenido relevante para clasificar (título, descripción y cuerpo)."""
+    h = hashlib.sha256()
+    for campo in ("Titulo", "Descripcion", "Cuerpo"):
+        h.update((articulo.get(campo) or "").encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def _chunks(items: Sequence, n: int = _CHUNK) -> Iterator[Sequence]:
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+class ArticleStore:
+    """
+    Acceso thread-safe a la base de artículos.
+
+    Una sola conexión por instancia protegida con un lock; varios procesos pueden usar
+    el mismo archivo (WAL permite lectores concurrentes con un escritor).
+    """
+
+    def __init__(self, path: str = STORE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrar()
+
+    def _migrar(self) -> None:
+        """Agrega columnas nuevas a bases creadas con una versión anterior del esquema."""
+        columnas = {f["name"] for f in self._conn.execute("PRAGMA table_info(articles)")}
+        if "digest" not in columnas:
+            with self._conn:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN digest TEXT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ArticleStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------------------------------------------------------
+    # Conversión fila ↔ dict con el formato JSON histórico
+    # ---------------------------------------------------------------
+
+    @staticmethod
+    def _a_dict(row: sqlite3.Row, con_ministerio: bool = True) -> Dict:
+        articulo = {campo: row[col] for campo, col in CAMPOS}
+        if con_ministerio:
+            articulo["ministerio"] = json.loads(row["ministerio"]) if row["ministerio"] else []
+            if row["digest"]:
+                articulo["digest"] = json.loads(row["digest"])
+        return articulo
+
+    # ---------------------------------------------------------------
+    # Escritura
+    # ---------------------------------------------------------------
+
+    def existing_urls(self, urls: Iterable[str]) -> Set[str]:
+        """Devuelve cuáles de las URLs (normalizadas) ya están en la base."""
+        normalizadas = list({normalize_url(u) for u in urls})
+        encontradas: Set[str] = set()
+        with self._lock:
+            for parte in _chunks(normalizadas):
+                marcas = ",".join("?" * len(parte))
+                filas = self._conn.execute(
+                    f"SELECT url FROM articles WHERE url IN ({marcas})", list(parte)
+                )
+                encontradas.update(f["url"] for f in filas)
+        return encontradas
+
+    def upsert_articles(self, articulos: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Inserta o actualiza artículos en bloque (clave: Link normalizado).
+
+        Un artículo existente sólo se reescribe si cambió su hash de contenido; en ese caso
+        su etiqueta queda desactualizada (se quita del índice por ministerio) y vuelve a estar
+        pendiente de clasificar. Los artículos sin Link se ignoran.
+        Si el dict trae `ministerio`, se guarda como etiqueta del contenido actual.
+
+        Retorna conteos {"insertados", "actualizados", "sin_cambios"}.
+        """
+        por_url: Dict[str, Dict] = {}
+        for art in articulos:
+            link = art.get("Link")
+            if link:
+                por_url[normalize_url(link)] = art
+        conteos = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+        if not por_url:
+            return conteos
+
+        ahora = time.time()
+        with self._lock, self._conn:
+            previos: Dict[str, str] = {}
+            for parte in _chunks(list(por_url)):
+                marcas = ",".join("?" * len(parte))
+                for fila in self._conn.execute(
+                    f"SELECT url, content_hash FROM articles WHERE url IN ({marcas})", list(parte)
+                ):
+                    previos[fila["url"]] = fila["content_hash"]
+
+            filas, etiquetas, desfasadas = [], [], []
+            for url, art in por_url.items():
+                h = content_hash(art)
+                tiene_etiqueta = "ministerio" in art
+                if url in previos and previos[url] == h and not tiene_etiqueta:
+                    conteos["sin_cambios"] += 1
+                    continue
+                conteos["actualizados" if url in previos else "insertados"] += 1
+                fecha_ts = parse_fecha(art.get("Fecha")) or parse_fecha(art.get("Extraido_en"))
+                filas.append(
+                    [url, h] + [art.get(campo, "") for campo, _ in CAMPOS] + [fecha_ts, ahora]
+                )
+                if tiene_etiqueta:
+                    etiquetas.append((url, art.get("ministerio") or [], art.get("digest")))
+                elif url in previos:
+                    desfasadas.append(url)
+
+            columnas = ", ".join(col for _, col in CAMPOS)
+            marcas = ", ".join("?" * (len(CAMPOS) + 4))
+            self._conn.executemany(
+                f"""
+                INSERT INTO articles (url, content_hash, {columnas}, fecha_ts, updated_at)
+                VALUES ({marcas})
+                ON CONFLICT(url) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    {", ".join(f"{col} = excluded.{col}" for _, col in CAMPOS)},
+                    fecha_ts = excluded.fecha_ts,
+                    updated_at = excluded.updated_at
+                """,
+                filas,
+            )
+            for parte in _chunks(desfasadas):
+                marcas = ",".join("?" * len(parte))
+                self._conn.execute(
+                    f"DELETE FROM article_ministerio WHERE url IN ({marcas})", list(parte)
+                )
+            self._guardar_etiquetas(etiquetas)
+        return conteos
+
+    def _guardar_etiquetas(self, etiquetas: List[Tuple[str, List[str], Optional[Dict]]]) -> None:
+        if not etiquetas:
+            return
+        urls = [url for url, _, _ in etiquetas]
+        # Una etiqueta sin digest borra el anterior: quedaría desfasado respecto del contenido
+        self._conn.executemany(
+            "UPDATE articles SET ministerio = ?, digest = ?, labeled_hash = content_hash WHERE url = ?",
+            [
+                (
+                    json.dumps(m, ensure_ascii=False),
+                    json.dumps(d, ensure_ascii=False) if d else None,
+                    url,
+                )
+                for url, m, d in etiquetas
+            ],
+        )
+        for parte in _chunks(urls):
+            marcas = ",".join("?" * len(parte))
+            self._conn.execute(f"DELETE FROM article_ministerio WHERE url IN ({marcas})", list(parte))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO article_ministerio (ministerio, url) VALUES (?, ?)",
+            [(m, url) for url, ministerios, _ in etiquetas for m in ministerios],
+        )
+
+    def save_labels(self, etiquetas: Iterable[Tuple]) -> int:
+        """
+        Guarda en bloque (link, ministerios) o (link, ministerios, digest) para el contenido
+        actual de cada artículo.
+        """
+        normalizadas = [
+            (normalize_url(e[0]), list(e[1]), e[2] if len(e) > 2 else None) for e in etiquetas
+        ]
+        with self._lock, self._conn:
+            self._guardar_etiquetas(normalizadas)
+        return len(normalizadas)
+
+    # ---------------------------------------------------------------
+    # Lectura
+    # ---------------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def pending_classification(
+        self, limit: Optional[int] = None, since: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Artículos nunca etiquetados o cuyo contenido cambió desde la última etiqueta.
+
+        Con `since` (epoch) sólo considera los publicados desde ese momento (índice por fecha).
+        """
+        sql = "SELECT * FROM articles WHERE (labeled_hash IS NULL OR labeled_hash != content_hash)"
+        params: list = []
+        if since is not None:
+            sql += " AND fecha_ts >= ?"
+            params.append(since)
+        sql += " ORDER BY fecha_ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [self._a_dict(f, con_ministerio=False) for f in self._conn.execute(sql, params)]
+
+    def articles_by_ministerio(self, ministerio: str, since: Optional[float] = None) -> List[Dict]:
+        """Artículos etiquetados con `ministerio` (usa el índice de article_ministerio)."""
+        sql = (
+            "SELECT a.* FROM article_ministerio am JOIN articles a ON a.url = am.url "
+            "WHERE am.ministerio = ?"
+        )
+        params: list = [ministerio]
+        if since is not None:
+            sql += " AND a.fecha_ts >= ?"
+            params.append(since)
+        with self._lock:
+            filas = self._conn.execute(sql + " ORDER BY a.fecha_ts", params)
+            return [self._a_dict(f) for f in filas]
+
+    def articles_since(self, since: float) -> List[Dict]:
+        """Artículos publicados desde `since` (epoch), vía el índice por fecha."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT * FROM articles WHERE fecha_ts >= ? ORDER BY fecha_ts", (since,)
+            )
+            return [self._a_dict(f) for f in filas]
+
+    def iter_articles(self, solo_etiquetados: bool = False) -> Iterator[Dict]:
+        sql = "SELECT * FROM articles"
+        if solo_etiquetados:
+            sql += " WHERE labeled_hash IS NOT NULL"
+        sql += " ORDER BY fecha_ts"
+        with self._lock:
+            filas = self._conn.execute(sql).fetchall()
+        for fila in filas:
+            yield self._a_dict(fila)
+
+    # ---------------------------------------------------------------
+    # Compatibilidad con los JSON
+    # ---------------------------------------------------------------
+
+    def import_json(self, path: str) -> Dict[str, int]:
+        """Carga un JSON con el formato de noticias.json / noticias_etiquetadas.json."""
+        articulos = json.loads(Path(path).read_text(encoding="utf-8"))
+        return self.upsert_articles(articulos)
+
+    def export_json(self, path: str, solo_etiquetados: bool = False) -> int:
+        """Escribe todos los artículos en el formato JSON histórico (con `ministerio`)."""
+        articulos = list(self.iter_articles(solo_etiquetados=solo_etiquetados))
+        write_json_atomic(Path(path), articulos)
+        return len(articulos)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.count()
+            pendientes = self._conn.execute(
+                "SELECT COUNT(*) FROM articles "
+                "WHERE labeled_hash IS NULL OR labeled_hash != content_hash"
+            ).fetchone()[0]
+            por_ministerio = {
+                f["ministerio"]: f["n"]
+                for f in self._conn.execute(
+                    "SELECT ministerio, COUNT(*) AS n FROM article_ministerio GROUP BY ministerio"
+                )
+            }
+        return {"total": total, "pendientes": pendientes, "por_ministerio": por_ministerio}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Administra la base SQLite de artículos.")
+    parser.add_argument("--store", default=STORE_FILE, help=f"Archivo SQLite (por defecto {STORE_FILE}).")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_imp = sub.add_parser("importar", help="Importa un JSON de artículos (etiquetados o no).")
+    p_imp.add_argument("json")
+    p_exp = sub.add_parser("exportar", help="Exporta la base al formato JSON histórico.")
+    p_exp.add_argument("json")
+    p_exp.add_argument("--solo-etiquetados", action="store_true")
+    sub.add_parser("stats", help="Muestra conteos por ministerio y pendientes de clasificar.")
+    args = parser.parse_args()
+
+    with ArticleStore(args.store) as store:
+        t0 = time.time()
+        if args.comando == "importar":
+            print(f"Importado {args.json}: {store.import_json(args.json)}")
+        elif args.comando == "exportar":
+            n = store.export_json(args.json, solo_etiquetados=args.solo_etiquetados)
+            print(f"Exportados {n} artículos a {args.json}")
+        else:
+            print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+        print(f"({time.time() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from typing import Dict, List, Optional
+
+from utils.time_utils import parse_fecha
+
+
+def article_timestamp(articulo: Dict) -> Optional[float]:
+    """Fecha de un artículo en epoch: `Fecha` (publicación) o, si falta, `Extraido_en`."""
+    return parse_fecha(articulo.get("Fecha")) or parse_fecha(articulo.get("Extraido_en"))
+
+
+def filter_since(articulos: List[Dict], corte: Optional[float]) -> List[Dict]:
+    """
+    Devuelve los artículos con fecha >= corte, en su orden (todos si corte es None).
+
+    Es una pasada lineal: los llamadores ya leyeron el JSON completo, así que ordenar por
+    fecha para una sola consulta costaría más. Las lecturas indexadas por fecha son las del
+    índice de artículos (utils.article_index, `fecha_ts`) y la base (`--store`). Los
+    artículos sin fecha interpretable quedan fuera de cualquier ventana.
+    """
+    if corte is None:
+        return articulos
+    return [a for a in articulos if (ts := article_timestamp(a)) is not None and ts >= corte]
@@ -1,3 +1,7 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+
 def format_duration_hms(sec: float) -> str:
     """
     Convierte segundos a un string "Hh Mm Ss" para logs.
@@ -24,4 +28,76 @@ def format_duration_hms(sec: float) -> str:
     h, m = divmod(m, 60)
     if h: return f"{h}h {m}m {s}s"
     if m: return f"{m}m {s}s"
-    return f"{s}s"
\ No newline at end of file
+    return f"{s}s"
+
+def parse_fecha(valor: Optional[str]) -> Optional[float]:
+    """
+    Convierte una fecha ISO 8601 de los artículos (`Fecha`, `Extraido_en`) a epoch en segundos.
+
+    - Acepta el sufijo "Z" (p. ej. "2025-10-23T17:11:10.000Z").
+    - Fechas sin zona horaria se interpretan como UTC.
+    - Devuelve None si el valor está vacío o no se puede interpretar.
+    """
+    if not valor or not isinstance(valor, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(valor.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+_UNIDADES_VENTANA = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(ventana: str) -> float:
+    """
+    Convierte una ventana de tiempo ("90m", "24h", "7d" o un número de horas) a segundos.
+
+    Ejemplos:
+        >>> parse_window("24h")
+        86400.0
+        >>> parse_window("90m")
+        5400.0
+    """
+    texto = ventana.strip().lower()
+    if texto and texto[-1] in _UNIDADES_VENTANA:
+        return float(texto[:-1]) * _UNIDADES_VENTANA[texto[-1]]
+    return float(texto) * 3600
+
+
+def resolve_since(since: Optional[str] = None, window: Optional[str] = None) -> Optional[float]:
+    """
+    Devuelve el corte temporal (epoch) a partir de `--since` (fecha ISO) o `--window` (ventana
+    hacia atrás desde ahora). None significa "sin filtro".
+    """
+    if since:
+        corte = parse_fecha(since)
+        if corte is None:
+            raise ValueError(f"Fecha inválida para --since: '{since}' (se espera ISO 8601).")
+        return corte
+    if window:
+        return datetime.now(timezone.utc).timestamp() - parse_window(window)
+    return None
+
+
+def add_window_args(parser) -> None:
+    """Agrega las opciones --since / --window (mutuamente excluyentes) a un ArgumentParser."""
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument(
+        "--since", default=None,
+        help="Procesar sólo artículos publicados desde esta fecha (ISO 8601, p. ej. 2025-10-23T00:00).",
+    )
+    grupo.add_argument(
+        "--window", default=None,
+        help="Procesar sólo artículos de la última ventana (p. ej. 24h, 90m, 7d).",
+    )
+
+
+def format_since(corte: Optional[float]) -> str:
+    """Representación legible del corte temporal para los logs."""
+    if corte is None:
+        return "sin filtro"
+    return datetime.fromtimestamp(corte, timezone.utc).isoformat(timespec="seconds")
@@ -0,0 +1,14 @@
+import re
+from urllib.parse import urlparse
+
+
+def normalize_url(u: str) -> str:
+    """Normaliza una URL para deduplicar: sin query/fragment, sin '/' duplicadas ni final."""
+    if not u:
+        return ""
+    try:
+        p = urlparse(u)
+        path = re.sub(r"/{2,}", "/", p.path).rstrip("/")
+        return f"{p.scheme}://{p.netloc}{path}"
+    except Exception:
+        return u